@@ -4,35 +4,139 @@
 # Description: Contains the AI agent logic, LLM integration, and search capabilities
 # Author: LALAN KUMAR
 # Created: [20-03-2025]
-# Updated: [20-03-2025]
+# Updated: [19-10-2026]
 # Version: 1.0.0
 # License: [License Type, e.g., MIT]
 # ===================================================================================
 
 import os
-import streamlit as st
+import time
+import logging
 import datetime
+import threading
+from collections import deque
+from dataclasses import replace
 from langchain_groq import ChatGroq
 from langchain.tools import Tool
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from tavily import TavilyClient
-from document_manager import query_documents
-from state_management import get_active_user_query
+from document_manager import query_documents, NO_RELEVANT_INFORMATION
+from corpus_snapshot import knowledge_base
+from state_management import get_active_user_query, make_message
+from memory_governor import memory_governor
+from query_router import route_query
+from provider_gateway import gateway, session_scope, PooledTavilyClient, GROQ_BASE_URL
+from single_flight import flights, request_key
+from tracing import tracer, traced, current_span
+from profiling import profiled
+from metrics import metrics, percentile
+from web_compression import compress_results, compression_stats
+from reasoning import complete, policy_for, split_reasoning, ReasoningCapExceeded, PartialStreamError
+from context_packer import estimate_tokens
+from tool_executor import (
+    Deadline, ToolTimeout, run_with_deadline, plan_web_search, search_latency,
+    TURN_LATENCY_BUDGET, LLM_RESERVE, WEB_SEARCH_BUDGET
+)
+
+logger = logging.getLogger(__name__)
 
 # Get API keys
 groq_api_key = os.getenv("GROQ_API_KEY")
 tavily_api_key = os.getenv("TAVILY_API_KEY")
 cohere_api_key=os.getenv("COHERE_API_KEY")
 
-# Initialize Tavily client
-tavily_client = TavilyClient(api_key=tavily_api_key)
+# Initialize Tavily client on the gateway's shared connection pool
+tavily_client = PooledTavilyClient(api_key=tavily_api_key, session=gateway.requests_session())
+
+# Model names for the two tiers
+REASONING_MODEL = os.getenv("REASONING_MODEL", "Deepseek-R1-Distill-Qwen-32b")
+FAST_MODEL = os.getenv("FAST_MODEL", "llama-3.1-8b-instant")
+
+# Latency objectives per tier, in seconds
+REASONING_LATENCY_SLO = float(os.getenv("REASONING_LATENCY_SLO", "20"))
+FAST_LATENCY_SLO = float(os.getenv("FAST_LATENCY_SLO", "3"))
+
+# Turns with at most this many words count as short
+SHORT_TURN_WORDS = 12
+
+# Health tracking: recent latencies kept, failures before cool-down, cool-down length
+TIER_LATENCY_WINDOW = 20
+TIER_MAX_FAILURES = 3
+TIER_COOLDOWN = 30.0
+
+# Initialize AI models (on Groq) on the gateway's shared connection pool
+groq_client_options = {"groq_api_base": GROQ_BASE_URL} if GROQ_BASE_URL else {}
+llm_engine = ChatGroq(
+    model=REASONING_MODEL,
+    groq_api_key=groq_api_key,
+    http_client=gateway.http_client(),
+    max_retries=0,
+    **groq_client_options
+)
+fast_llm_engine = ChatGroq(
+    model=FAST_MODEL,
+    groq_api_key=groq_api_key,
+    http_client=gateway.http_client(),
+    max_retries=0,
+    **groq_client_options
+)
 
-# Initialize AI model (DeepSeek on Groq)
-llm_engine = ChatGroq(model="Deepseek-R1-Distill-Qwen-32b", groq_api_key=groq_api_key)
+class ModelTier:
+    """A model together with its latency objective and recent health"""
+    
+    def __init__(self, name, llm, latency_slo):
+        self.name = name
+        self.llm = llm
+        self.latency_slo = latency_slo
+        self.latencies = deque(maxlen=TIER_LATENCY_WINDOW)
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.lock = threading.Lock()
+    
+    def record(self, latency, ok):
+        """Record the outcome of a call and open a cool-down when the tier misbehaves"""
+        with self.lock:
+            if ok:
+                self.latencies.append(latency)
+                self.failures = 0
+                # Consistently missing the SLO counts the same as erroring
+                if len(self.latencies) >= 5 and self.p95() > self.latency_slo:
+                    self.cooldown_until = time.monotonic() + TIER_COOLDOWN
+                    self.latencies.clear()
+            else:
+                self.failures += 1
+                if self.failures >= TIER_MAX_FAILURES:
+                    self.cooldown_until = time.monotonic() + TIER_COOLDOWN
+                    self.failures = 0
+    
+    def p95(self):
+        """95th percentile of recent latencies"""
+        return percentile(self.latencies, 0.95)
+    
+    def healthy(self):
+        """Check whether the tier is outside its cool-down"""
+        return time.monotonic() >= self.cooldown_until
+
+# Fast tier for conversation, reasoning tier for grounded answers
+model_tiers = {
+    "fast": ModelTier("fast", fast_llm_engine, FAST_LATENCY_SLO),
+    "reasoning": ModelTier("reasoning", llm_engine, REASONING_LATENCY_SLO)
+}
+
+# Operational metrics for turns, model calls and web searches
+turns_total = metrics.counter("zerthia_turns_total", "Chat turns by routed intent and outcome", ["intent", "outcome"])
+turn_duration = metrics.histogram("zerthia_turn_duration_seconds", "End-to-end latency of a chat turn", ["intent"])
+llm_requests = metrics.counter("zerthia_llm_requests_total", "Completion attempts per tier and outcome", ["tier", "outcome"])
+llm_duration = metrics.histogram("zerthia_llm_request_duration_seconds", "Completion latency per tier, including retries", ["tier"])
+llm_tokens = metrics.counter("zerthia_llm_tokens_total", "Estimated prompt and completion tokens per tier", ["tier", "kind"])
+web_searches = metrics.counter("zerthia_web_searches_total", "Web searches by outcome", ["outcome"])
+web_search_duration = metrics.histogram("zerthia_web_search_duration_seconds", "Tavily search latency per depth", ["depth"])
 
 # Get current date
 current_date = datetime.datetime.now().strftime("%Y-%m-%d")
 
+# Reply used when no model tier can answer
+UNAVAILABLE_RESPONSE = "I'm having trouble reaching my language models right now. Please try again in a moment."
+
 # Define system prompt templates
 system_template = f"""
 You are Zerthia, an expert AI companion with emotional intelligence, web search and document analysis capabilities, created by SYNTHEIM.
@@ -116,14 +220,46 @@ Here is the document information:
 """
 
 # Function to perform internet search
-def perform_web_search(query: str) -> str:
-    """Perform a web search using Tavily"""
+@traced("web_search")
+def perform_web_search(query: str, deadline=None) -> str:
+    """Perform a web search using Tavily, returning None if the budget runs out"""
+    
+    # Pick search depth and result count for the time that is left
+    deadline = deadline or Deadline(WEB_SEARCH_BUDGET)
+    plan = plan_web_search(deadline)
+    span = current_span()
+    if plan is None:
+        span.set(skipped="no time budget left")
+        web_searches.labels(outcome="skipped").inc()
+        return None
+    span.set(**plan)
     
+    start = time.monotonic()
     try:
-        response = tavily_client.search(query, search_depth="advanced", max_results=5)
+        # Sessions asking the same question at once share one Tavily call
+        key = request_key("tavily", query.lower().strip(), plan["search_depth"], plan["max_results"])
+        response = run_with_deadline(
+            deadline, flights.do, key, gateway.call, "tavily", tavily_client.search, query,
+            deadline=deadline, **plan
+        )
+        search_latency.observe(plan["search_depth"], time.monotonic() - start)
+        web_search_duration.labels(depth=plan["search_depth"]).observe(time.monotonic() - start)
+        
         if response and "results" in response and len(response["results"]) > 0:
+            # Keep only the sentences relevant to the query from each source
+            results = compress_results(query, response["results"])
+            compression_stats.record(response["results"], results)
+            raw_chars = sum(len(res.get("content") or "") for res in response["results"])
+            compressed_chars = sum(len(res.get("content") or "") for res in results)
+            span.set(
+                results=len(results),
+                raw_chars=raw_chars,
+                compressed_chars=compressed_chars,
+                reduction=round(raw_chars / compressed_chars, 2) if compressed_chars else 0.0
+            )
+            
             formatted_results = []
-            for i, res in enumerate(response["results"], 1):
+            for i, res in enumerate(results, 1):
                 title = res.get('title', 'No title')
                 url = res.get('url', '#')
                 content = res.get('content', 'No description available.')
@@ -131,33 +267,142 @@ def perform_web_search(query: str) -> str:
                 # Format the result with source number for easier reference
                 formatted_results.append(f"Source {i}: {title}\nURL: {url}\nContent: {content}\n")
             
+            web_searches.labels(outcome="ok").inc()
             return "\n".join(formatted_results)
+        web_searches.labels(outcome="empty").inc()
         return "No relevant search results found."
+    except ToolTimeout:
+        # Count the overrun so the next plan is more conservative
+        search_latency.observe(plan["search_depth"], time.monotonic() - start)
+        web_search_duration.labels(depth=plan["search_depth"]).observe(time.monotonic() - start)
+        web_searches.labels(outcome="timeout").inc()
+        span.set(timed_out=True)
+        return None
     except Exception as e:
+        span.fail(e)
+        web_searches.labels(outcome="error").inc()
         return f"Error performing web search: {str(e)}"
 
 # Define Web Search and Document Query as Tools
 web_search_tool = Tool(
     name="Web Search",
-    func=perform_web_search,
+    func=lambda query: perform_web_search(query) or "No relevant search results found.",
     description="Use this tool to fetch the latest information from the web. Input a search query."
 )
 
-document_query_tool = Tool(
-    name="Document Query",
-    func=query_documents,
-    description="Use this tool to search through uploaded documents. Input a search query."
-)
+def make_document_query_tool(ctx):
+    """Document Query tool bound to one session's documents"""
+    
+    return Tool(
+        name="Document Query",
+        func=lambda query: query_documents(ctx, query),
+        description="Use this tool to search through uploaded documents. Input a search query."
+    )
+
+# Function to pick the model tier for a turn
+def select_tier(route, query):
+    """Pick the tier for an ungrounded turn; grounded answers always use reasoning"""
+    
+    if route.intent == "chat" or len(query.split()) <= SHORT_TURN_WORDS:
+        return "fast"
+    return "reasoning"
+
+# Function to call the LLM through the provider gateway
+def complete_on_tier(candidate, messages, policy, coalesce=False, on_token=None):
+    """Run one completion on a tier through the gateway"""
+    
+    prompt_tokens = sum(estimate_tokens(msg.content) for msg in messages)
+    llm_tokens.labels(tier=candidate.name, kind="prompt").inc(prompt_tokens)
+    with tracer.span(
+        "llm", tier=candidate.name, model=candidate.llm.model_name, max_tokens=policy.max_tokens,
+        prompt_tokens=prompt_tokens, coalesce=coalesce, streaming=on_token is not None
+    ) as span:
+        # Context-free prompts are identical across sessions, so they can share a call
+        if coalesce:
+            key = request_key("groq", candidate.llm.model_name, policy, *(f"{msg.type}:{msg.content}" for msg in messages))
+            response = flights.do(key, gateway.call, "groq", complete, candidate.llm, messages, policy)
+        else:
+            response = gateway.call("groq", complete, candidate.llm, messages, policy, on_token=on_token)
+        span.set(completion_tokens=estimate_tokens(response))
+        llm_tokens.labels(tier=candidate.name, kind="completion").inc(estimate_tokens(response))
+        return response
+
+def invoke_llm(messages, tier="reasoning", coalesce=False, policy=None, on_token=None):
+    """Invoke the preferred model tier, failing over to the other tier when needed"""
+    
+    policy = policy or policy_for("chat")
+    
+    # A shared call cannot stream to every caller, so streaming turns run alone
+    if on_token is not None:
+        coalesce = False
+    
+    # Try the preferred tier first unless it is cooling down
+    preferred = model_tiers[tier]
+    others = [candidate for candidate in model_tiers.values() if candidate is not preferred]
+    candidates = [preferred] + others
+    ordered = [candidate for candidate in candidates if candidate.healthy()] or candidates
+    
+    last_error = None
+    for candidate in ordered:
+        start = time.monotonic()
+        try:
+            response = complete_on_tier(candidate, messages, policy, coalesce, on_token)
+            candidate.record(time.monotonic() - start, ok=True)
+            llm_requests.labels(tier=candidate.name, outcome="ok").inc()
+            llm_duration.labels(tier=candidate.name).observe(time.monotonic() - start)
+            return response
+        except PartialStreamError:
+            # Part of the answer is already on screen: another tier would start it over
+            candidate.record(time.monotonic() - start, ok=False)
+            llm_requests.labels(tier=candidate.name, outcome="interrupted").inc()
+            raise
+        except ReasoningCapExceeded as e:
+            # The tier is healthy, it just thought too long: let the next tier answer
+            candidate.record(time.monotonic() - start, ok=True)
+            llm_requests.labels(tier=candidate.name, outcome="reasoning_cap").inc()
+            last_error = e
+        except Exception as e:
+            candidate.record(time.monotonic() - start, ok=False)
+            llm_requests.labels(tier=candidate.name, outcome="error").inc()
+            last_error = e
+    
+    # Every tier overran its reasoning budget: accept a length-capped completion
+    if isinstance(last_error, ReasoningCapExceeded):
+        return complete_on_tier(preferred, messages, replace(policy, stop_at_boundary=False), coalesce, on_token)
+    
+    raise last_error
+
+def interrupted_record(error, intent):
+    """Chat record for an answer that failed after part of it was streamed"""
+    
+    return build_ai_record(error.text, f"The answer was interrupted: {str(error.__cause__)}", intent)
+
+# Function to turn a raw completion into a chat record
+def build_ai_record(raw_response, note, intent):
+    """Store the answer and the reasoning separately, with per-turn token counts"""
+    
+    answer, reasoning = split_reasoning(raw_response)
+    usage = {
+        "policy": intent,
+        "answer_tokens": estimate_tokens(answer) if answer else 0,
+        "reasoning_tokens": estimate_tokens(reasoning) if reasoning else 0
+    }
+    
+    # Explain how the answer was produced when the model gave no reasoning
+    if not reasoning:
+        reasoning = note
+    
+    return make_message("ai", answer, reasoning, usage)
 
 # Function to build the prompt chain
-def build_prompt_chain():
-    """Build the prompt chain from message history"""
+def build_prompt_chain(ctx):
+    """Build the prompt chain from a session's message history"""
     
     # Start with just the system message
     messages = [SystemMessage(content=system_template)]
     
-    # Add the conversation history
-    for msg in st.session_state.message_log:
+    # Add the conversation history; reasoning is never sent back upstream
+    for msg in ctx.message_log:
         if msg["role"] == "user":
             messages.append(HumanMessage(content=msg["content"]))
         elif msg["role"] == "ai":
@@ -165,132 +410,87 @@ def build_prompt_chain():
     
     return messages
 
+# Function to find the documents a session can search
+def searchable_document_count(ctx):
+    """Uploaded documents plus those of the shared knowledge base"""
+    
+    corpus = knowledge_base.for_embeddings(getattr(ctx.vector_store, "embeddings", None))
+    return len(ctx.uploaded_files) + (len(corpus.documents) if corpus is not None else 0)
+
+# Function to route a query through the compiled matcher and intent classifier
+def route_user_query(ctx, query):
+    """Route the query to document search, web search or plain chat"""
+    
+    document_count = searchable_document_count(ctx)
+    embeddings = getattr(ctx.vector_store, "embeddings", None)
+    
+    return route_query(
+        query,
+        has_documents=ctx.has_documents or document_count > 0,
+        document_count=document_count,
+        embeddings=embeddings
+    )
+
 # Function to determine if web search is needed
-def needs_web_search(query):
+def needs_web_search(ctx, query):
     """Determine if web search is needed for the query"""
     
-    # Check for explicit request for search
-    explicit_search_patterns = [
-        "search for", "look up", "find information", "search the web",
-        "what's the latest", "current news", "recent updates"
-    ]
-    
-    query_lower = query.lower()
-    
-    for pattern in explicit_search_patterns:
-        if pattern in query_lower:
-            return True
-    
-    # Check for queries about current events, dates, or time-sensitive information
-    time_sensitive_patterns = [
-        "today", "current", "latest", "recent", "now", "update", 
-        "news", "weather", "price", "stock", "bitcoin", "crypto",
-        "happened", "trending", "score", "result", "happening"
-    ]
-    
-    for pattern in time_sensitive_patterns:
-        if pattern in query_lower:
-            return True
-    
-    # Check for questions about specific factual information that might need verification
-    factual_patterns = [
-        "how many", "how much", "what is the population", "what is the distance",
-        "how far", "how old", "when was", "where is", "who is the current"
-    ]
-    
-    for pattern in factual_patterns:
-        if pattern in query_lower:
-            return True
-    
-    # Don't use web search for conversational, opinion, or emotional queries
-    conversational_patterns = [
-        "how are you", "what do you think", "can you help", "i feel", 
-        "i'm feeling", "i am feeling", "i need advice", "what should i do",
-        "how do you feel", "tell me about yourself", "who are you"
-    ]
-    
-    for pattern in conversational_patterns:
-        if pattern in query_lower:
-            return False
-    
-    # Default to not using web search for most queries
-    return False
+    return route_user_query(ctx, query).web
 
 # Function to determine if we should check documents
-def needs_document_search(query):
+def needs_document_search(ctx, query):
     """Determine if document search is needed for the query"""
     
-    # Check for explicit request for document search
-    document_patterns = [
-        "in the document", "from the pdf", "in the pdf", "document says",
-        "check the document", "in the uploaded", "from the uploaded",
-        "the document mentions", "in my document", "in my pdf",
-        "what does the document say about", "find in document",
-        "tell me about the document", "summarize the document",
-        "what's in the pdf", "what is in the document",
-        "analyze the pdf", "analyze the document"
-    ]
-    
-    query_lower = query.lower()
-    
-    for pattern in document_patterns:
-        if pattern in query_lower:
-            return True
-    
-    # If there are documents and the query sounds like it needs information:
-    if st.session_state.has_documents and len(st.session_state.uploaded_files) > 0:
-        info_patterns = [
-            "what is", "how does", "tell me about", "explain", "summarize",
-            "what are", "where is", "who is", "when did", "why did",
-            "what was", "how many", "how much"
-        ]
-        
-        for pattern in info_patterns:
-            if query_lower.startswith(pattern):
-                return True
-    
-    # Always try document search if we have few documents
-    # This increases chances of getting relevant information
-    if st.session_state.has_documents and len(st.session_state.uploaded_files) <= 3:
-        return True
-    
-    # Default to not using document search unless explicitly requested
-    return False
+    return route_user_query(ctx, query).docs
 
-def handle_user_query(query):
+def handle_user_query(ctx, query):
     """Handle a user query and determine response strategy"""
     
-    # Determine if web search or document search is needed
-    should_search_web = needs_web_search(query)
-    should_search_docs = needs_document_search(query)
+    route = route_user_query(ctx, query)
     
-    return should_search_web, should_search_docs
+    return route.web, route.docs
 
-def process_query():
-    """Process the latest user query and generate a response"""
+@profiled("process_query")
+def process_query(ctx, on_token=None):
+    """Process the latest user query of a session and generate a response
     
-    with st.spinner(""):
-        messages = build_prompt_chain()
+    Only ctx is read and written, so turns of different sessions can run in
+    parallel on any thread. on_token, when given, receives answer text as
+    the final completion streams.
+    """
+    
+    with session_scope(ctx.session_id), tracer.span("process_query", session_id=ctx.session_id) as turn:
+        # Latency budget for the whole turn
+        turn_deadline = Deadline(TURN_LATENCY_BUDGET)
+        turn_start = time.monotonic()
+        
+        messages = build_prompt_chain(ctx)
         
         # Get the last user query
-        last_user_query = get_active_user_query()
+        last_user_query = get_active_user_query(ctx)
         
         if not last_user_query:
-            st.session_state.processing = False
+            ctx.processing = False
             return
         
         # Determine query handling strategy
-        should_search_web, should_search_docs = handle_user_query(last_user_query)
+        with tracer.span("route", query_words=len(last_user_query.split())) as span:
+            route = route_user_query(ctx, last_user_query)
+            span.set(intent=route.intent, source=route.source, web=route.web, docs=route.docs)
+        should_search_web, should_search_docs = route.web, route.docs
         
-        # Flag to track if we've already handled the query
-        query_handled = False
+        # Chat record for the answer, set by whichever strategy succeeds
+        ai_record = None
         
-        # Always try document search first if we have documents
-        if st.session_state.has_documents:
+        # Search documents only when the route asks for them
+        if should_search_docs and (ctx.has_documents or searchable_document_count(ctx) > 0):
             # Query documents
-            document_results = query_documents(last_user_query)
+            document_results = query_documents(ctx, last_user_query)
+            
+            # Nothing relevant in the documents: a web-routed query is answered from the web instead
+            nothing_relevant = should_search_web and document_results == NO_RELEVANT_INFORMATION
             
-            if "No documents have been uploaded yet" not in document_results and "Error" not in document_results:
+            if "No documents have been uploaded yet" not in document_results and "Error" not in document_results and not nothing_relevant:
                 # Format document instruction with results
                 doc_instruction = document_instruction_template.format(document_results=document_results)
                 
@@ -305,18 +505,26 @@ def process_query():
                 ]
                 
                 # Get response from LLM with document results
-                ai_response = llm_engine.invoke(doc_messages).content
-                query_handled = True
-                
-                # Add a thought process about document search
-                if "<think>" not in ai_response:
-                    ai_response += f"\n\n<think>Document search was performed and used to generate this response.</think>"
+                try:
+                    ai_response = invoke_llm(doc_messages, tier="reasoning", coalesce=True, policy=policy_for("documents"), on_token=on_token)
+                    ai_record = build_ai_record(ai_response, "Document search was performed and used to generate this response.", "documents")
+                except PartialStreamError as e:
+                    # Streamed text cannot be taken back, so the turn ends with what was shown
+                    ai_record = interrupted_record(e, "documents")
+                    turn.fail(e)
+                except Exception as e:
+                    # The turn falls back to the web or base knowledge, so it is not failed
+                    turn.set(documents_error=f"{type(e).__name__}: {e}")
+                    logger.warning("Document-grounded answer failed: %s", e)
         
         # Handle web search if needed and not already handled
-        if should_search_web and not query_handled:
-            # Perform web search
-            search_results = perform_web_search(last_user_query)
-            
+        search_results = None
+        if should_search_web and ai_record is None:
+            # Perform web search within what is left of the turn budget
+            search_budget = min(WEB_SEARCH_BUDGET, turn_deadline.remaining() - LLM_RESERVE)
+            search_results = perform_web_search(last_user_query, turn_deadline.child(search_budget))
+        
+        if search_results is not None:
             # Format search instruction with results
             search_instruction = search_instruction_template.format(search_results=search_results)
             
@@ -331,28 +539,52 @@ def process_query():
             ]
             
             # Get response from LLM with search results
-            ai_response = llm_engine.invoke(search_messages).content
-            query_handled = True
-            
-            # Add a thought process about web search
-            if "<think>" not in ai_response:
-                ai_response += f"\n\n<think>Web search was performed and used to generate this response.</think>"
+            try:
+                ai_response = invoke_llm(search_messages, tier="reasoning", coalesce=True, policy=policy_for("web"), on_token=on_token)
+                ai_record = build_ai_record(ai_response, "Web search was performed and used to generate this response.", "web")
+            except PartialStreamError as e:
+                ai_record = interrupted_record(e, "web")
+                turn.fail(e)
+            except Exception as e:
+                turn.set(web_error=f"{type(e).__name__}: {e}")
+                logger.warning("Web-grounded answer failed: %s", e)
         
         # If neither search was used or they didn't provide useful results
-        if not query_handled:
+        if ai_record is None:
             # Add the current user query to the messages
             messages.append(HumanMessage(content=last_user_query))
             
-            # Use LLM directly
-            ai_response = llm_engine.invoke(messages).content
+            # Note how the answer was produced
+            if should_search_web:
+                note = "Web search did not finish within the time budget. Response generated from base knowledge."
+            else:
+                note = "No external search was performed. Response generated from base knowledge."
             
-            # Add a thought process about using base knowledge
-            if "<think>" not in ai_response:
-                ai_response += f"\n\n<think>No external search was performed. Response generated from base knowledge.</think>"
-
-    # Add AI response to chat history
-    st.session_state.message_log.append({"role": "ai", "content": ai_response})
+            # Use LLM directly
+            try:
+                ai_response = invoke_llm(messages, tier=select_tier(route, last_user_query), policy=policy_for(route.intent), on_token=on_token)
+                ai_record = build_ai_record(ai_response, note, route.intent)
+            except PartialStreamError as e:
+                ai_record = interrupted_record(e, route.intent)
+                turn.fail(e)
+            except Exception as e:
+                # Every model tier failed: answer gracefully instead of crashing the script
+                ai_record = build_ai_record(UNAVAILABLE_RESPONSE, f"All model providers failed: {str(e)}", route.intent)
+                turn.fail(e)
+        
+        outcome = "unavailable" if ai_record["content"] == UNAVAILABLE_RESPONSE else "answered"
+        turns_total.labels(intent=route.intent, outcome=outcome).inc()
+        turn_duration.labels(intent=route.intent).observe(time.monotonic() - turn_start)
+        turn.set(
+            intent=route.intent,
+            answered_with=ai_record["usage"]["policy"],
+            answer_tokens=ai_record["usage"]["answer_tokens"],
+            reasoning_tokens=ai_record["usage"]["reasoning_tokens"]
+        )
+
+    # Add AI response to chat history and count it against the session's memory
+    ctx.message_log.append(ai_record)
+    memory_governor.add_message(ctx.session_id, ai_record)
     
     # Turn off processing state
-    st.session_state.processing = False
-
+    ctx.processing = False
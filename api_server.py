@@ -0,0 +1,484 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: api_server.py
+# Description: Headless asyncio HTTP API over the agent and document pipeline
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import json
+import time
+import uuid
+import asyncio
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel
+from langchain_core.vectorstores import InMemoryVectorStore
+from state_management import get_embedding_model, new_session_context, append_message, record_upload
+from session_context import SessionContext
+from session_store import SessionStore, StaleSession, valid_session_id
+from document_manager import process_document_file, remove_document, UploadedDocument
+from memory_governor import memory_governor, MemoryLimitExceeded
+from provider_gateway import gateway
+from tracing import tracer
+from profiling import profiler
+from metrics import metrics, CONTENT_TYPE
+from sharded_search import shard_pool
+from corpus_snapshot import knowledge_base
+from embedding_index import migrator, reconcile_index
+from web_compression import compression_stats
+from agent import process_query
+from tool_executor import TURN_LATENCY_BUDGET
+
+# Load environment variables
+load_dotenv()
+
+# Pipeline modules report through logging; LOG_LEVEL sets how much is shown
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+logger = logging.getLogger(__name__)
+
+# Where and how the server listens
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+
+# Session backend: "sqlite" is shared by all workers, "memory" only suits a single worker
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+
+# Seconds a worker may hold a session before another worker can take it over, and how often others retry
+SESSION_LEASE_SECONDS = float(os.getenv("SESSION_LEASE_SECONDS", "600"))
+SESSION_LEASE_POLL = float(os.getenv("SESSION_LEASE_POLL", "0.05"))
+
+# Seconds a request waits for another worker's lease before answering 409
+SESSION_LEASE_WAIT = float(os.getenv("SESSION_LEASE_WAIT", str(3 * TURN_LATENCY_BUDGET)))
+
+# Sessions each worker keeps live in memory
+API_LIVE_SESSIONS = int(os.getenv("API_LIVE_SESSIONS", "1000"))
+
+# Threads running the blocking pipeline; provider concurrency is still capped by the gateway
+API_PIPELINE_THREADS = int(os.getenv("API_PIPELINE_THREADS", "64"))
+
+class MemorySessionBackend:
+    """Keeps sessions in this process only"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def version(self, session_id):
+        return self._versions.get(session_id)
+
+    def load(self, session_id):
+        return self._sessions.get(session_id)
+
+    def acquire(self, session_id, owner):
+        # Only one worker ever sees these sessions, and its own lock serialises them
+        return True
+
+    def release(self, session_id, owner):
+        pass
+
+    def save(self, ctx, rewrite=False, expected_version=None):
+        with self._lock:
+            self._sessions[ctx.session_id] = ctx
+            self._versions[ctx.session_id] = self._versions.get(ctx.session_id, 0) + 1
+            return self._versions[ctx.session_id]
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._versions.pop(session_id, None)
+
+class SqliteSessionBackend:
+    """Keeps sessions in the session store so every worker can serve them"""
+
+    def __init__(self, store=None):
+        self.store = store or SessionStore()
+
+    def version(self, session_id):
+        return self.store.updated_at(session_id)
+
+    def load(self, session_id):
+        vector_store = InMemoryVectorStore(embedding=get_embedding_model())
+        restored = self.store.restore(session_id, vector_store)
+        if restored is None:
+            return None
+        # Re-embed in the background if the index was built with another model
+        reconcile_index(session_id, vector_store, get_embedding_model())
+        return SessionContext(session_id, vector_store, **restored)
+
+    def acquire(self, session_id, owner):
+        return self.store.acquire_lease(session_id, owner, SESSION_LEASE_SECONDS)
+
+    def release(self, session_id, owner):
+        self.store.release_lease(session_id, owner)
+
+    def save(self, ctx, rewrite=False, expected_version=None):
+        # Checkpoints only append, so removals need the session written afresh
+        return self.store.checkpoint(
+            ctx.session_id,
+            ctx.message_log,
+            ctx.document_contents,
+            ctx.uploaded_files,
+            ctx.vector_store,
+            expected_version,
+            rewrite=rewrite
+        )
+
+    def delete(self, session_id):
+        self.store.delete(session_id)
+
+SESSION_BACKENDS = {
+    "memory": MemorySessionBackend,
+    "sqlite": SqliteSessionBackend
+}
+
+class SessionManager:
+    """Live sessions of this worker on top of a backend, with one operation at a time per session
+
+    Within a worker a session is serialised by an asyncio lock; across workers by
+    a lease in the backend. Checkpoints name the version they were based on, so a
+    worker whose lease lapsed cannot overwrite turns written by another.
+    """
+
+    def __init__(self, backend, capacity=API_LIVE_SESSIONS):
+        self.backend = backend
+        self.capacity = capacity
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._live = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _track(self, ctx, version):
+        """Keep a session live, dropping the least recently used ones over capacity"""
+        memory_governor.register(ctx.session_id, ctx.vector_store, ctx.document_contents)
+        with self._lock:
+            self._live[ctx.session_id] = (ctx, version)
+            self._live.move_to_end(ctx.session_id)
+            while len(self._live) > self.capacity:
+                # The backend still has it; it is reloaded on its next request
+                session_id, _ = self._live.popitem(last=False)
+                lock = self._locks.get(session_id)
+                if lock is not None and not lock.locked():
+                    del self._locks[session_id]
+
+    def create(self):
+        """Start a new conversation"""
+        ctx = new_session_context()
+        self.save(ctx)
+        return ctx
+
+    def load(self, session_id):
+        """Live context of a session, reloaded if another worker changed it"""
+        version = self.backend.version(session_id) if valid_session_id(session_id) else None
+        if version is None:
+            raise KeyError(session_id)
+
+        with self._lock:
+            live = self._live.get(session_id)
+            if live is not None and live[1] == version:
+                self._live.move_to_end(session_id)
+        if live is None or live[1] != version:
+            ctx = self.backend.load(session_id)
+            if ctx is None:
+                raise KeyError(session_id)
+            self._track(ctx, version)
+            live = (ctx, version)
+
+            # Account the restored index right away, not only after the next upload
+            memory_governor.update(session_id)
+
+        # Bring the index back from disk if this session was evicted
+        memory_governor.touch(session_id, live[0].message_log)
+        return live[0]
+
+    def save(self, ctx, rewrite=False):
+        """Persist a session on top of the version this worker holds and remember the new one"""
+        with self._lock:
+            live = self._live.get(ctx.session_id)
+        try:
+            version = self.backend.save(ctx, rewrite, live[1] if live is not None else None)
+        except StaleSession:
+            # Another worker wrote the session; reload it on the next request
+            with self._lock:
+                self._live.pop(ctx.session_id, None)
+            raise
+        self._track(ctx, version)
+
+    def claim(self, session_id):
+        """Try to take a session's cross-worker lease"""
+        return self.backend.acquire(session_id, self.owner)
+
+    def unclaim(self, session_id):
+        """Give up a session's cross-worker lease"""
+        self.backend.release(session_id, self.owner)
+
+    def delete(self, session_id):
+        """Forget a session everywhere"""
+        self.backend.delete(session_id)
+        with self._lock:
+            self._live.pop(session_id, None)
+            self._locks.pop(session_id, None)
+
+    def lock(self, session_id):
+        """Lock serialising turns and uploads of one session within this worker"""
+        with self._lock:
+            return self._locks.setdefault(session_id, asyncio.Lock())
+
+    def live_count(self):
+        return len(self._live)
+
+class ChatRequest(BaseModel):
+    message: str
+
+class ProfileRequest(BaseModel):
+    every_call: bool = False
+
+app = FastAPI(title="Zerthia API")
+sessions = SessionManager(SESSION_BACKENDS[SESSION_BACKEND]())
+pipeline_executor = ThreadPoolExecutor(max_workers=API_PIPELINE_THREADS, thread_name_prefix="pipeline")
+
+# Map the shared knowledge base once per worker, before the first request
+knowledge_base.load()
+
+def persist(ctx, rewrite=False):
+    """Save a session, logging rather than failing the request"""
+    try:
+        sessions.save(ctx, rewrite)
+    except Exception as e:
+        logger.error("Session checkpoint failed: %s", e)
+
+def run_turn(ctx, message, on_token=None):
+    """Answer one user message on a session and persist the turn"""
+    append_message(ctx, "user", message)
+    ctx.processing = True
+    process_query(ctx, on_token)
+    persist(ctx)
+    return ctx.message_log[-1]
+
+def ingest_document(ctx, document):
+    """Process an uploaded document into a session"""
+    num_chunks, error = process_document_file(ctx, document)
+    if num_chunks > 0:
+        record_upload(ctx, document.name, document.name.split('.')[-1].upper(), num_chunks)
+        persist(ctx)
+    return num_chunks, error
+
+def drop_document(ctx, file_name):
+    """Remove a document from a session, returning None if it was never uploaded"""
+    if file_name not in ctx.uploaded_files:
+        return None
+    removed = remove_document(ctx, file_name)
+    persist(ctx, rewrite=True)
+    return removed
+
+async def run_in_pipeline(func, *args):
+    """Run blocking pipeline code off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pipeline_executor, functools.partial(func, *args))
+
+async def load_session(session_id):
+    """Load a session or answer 404"""
+    try:
+        return await run_in_pipeline(sessions.load, session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+async def claim_session(session_id, wait=None):
+    """Wait until no other worker is running an operation on a session, or answer 409"""
+    if not valid_session_id(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    # A worker that died holding the lease would otherwise stall requests until it lapses
+    deadline = time.monotonic() + (SESSION_LEASE_WAIT if wait is None else wait)
+    while not await run_in_pipeline(sessions.claim, session_id):
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="Session is busy in another worker, try again later",
+                headers={"Retry-After": str(round(TURN_LATENCY_BUDGET))}
+            )
+        await asyncio.sleep(SESSION_LEASE_POLL)
+
+async def start_locked(session_id, func, *args):
+    """Start a pipeline function on a locked session and return its future"""
+    lock = sessions.lock(session_id)
+    await lock.acquire()
+    try:
+        await claim_session(session_id)
+        try:
+            # Loaded after the claim, so turns written by other workers are picked up
+            ctx = await load_session(session_id)
+        except BaseException:
+            await run_in_pipeline(sessions.unclaim, session_id)
+            raise
+    except BaseException:
+        lock.release()
+        raise
+
+    def work():
+        try:
+            return func(ctx, *args)
+        finally:
+            sessions.unclaim(session_id)
+
+    # The session stays locked until the work finishes, even if the client goes away
+    future = asyncio.get_running_loop().run_in_executor(pipeline_executor, work)
+    future.add_done_callback(lambda _: lock.release())
+    return future
+
+async def run_locked(session_id, func, *args):
+    """Run a pipeline function on a locked session"""
+    future = await start_locked(session_id, func, *args)
+    return await asyncio.shield(future)
+
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/sessions")
+async def create_session():
+    ctx = await run_in_pipeline(sessions.create)
+    return {"session_id": ctx.session_id, "messages": ctx.message_log}
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    ctx = await load_session(session_id)
+    return {
+        "session_id": session_id,
+        "messages": list(ctx.message_log),
+        "documents": list(ctx.uploaded_files)
+    }
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    await run_locked(session_id, lambda ctx: sessions.delete(ctx.session_id))
+    return {"deleted": session_id}
+
+@app.post("/sessions/{session_id}/chat")
+async def chat(session_id: str, request: ChatRequest):
+    if not request.message.strip():
+        raise HTTPException(status_code=422, detail="Message is empty")
+    try:
+        record = await run_locked(session_id, run_turn, request.message)
+    except MemoryLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"message": record}
+
+@app.post("/sessions/{session_id}/chat/stream")
+async def chat_stream(session_id: str, request: ChatRequest):
+    """Stream answer text as "token" events, then the final record as a "message" event
+
+    Streamed text is never repeated: once a token is sent, a failure ends the
+    answer there, and the final record holds the partial answer with the error
+    in its reasoning.
+    """
+    if not request.message.strip():
+        raise HTTPException(status_code=422, detail="Message is empty")
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def on_token(text):
+        loop.call_soon_threadsafe(queue.put_nowait, text)
+
+    future = await start_locked(session_id, run_turn, request.message, on_token)
+    future.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def events():
+        while True:
+            text = await queue.get()
+            if text is None:
+                break
+            yield sse_event("token", {"text": text})
+        try:
+            yield sse_event("message", future.result())
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/sessions/{session_id}/documents")
+async def list_documents(session_id: str):
+    ctx = await load_session(session_id)
+    return {
+        "documents": [
+            {"name": name, "characters": len(ctx.document_contents.get(name, ""))}
+            for name in ctx.uploaded_files
+        ]
+    }
+
+@app.post("/sessions/{session_id}/documents")
+async def upload_document(session_id: str, file: UploadFile = File(...)):
+    # Never let a client-supplied name reach outside the working directory
+    name = os.path.basename(file.filename or "")
+    if not name:
+        raise HTTPException(status_code=422, detail="File name is missing")
+
+    document = UploadedDocument(name, await file.read())
+    num_chunks, error = await run_locked(session_id, ingest_document, document)
+    if num_chunks == 0:
+        raise HTTPException(status_code=422, detail=error or "Document has no content")
+    return {"document": name, "chunks": num_chunks}
+
+@app.delete("/sessions/{session_id}/documents/{file_name}")
+async def delete_document(session_id: str, file_name: str):
+    removed = await run_locked(session_id, drop_document, file_name)
+    if removed is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"document": file_name, "chunks_removed": removed}
+
+@app.post("/sessions/{session_id}/profile")
+async def profile_session(session_id: str, request: ProfileRequest = ProfileRequest()):
+    """Profile the session's next chat turn or upload, or every one until profiling is deleted"""
+    await load_session(session_id)
+    if request.every_call:
+        profiler.enable_session(session_id)
+    else:
+        profiler.profile_next(session_id)
+    return {"session_id": session_id, "every_call": request.every_call, "output_dir": profiler.output_dir}
+
+@app.delete("/sessions/{session_id}/profile")
+async def stop_profiling(session_id: str):
+    profiler.disable_session(session_id)
+    return {"session_id": session_id, "every_call": False}
+
+@app.get("/profiles")
+async def list_profiles():
+    return profiler.stats()
+
+@app.get("/metrics")
+async def scrape_metrics():
+    """This worker's metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "live_sessions": sessions.live_count(),
+        "queue_depth": gateway.queue_depth(),
+        "tracing": tracer.stats(),
+        "sharded_search": shard_pool.stats(),
+        "knowledge_base": knowledge_base.stats(),
+        "embedding_migrations": migrator.stats(),
+        "web_compression": compression_stats.snapshot()
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if SESSION_BACKEND == "memory" and API_WORKERS > 1:
+        logger.warning("The memory session backend is per worker; use SESSION_BACKEND=sqlite with several workers")
+    uvicorn.run("api_server:app", host=API_HOST, port=API_PORT, workers=API_WORKERS)
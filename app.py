@@ -4,25 +4,46 @@
 # Description: Main application file that orchestrates the entire application
 # Author: LALAN KUMAR
 # Created: [15-03-2025]
-# Updated: [24-03-2025]
+# Updated: [19-10-2026]
 # Version: 1.0.0
 # License: [License Type, e.g., MIT]
 # ===================================================================================
     
 import os
+import logging
+import time
 import streamlit as st
 from dotenv import load_dotenv
-from interface import setup_interface, display_messages, display_document_list
-from document_manager import process_document_file
-from state_management import initialize_session_state, update_session_state
-from agent import handle_user_query, process_query
+from interface import setup_interface, display_messages, display_document_list, render_message, render_message_content
+from document_manager import process_document_file, SUPPORTED_EXTENSIONS
+from memory_governor import MemoryLimitExceeded
+from state_management import initialize_session_state, get_session_context, update_session_state, append_message, checkpoint_session
+from agent import process_query
+from tracing import tracer
+from profiling import profiler, PROFILE_FROM_URL
 
 # Load environment variables
 load_dotenv()
 
+# Pipeline modules report through logging; LOG_LEVEL sets how much is shown
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# Process CPU time at the start of this script run; the tool and hedge pools work on other threads
+run_cpu_start = time.process_time()
+
 # Initialize session state
 initialize_session_state()
 
+# Pipeline context of this session; everything below only adapts it to the UI
+ctx = get_session_context()
+
+# Count script runs so per-turn rerun cost can be measured
+st.session_state.script_runs += 1
+
+# Profile this session's turns and uploads when asked to in the URL
+if PROFILE_FROM_URL and st.query_params.get("profile") == "1":
+    profiler.enable_session(ctx.session_id)
+
 # Set up the interface
 setup_interface()
 
@@ -35,16 +56,11 @@ chat_container = st.container()
 
 # Display message history
 with chat_container:
-    display_messages()
-    
-    # Show processing indicator only when processing
-    if st.session_state.processing:
-        with st.chat_message("ai"):
-            st.write("Processing...")
+    display_messages(ctx)
 
 # Display uploaded documents if any
-if st.session_state.uploaded_files:
-    display_document_list()
+if ctx.uploaded_files:
+    display_document_list(ctx)
 
 # Create a container for the upload button and chat input
 input_container = st.container()
@@ -67,7 +83,7 @@ with input_container:
 if st.session_state.show_uploader:
     uploaded_file = st.file_uploader(
         "Upload Document",
-        type=["pdf", "docx", "txt", "pptx", "ppt", "csv"],
+        type=SUPPORTED_EXTENSIONS,
         key="document_uploader"
     )
     
@@ -75,31 +91,50 @@ if st.session_state.show_uploader:
     if uploaded_file and (st.session_state.last_uploaded_file != uploaded_file.name):
         file_extension = uploaded_file.name.split('.')[-1].lower()
         with st.spinner(f"Processing {uploaded_file.name}..."):
-            num_chunks, error = process_document_file(uploaded_file)
+            num_chunks, error = process_document_file(ctx, uploaded_file)
             
             if num_chunks > 0:
                 # Update state
-                update_session_state(uploaded_file.name, file_extension.upper(), num_chunks)
+                update_session_state(ctx, uploaded_file.name, file_extension.upper(), num_chunks)
                 
                 # Rerun to update UI
                 st.rerun()
             else:
                 st.error(f"Failed to process document '{uploaded_file.name}': {error}")
 
-# Handle user input
+# A session at its memory cap takes no new turns
 if user_query:
-    # Add user message to chat history immediately
-    st.session_state.message_log.append({"role": "user", "content": user_query})
-    st.session_state.processing = True
-    st.rerun()
-
-# Continue processing if in processing state
-if st.session_state.processing:
-    # Process the query
-    process_query()
-    
-    # Rerun to update the UI
-    st.rerun()
-    
-    
+    try:
+        append_message(ctx, "user", user_query)
+        
+        # Runs and CPU are counted from the run that received the message, across any reruns
+        st.session_state.pending_turn = {"run": st.session_state.script_runs, "cpu": run_cpu_start}
+    except MemoryLimitExceeded as e:
+        st.error(f"{str(e)}. Start a new conversation to continue.")
+        user_query = None
+
+# Handle user input in this same script run
+if user_query:
+    # Show the user message right away
+    with chat_container:
+        render_message(ctx.message_log[-1])
+        
+        # Generate and show the answer in place instead of rerunning the script
+        with st.chat_message("ai"), tracer.span("chat_turn", session_id=ctx.session_id):
+            ctx.processing = True
+            with st.spinner(""):
+                process_query(ctx)
+            
+            ai_message = ctx.message_log[-1]
+            with tracer.span("render", answer_chars=len(ai_message["content"])):
+                render_message_content(ai_message)
+        
+        # Record how many script runs and how much CPU the turn cost until its answer was shown
+        pending_turn = st.session_state.pop("pending_turn")
+        ai_message.setdefault("usage", {}).update({
+            "script_runs": st.session_state.script_runs - pending_turn["run"] + 1,
+            "script_cpu_ms": round((time.process_time() - pending_turn["cpu"]) * 1000, 1)
+        })
     
+    # Persist the new turn so a refresh can restore it
+    checkpoint_session(ctx)
@@ -0,0 +1,146 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: batch_qa.py
+# Description: Command-line batch question answering over a directory of documents
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from session_context import SessionContext
+from state_management import new_session_context, append_message, record_upload
+from document_manager import process_document_file, UploadedDocument, SUPPORTED_EXTENSIONS
+from agent import process_query
+from metrics import percentile
+
+# Load environment variables
+load_dotenv()
+
+# Questions answered at once unless --concurrency says otherwise
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+def ingest_directory(ctx, directory):
+    """Load every supported document in a directory into one session, once"""
+
+    for file_name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file_name)
+        extension = file_name.split('.')[-1].lower()
+        if not os.path.isfile(path) or extension not in SUPPORTED_EXTENSIONS:
+            continue
+
+        start = time.perf_counter()
+        num_chunks, error = process_document_file(ctx, UploadedDocument.from_path(path))
+        if num_chunks > 0:
+            record_upload(ctx, file_name, extension.upper(), num_chunks)
+            print(f"Ingested {file_name}: {num_chunks} chunks in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        else:
+            print(f"Skipped {file_name}: {error}", file=sys.stderr)
+
+def read_questions(path):
+    """Read {"id", "question"} records from a JSONL file; ids default to the line number"""
+
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            questions.append({"id": record.get("id", line_number), **record})
+    return questions
+
+def answer_question(documents, record):
+    """Answer one question in its own conversation over the shared documents"""
+
+    # The index and documents are shared read-only; only the history is per question
+    ctx = SessionContext(
+        f"{documents.session_id}-{record['id']}",
+        documents.vector_store,
+        document_contents=documents.document_contents,
+        uploaded_files=documents.uploaded_files
+    )
+    append_message(ctx, "user", record["question"])
+
+    start = time.perf_counter()
+    try:
+        process_query(ctx)
+        error = None
+    except Exception as e:
+        error = str(e)
+    latency = time.perf_counter() - start
+
+    answer = ctx.message_log[-1] if ctx.message_log[-1]["role"] == "ai" else {}
+    usage = answer.get("usage", {})
+    return {
+        **record,
+        "answer": answer.get("content"),
+        "route": usage.get("policy"),
+        "latency_ms": round(latency * 1000, 1),
+        "answer_tokens": usage.get("answer_tokens", 0),
+        "reasoning_tokens": usage.get("reasoning_tokens", 0),
+        "error": error
+    }
+
+def summarize(results, wall_time):
+    """Latency, throughput and token totals for a batch"""
+
+    latencies = [result["latency_ms"] for result in results]
+    return {
+        "questions": len(results),
+        "errors": sum(1 for result in results if result["error"]),
+        "wall_time_s": round(wall_time, 2),
+        "questions_per_s": round(len(results) / wall_time, 2) if wall_time else 0.0,
+        "latency_p50_ms": percentile(latencies, 0.5),
+        "latency_p95_ms": percentile(latencies, 0.95),
+        "latency_max_ms": max(latencies, default=0.0),
+        "answer_tokens": sum(result["answer_tokens"] for result in results),
+        "reasoning_tokens": sum(result["reasoning_tokens"] for result in results)
+    }
+
+def run_batch(documents_dir, questions_path, output_path, concurrency=BATCH_CONCURRENCY):
+    """Ingest the documents, answer every question on a worker pool and write JSONL results"""
+
+    documents = new_session_context(f"batch{int(time.time())}")
+    if documents_dir:
+        ingest_directory(documents, documents_dir)
+
+    questions = read_questions(questions_path)
+    results = []
+    start = time.perf_counter()
+
+    # Results are written in input order as soon as each one is ready
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor, \
+            open(output_path, "w", encoding="utf-8") as output:
+        for result in executor.map(lambda record: answer_question(documents, record), questions):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            results.append(result)
+
+    return summarize(results, time.perf_counter() - start)
+
+def main(argv=None):
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions against a directory of documents")
+    parser.add_argument("--documents", help="Directory of documents to ingest once before answering")
+    parser.add_argument("--questions", required=True, help="JSONL file with one {\"id\", \"question\"} record per line")
+    parser.add_argument("--output", required=True, help="JSONL file to write answers and statistics to")
+    parser.add_argument(
+        "--concurrency", type=int, default=BATCH_CONCURRENCY,
+        help="Questions answered at once; provider rate limits still apply (see GROQ_REQUESTS_PER_MINUTE)"
+    )
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.documents, args.questions, args.output, max(1, args.concurrency))
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/conftest.py
+# Description: Offline provider setup and JSON baseline regression checks for benchmarks
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import sys
+import json
+import timeit
+import warnings
+from pathlib import Path
+
+# Benchmarks never reach a provider: placeholder keys, no rate limiting, no trace files, quiet bare-mode Streamlit
+for key in ("GROQ_API_KEY", "TAVILY_API_KEY", "COHERE_API_KEY"):
+    os.environ.setdefault(key, "offline")
+for provider in ("GROQ", "TAVILY", "COHERE"):
+    os.environ.setdefault(f"{provider}_REQUESTS_PER_MINUTE", "1000000")
+    os.environ.setdefault(f"{provider}_BURST", "100000")
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from langchain_core.vectorstores import InMemoryVectorStore
+from session_context import SessionContext
+from fakes import HashingEmbeddings, FakeTavily, fake_chat_model
+
+# Baselines are best-round times divided by the calibration workload's time, so they travel across machines
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+
+# A benchmark fails when it is this much slower than its baseline (1.0 = twice as slow)
+MAX_REGRESSION = float(os.getenv("BENCHMARK_MAX_REGRESSION", "1.0"))
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-baselines", action="store_true", default=False,
+        help="Record this run's timings as the new benchmarks/baselines.json"
+    )
+
+def _calibration_workload():
+    total = 0
+    for i in range(200000):
+        total += (i * i) % 7
+    return total
+
+class BaselineRecorder:
+    """Compares normalised benchmark timings with the recorded baselines"""
+
+    def __init__(self, path, update):
+        self.path = path
+        self.update = update
+        self.baselines = json.loads(path.read_text())["benchmarks"] if path.exists() else {}
+        self.results = {}
+
+    def check(self, name, ratio):
+        self.results[name] = ratio
+        if self.update:
+            return
+
+        baseline = self.baselines.get(name)
+        if baseline is None:
+            warnings.warn(f"No baseline for {name}; record one with --update-baselines")
+        elif ratio > baseline * (1 + MAX_REGRESSION):
+            pytest.fail(f"{name} regressed to {ratio / baseline:.2f}x its baseline")
+
+    def save(self):
+        merged = {**self.baselines, **{name: float(f"{ratio:.4g}") for name, ratio in self.results.items()}}
+        self.path.write_text(json.dumps({
+            "unit": "fastest round seconds / calibration seconds",
+            "benchmarks": dict(sorted(merged.items()))
+        }, indent=2) + "\n")
+
+@pytest.fixture
+def calibration():
+    """Seconds a fixed pure-Python workload takes on this machine right now
+
+    Measured next to every benchmark so drifting machine speed cancels out.
+    """
+    return min(timeit.repeat(_calibration_workload, number=1, repeat=5))
+
+@pytest.fixture(scope="session")
+def baselines(request):
+    recorder = BaselineRecorder(BASELINES_PATH, request.config.getoption("--update-baselines"))
+    yield recorder
+    if recorder.update and recorder.results:
+        recorder.save()
+
+@pytest.fixture
+def bench(benchmark, baselines, calibration, request):
+    """Run a benchmark and fail if it regressed against its JSON baseline
+
+    With setup, each round gets fresh arguments from setup() and is timed once.
+    """
+    def run(func, *args, setup=None, rounds=5, **kwargs):
+        if setup is None:
+            result = benchmark(func, *args, **kwargs)
+        else:
+            result = benchmark.pedantic(func, setup=setup, rounds=rounds, warmup_rounds=1)
+
+        # The fastest round is the least disturbed by other load; nothing to compare when timing is disabled
+        if benchmark.stats is not None:
+            name = f"{Path(request.node.fspath).stem}::{request.node.name}"
+            baselines.check(name, benchmark.stats.stats.min / calibration)
+        return result
+    return run
+
+@pytest.fixture(scope="session")
+def embeddings():
+    return HashingEmbeddings()
+
+@pytest.fixture
+def make_context(embeddings):
+    """Factory for empty session contexts on the fake embeddings"""
+    def make(session_id="benchmark-session"):
+        return SessionContext(session_id, InMemoryVectorStore(embedding=embeddings))
+    return make
+
+@pytest.fixture
+def fake_providers(monkeypatch):
+    """Swap the LLM tiers and the search client for offline fakes"""
+    import agent
+
+    monkeypatch.setattr(agent.model_tiers["fast"], "llm", fake_chat_model("fake-fast"))
+    monkeypatch.setattr(agent.model_tiers["reasoning"], "llm", fake_chat_model("fake-reasoning"))
+    monkeypatch.setattr(agent, "tavily_client", FakeTavily())
+    return agent
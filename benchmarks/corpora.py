@@ -0,0 +1,106 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/corpora.py
+# Description: Seeded synthetic TXT, CSV and PDF corpora at several sizes
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import random
+
+# Paragraphs (TXT, PDF) or rows (CSV) per corpus size
+SIZES = {
+    "small": 20,
+    "medium": 200,
+    "large": 1000
+}
+
+_TOPICS = ["zebra", "glacier", "satellite", "orchard", "turbine", "harbor", "quartz", "lantern"]
+_WORDS = (
+    "the project team reported steady progress across regions while budgets remained "
+    "within limits and several risks were noted for review by the steering committee "
+    "during quarterly planning sessions that covered delivery timelines staffing and costs"
+).split()
+
+def paragraphs(size, seed=7):
+    """Deterministic paragraphs, each mentioning one topic word"""
+    rng = random.Random(seed)
+    result = []
+    for i in range(SIZES[size]):
+        topic = _TOPICS[i % len(_TOPICS)]
+        sentences = []
+        for _ in range(rng.randint(4, 7)):
+            words = rng.choices(_WORDS, k=rng.randint(8, 16))
+            words.insert(rng.randint(0, len(words)), topic)
+            sentences.append(" ".join(words).capitalize() + ".")
+        result.append(" ".join(sentences))
+    return result
+
+def text_corpus(size):
+    """Plain text document"""
+    return "\n\n".join(paragraphs(size))
+
+def csv_corpus(size, seed=7):
+    """CSV table with numeric and text columns"""
+    rng = random.Random(seed)
+    lines = ["id,region,topic,amount,note"]
+    for i in range(SIZES[size]):
+        note = " ".join(rng.choices(_WORDS, k=6))
+        lines.append(f"{i},region{i % 12},{_TOPICS[i % len(_TOPICS)]},{rng.randint(10, 99999)},{note}")
+    return "\n".join(lines) + "\n"
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def pdf_corpus(size, line_width=90, lines_per_page=50):
+    """Minimal multi-page PDF with the text corpus set in Helvetica"""
+    lines = []
+    for paragraph in paragraphs(size):
+        words, line = paragraph.split(), ""
+        for word in words:
+            if len(line) + len(word) + 1 > line_width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.extend([line, ""])
+
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Objects 1-3 are the catalog, page tree and font; each page adds a page and a content stream
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    for page_id, page_lines in zip(page_ids, pages):
+        text = " T* ".join(f"({_pdf_escape(line)}) Tj" for line in page_lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 790 Td {text} ET".encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+def chunk_corpus(count, seed=11):
+    """Pre-chunked texts with metadata for building indexes directly"""
+    base = paragraphs("large", seed)
+    texts = [f"{base[i % len(base)]} Section {i}." for i in range(count)]
+    metadatas = [{"source": f"report{i % 10}.txt", "start_index": (i // 10) * 900} for i in range(count)]
+    return texts, metadatas
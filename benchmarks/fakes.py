@@ -0,0 +1,70 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/fakes.py
+# Description: Deterministic offline stand-ins for the embedding, LLM and search providers
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import re
+import zlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words vectors over hashed tokens, so texts sharing words score as similar"""
+
+    def __init__(self, size=1024):
+        self.size = size
+
+    def _embed(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            vector[zlib.crc32(token.encode()) % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+class FakeChatModel(FakeListChatModel):
+    """Canned chat model that answers with a DeepSeek-R1 style reasoning block"""
+
+    model_name: str = "fake"
+
+def fake_chat_model(name):
+    return FakeChatModel(
+        model_name=name,
+        responses=["<think>The user wants a short, grounded answer.</think>\n\nHere is a concise answer citing Source 1."]
+    )
+
+class FakeTavily:
+    """Search client returning fixed results shaped like Tavily's"""
+
+    def __init__(self, results=5):
+        self.results = results
+
+    def search(self, query, search_depth="basic", max_results=5, **kwargs):
+        return {
+            "results": [
+                {
+                    "title": f"Result {i} for {query}",
+                    "url": f"https://example.com/{i}",
+                    "content": (
+                        f"{query.capitalize()} is covered in this article. "
+                        "It gives background that is mostly unrelated filler text. "
+                        f"Experts add a further note about {query}. Another sentence pads the page."
+                    ) * 3
+                }
+                for i in range(min(max_results, self.results))
+            ]
+        }
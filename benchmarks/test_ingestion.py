@@ -0,0 +1,36 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/test_ingestion.py
+# Description: Benchmarks for loading, splitting and indexing uploaded documents
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import pytest
+import corpora
+from document_manager import process_document_file, UploadedDocument
+
+CORPORA = {
+    "txt": lambda size: corpora.text_corpus(size).encode(),
+    "csv": lambda size: corpora.csv_corpus(size).encode(),
+    "pdf": corpora.pdf_corpus
+}
+
+# PDF parsing dominates everything else, so the large PDF is left out to keep runs short
+CASES = [(kind, size) for kind in ("txt", "csv") for size in corpora.SIZES] + [("pdf", "small"), ("pdf", "medium")]
+
+@pytest.mark.parametrize("kind,size", CASES, ids=[f"{kind}-{size}" for kind, size in CASES])
+def test_process_document_file(bench, make_context, tmp_path, monkeypatch, kind, size):
+    # Loaders read from a temporary file in the working directory
+    monkeypatch.chdir(tmp_path)
+    document = UploadedDocument(f"corpus_{size}.{kind}", CORPORA[kind](size))
+
+    def setup():
+        return (make_context(), document), {}
+
+    num_chunks, error = bench(process_document_file, setup=setup, rounds=3 if kind == "pdf" else 5)
+    assert error is None
+    assert num_chunks > 0
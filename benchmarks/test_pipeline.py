@@ -0,0 +1,44 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/test_pipeline.py
+# Description: End-to-end turn benchmarks with fake LLM, search and embedding providers
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import pytest
+import corpora
+from state_management import append_message
+
+TURNS = {
+    "chat": "how are you doing this evening",
+    "web": "what is the latest news about glacier research",
+    "documents": "what does the document say about zebra budgets"
+}
+
+@pytest.mark.parametrize("intent", list(TURNS))
+def test_process_query(bench, make_context, fake_providers, intent):
+    texts, metadatas = corpora.chunk_corpus(500)
+
+    def setup():
+        ctx = make_context(f"pipeline-{intent}")
+        # Loaded documents are searched before the web, so the web turn runs without any
+        if intent != "web":
+            ctx.vector_store.add_texts(texts, metadatas=metadatas)
+            ctx.document_contents = {"report.txt": "\n\n".join(texts)}
+            ctx.uploaded_files = ["report.txt"]
+            ctx.has_documents = True
+        append_message(ctx, "user", TURNS[intent])
+        return (ctx,), {}
+
+    captured = {}
+
+    def turn(ctx):
+        fake_providers.process_query(ctx)
+        captured["record"] = ctx.message_log[-1]
+
+    bench(turn, setup=setup)
+    assert captured["record"]["usage"]["policy"] == intent
@@ -0,0 +1,41 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/test_rendering.py
+# Description: Benchmarks for prompt building and chat history rendering
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import pytest
+import streamlit as st
+from agent import build_prompt_chain
+from interface import display_messages
+from state_management import make_message
+
+def history(turns):
+    """Alternating user and answer records, answers carrying reasoning"""
+    messages = []
+    for i in range(turns):
+        messages.append(make_message("user", f"Question {i}: what changed in section {i} of the report?"))
+        messages.append(make_message("ai", f"<think>Looking at section {i}.</think>Section {i} **changed** the budget. " * 4))
+    return messages
+
+@pytest.mark.parametrize("turns", [5, 50, 500])
+def test_build_prompt_chain(bench, make_context, turns):
+    ctx = make_context()
+    ctx.message_log = history(turns)
+
+    messages = bench(build_prompt_chain, ctx)
+    assert len(messages) == 2 * turns + 1
+
+@pytest.mark.parametrize("turns", [5, 50, 500])
+def test_display_messages(bench, make_context, turns):
+    # Rendered in Streamlit's bare mode: element construction without a browser
+    st.session_state.history_pages = 0
+    ctx = make_context()
+    ctx.message_log = history(turns)
+
+    bench(display_messages, ctx)
@@ -0,0 +1,42 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/test_retrieval.py
+# Description: Benchmarks for document retrieval and context packing
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import pytest
+import corpora
+from document_manager import query_documents
+
+QUERIES = [
+    "what did the steering committee say about zebra budgets",
+    "summarize the glacier delivery timelines",
+    "which risks were noted for the satellite project",
+    "staffing and costs for the harbor"
+]
+
+@pytest.fixture(scope="module", params=[100, 1000, 5000])
+def indexed_context(request, embeddings):
+    from langchain_core.vectorstores import InMemoryVectorStore
+    from session_context import SessionContext
+
+    texts, metadatas = corpora.chunk_corpus(request.param)
+    ctx = SessionContext(f"retrieval-{request.param}", InMemoryVectorStore(embedding=embeddings))
+    ctx.vector_store.add_texts(texts, metadatas=metadatas)
+    ctx.document_contents = {f"report{i}.txt": "\n\n".join(texts[i::10]) for i in range(10)}
+    ctx.uploaded_files = list(ctx.document_contents)
+    ctx.has_documents = True
+    return ctx
+
+@pytest.mark.parametrize("mmr", [True, False], ids=["mmr", "similarity"])
+def test_query_documents(bench, indexed_context, mmr):
+    def run():
+        return [query_documents(indexed_context, query, mmr=mmr) for query in QUERIES]
+
+    results = bench(run)
+    assert all(result.startswith("Document") or "Source" in result or result for result in results)
@@ -0,0 +1,43 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: benchmarks/test_routing.py
+# Description: Benchmarks for query routing
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import pytest
+from agent import needs_web_search, needs_document_search
+
+# A mix that exercises the pattern matcher and the embedding fallback
+QUERIES = [
+    "hello there",
+    "how are you today",
+    "what is the latest news about the election",
+    "search for cheap flights to lisbon",
+    "what is the population of canada",
+    "what does the document say about revenue",
+    "summarize the document",
+    "explain the conclusions of the report",
+    "tell me a joke about cats",
+    "could you walk me through the methodology section",
+    "which team won the championship",
+    "i feel a bit lost this week"
+]
+
+@pytest.mark.parametrize("has_documents", [False, True], ids=["no-documents", "with-documents"])
+def test_routing(bench, make_context, fake_providers, has_documents):
+    ctx = make_context()
+    if has_documents:
+        ctx.uploaded_files = ["report.pdf", "notes.txt"]
+        ctx.has_documents = True
+
+    def run():
+        return [(needs_web_search(ctx, query), needs_document_search(ctx, query)) for query in QUERIES]
+
+    decisions = bench(run)
+    assert len(decisions) == len(QUERIES)
+    assert decisions[2][0]
@@ -0,0 +1,111 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: context_packer.py
+# Description: Packs retrieved chunks into a compact, token-budgeted context
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+
+# Hits scoring below this cosine similarity are dropped
+SIMILARITY_CUTOFF = float(os.getenv("CONTEXT_SIMILARITY_CUTOFF", "0.25"))
+
+# Approximate token budget for the packed document context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Characters allowed between two chunks for them to count as adjacent
+ADJACENCY_GAP = 2
+
+# Metadata keys that differ between chunks of the same source passage
+_POSITION_KEYS = {"start_index", "headers"}
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+def _group_key(metadata):
+    """Chunks sharing everything but their position come from the same passage"""
+    return tuple(sorted((key, str(value)) for key, value in metadata.items() if key not in _POSITION_KEYS))
+
+class _Span:
+    """A contiguous stretch of text from one source passage"""
+
+    def __init__(self, doc, score):
+        self.metadata = doc.metadata
+        self.source = doc.metadata.get("source", "Unknown")
+        self.start = doc.metadata.get("start_index", -1)
+        self.text = doc.page_content
+        self.score = score
+        # Source position after the span; joined gaps make it differ from start + len(text)
+        self.end = self.start + len(self.text)
+
+    def absorb(self, other):
+        """Append a later, overlapping or adjacent span without repeating text"""
+        overlap = self.end - other.start
+        if overlap >= 0:
+            self.text += other.text[overlap:]
+        else:
+            self.text += "\n" + other.text
+        self.end = other.end
+        self.score = max(self.score, other.score)
+
+def merge_chunks(scored_docs):
+    """Merge overlapping or adjacent chunks from the same passage using start_index"""
+    groups = {}
+    for doc, score in scored_docs:
+        groups.setdefault(_group_key(doc.metadata), []).append(_Span(doc, score))
+
+    merged = []
+    for spans in groups.values():
+        # Spans without a position cannot be merged safely
+        positioned = sorted((span for span in spans if span.start >= 0), key=lambda span: span.start)
+        merged.extend(span for span in spans if span.start < 0)
+
+        current = None
+        for span in positioned:
+            if current is not None and span.start <= current.end + ADJACENCY_GAP:
+                if span.end > current.end:
+                    current.absorb(span)
+                else:
+                    current.score = max(current.score, span.score)
+            else:
+                current = span
+                merged.append(current)
+
+    # Best passages first
+    merged.sort(key=lambda span: span.score, reverse=True)
+    return merged
+
+def pack_context(scored_docs, token_budget=CONTEXT_TOKEN_BUDGET, cutoff=SIMILARITY_CUTOFF):
+    """Build the document context from (document, score) hits within a token budget"""
+    relevant = [(doc, score) for doc, score in scored_docs if score >= cutoff]
+    spans = merge_chunks(relevant)
+
+    sections = []
+    used_tokens = 0
+    headers_emitted = set()
+    for span in spans:
+        # Shared CSV headers are emitted once per source
+        header_line = ""
+        if "headers" in span.metadata and span.source not in headers_emitted:
+            header_line = f"CSV Headers: {', '.join(span.metadata['headers'])}\n"
+
+        section = f"Document: {span.source}\n{header_line}Content: {span.text}"
+        cost = estimate_tokens(section)
+        if used_tokens + cost > token_budget:
+            if sections:
+                continue
+            # Always keep something from the best passage
+            section = section[:token_budget * 4]
+            cost = token_budget
+
+        if header_line:
+            headers_emitted.add(span.source)
+        sections.append(section)
+        used_tokens += cost
+
+    return "\n\n".join(sections), used_tokens
@@ -0,0 +1,251 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: corpus_snapshot.py
+# Description: Builds versioned knowledge-base snapshots and memory-maps them for search
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from embedding_index import embedding_model_id
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Directory holding snapshot versions and the CURRENT pointer; missing means no shared corpus
+CORPUS_SNAPSHOT_DIR = os.getenv("CORPUS_SNAPSHOT_DIR", "corpus")
+
+# Snapshot versions kept on disk after a build, the current one included
+CORPUS_KEEP_VERSIONS = int(os.getenv("CORPUS_KEEP_VERSIONS", "3"))
+
+# Chunks embedded per request while building
+CORPUS_EMBED_BATCH = int(os.getenv("CORPUS_EMBED_BATCH", "96"))
+
+# Files of one snapshot version
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+OFFSETS_FILE = "offsets.npy"
+CHUNKS_FILE = "chunks.bin"
+CURRENT_FILE = "CURRENT"
+
+class CorpusSnapshot:
+    """One read-only snapshot version, memory-mapped so every session shares its pages
+
+    Vectors are unit-normalised rows of vectors.npy. Chunk texts and metadata are
+    JSON records packed into chunks.bin and only decoded for search hits.
+    """
+
+    # Shard workers only map session indexes; snapshots are searched in-process
+    segment = None
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.embedding_model = self.manifest["embedding_model"]
+        self.matrix = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._chunks = np.memmap(os.path.join(path, CHUNKS_FILE), dtype=np.uint8, mode="r")
+
+        if self.matrix.shape[0] != len(self.offsets) - 1 or self.matrix.shape[1] != self.manifest["dimension"]:
+            raise ValueError(f"Snapshot {self.version} is inconsistent with its manifest")
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def documents(self):
+        return self.manifest["documents"]
+
+    def document(self, row):
+        """Decode the chunk stored at a row"""
+        record = json.loads(self._chunks[self.offsets[row]:self.offsets[row + 1]].tobytes())
+        return Document(id=f"{self.version}:{row}", page_content=record["text"], metadata=record["metadata"])
+
+class KnowledgeBase:
+    """The current corpus snapshot, loaded once per process and shared by every session"""
+
+    def __init__(self, directory=CORPUS_SNAPSHOT_DIR):
+        self.directory = directory
+        self._snapshot = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._mismatches = set()
+
+    def load(self):
+        """Map the version named by CURRENT, replacing any earlier one; returns it or None"""
+        with self._lock:
+            pointer = os.path.join(self.directory, CURRENT_FILE)
+            snapshot = None
+            if os.path.exists(pointer):
+                try:
+                    with open(pointer, encoding="utf-8") as f:
+                        version = f.read().strip()
+                    snapshot = CorpusSnapshot(os.path.join(self.directory, version))
+                except Exception as e:
+                    logger.warning("Could not load corpus snapshot from %s: %s", self.directory, e)
+            self._snapshot = snapshot
+            self._loaded = True
+            self._mismatches.clear()
+            return snapshot
+
+    def current(self):
+        """The loaded snapshot, or None when there is no corpus"""
+        if not self._loaded:
+            self.load()
+        return self._snapshot
+
+    def for_embeddings(self, embeddings):
+        """The snapshot if its vectors are comparable with this embedding model's queries"""
+        snapshot = self.current()
+        if snapshot is None or embeddings is None:
+            return None
+
+        model = embedding_model_id(embeddings)
+        if model != snapshot.embedding_model:
+            if model not in self._mismatches:
+                self._mismatches.add(model)
+                logger.warning("Corpus snapshot %s was embedded with %s, not %s; skipping it", snapshot.version, snapshot.embedding_model, model)
+            return None
+        return snapshot
+
+    def stats(self):
+        snapshot = self.current()
+        if snapshot is None:
+            return {"loaded": False, "directory": self.directory}
+        return {
+            "loaded": True,
+            "version": snapshot.version,
+            "embedding_model": snapshot.embedding_model,
+            "chunks": len(snapshot),
+            "documents": len(snapshot.documents)
+        }
+
+def _write_version(path, version, model, chunks, vectors):
+    """Write one snapshot version's files into path"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    np.save(os.path.join(path, VECTORS_FILE), vectors / norms)
+
+    offsets = [0]
+    with open(os.path.join(path, CHUNKS_FILE), "wb") as f:
+        for chunk in chunks:
+            record = json.dumps({"text": chunk.page_content, "metadata": chunk.metadata}, ensure_ascii=False, default=str)
+            data = record.encode("utf-8")
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+    np.save(os.path.join(path, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+
+    documents = {}
+    for chunk in chunks:
+        documents[chunk.metadata["source"]] = documents.get(chunk.metadata["source"], 0) + 1
+    manifest = {
+        "version": version,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "embedding_model": model,
+        "dimension": int(vectors.shape[1]),
+        "chunks": len(chunks),
+        "documents": documents
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def _prune_versions(directory, current, keep):
+    """Delete the oldest versions beyond keep, never the current one"""
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isfile(os.path.join(directory, name, MANIFEST_FILE))
+    )
+    for name in versions[:max(0, len(versions) - keep)]:
+        if name != current:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+def build_snapshot(documents_dir, output_dir=CORPUS_SNAPSHOT_DIR, embeddings=None, batch_size=CORPUS_EMBED_BATCH, keep=CORPUS_KEEP_VERSIONS):
+    """Parse, chunk and embed every supported document in a directory into a new snapshot version
+
+    The version only becomes CURRENT once all of its files are written, so
+    running apps never see a half-built snapshot.
+    """
+    from document_manager import load_document, UploadedDocument, SUPPORTED_EXTENSIONS
+
+    if embeddings is None:
+        from state_management import get_embedding_model
+        embeddings = get_embedding_model()
+
+    chunks = []
+    for file_name in sorted(os.listdir(documents_dir)):
+        path = os.path.join(documents_dir, file_name)
+        if not os.path.isfile(path) or file_name.split('.')[-1].lower() not in SUPPORTED_EXTENSIONS:
+            continue
+        try:
+            _, document_chunks = load_document(UploadedDocument.from_path(path))
+        except Exception as e:
+            print(f"Skipped {file_name}: {str(e)}", file=sys.stderr)
+            continue
+        chunks.extend(document_chunks)
+        print(f"Loaded {file_name}: {len(document_chunks)} chunks", file=sys.stderr)
+
+    if not chunks:
+        raise ValueError(f"No supported documents found in {documents_dir}")
+
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(chunks), batch_size):
+        vectors.extend(embeddings.embed_documents([chunk.page_content for chunk in chunks[i:i + batch_size]]))
+        print(f"Embedded {min(i + batch_size, len(chunks))}/{len(chunks)} chunks", file=sys.stderr)
+
+    version = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    final_path = os.path.join(output_dir, version)
+    staging_path = os.path.join(output_dir, f".staging-{version}")
+    os.makedirs(staging_path, exist_ok=True)
+    try:
+        manifest = _write_version(staging_path, version, embedding_model_id(embeddings), chunks, vectors)
+        os.rename(staging_path, final_path)
+    except Exception:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+
+    # Switch CURRENT atomically so a reader sees either the old or the new version
+    pointer = os.path.join(output_dir, CURRENT_FILE)
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    _prune_versions(output_dir, version, keep)
+    manifest["embed_seconds"] = round(time.perf_counter() - start, 2)
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a versioned knowledge-base snapshot shared by every session")
+    parser.add_argument("--documents", required=True, help="Directory of handbooks, FAQs and other shared documents")
+    parser.add_argument("--output", default=CORPUS_SNAPSHOT_DIR, help="Snapshot directory the app reads (CORPUS_SNAPSHOT_DIR)")
+    parser.add_argument("--keep", type=int, default=CORPUS_KEEP_VERSIONS, help="Versions to keep on disk")
+    parser.add_argument("--batch-size", type=int, default=CORPUS_EMBED_BATCH, help="Chunks per embedding request")
+    args = parser.parse_args(argv)
+
+    manifest = build_snapshot(args.documents, args.output, batch_size=max(1, args.batch_size), keep=max(1, args.keep))
+    print(json.dumps(manifest, indent=2))
+
+# Knowledge base shared by every session in this process
+knowledge_base = KnowledgeBase()
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,14 @@
 # Description: Handles document processing and retrieval
 # Author: LALAN KUMAR
 # Created: [20-03-2025]
-# Updated: [24-03-2025]
+# Updated: [19-10-2026]
 # Version: 1.0.0
 # License: [License Type, e.g., MIT]
 # ===================================================================================
 
 import os
-import streamlit as st
-from io import BytesIO
+import time
+import tempfile
 import pandas as pd
 from langchain_community.document_loaders import (
     PDFPlumberLoader,
@@ -21,158 +21,272 @@ from langchain_community.document_loaders import (
     CSVLoader
 )
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from provider_gateway import session_scope
+from tracing import tracer, traced, current_span
+from profiling import profiled
+from metrics import metrics
+from context_packer import pack_context
+from retrieval import search_with_scores, drop_cached_matrix, IndexMismatch, MMR_ENABLED
+from memory_governor import memory_governor, estimate_chunks_bytes, MemoryLimitExceeded
+from corpus_snapshot import knowledge_base
+from embedding_index import validate_index, migrator
 
-def process_document_file(uploaded_file):
-    """Process various document types and add to the vector store"""
-    file_extension = uploaded_file.name.split('.')[-1].lower()
+# Candidate hits fetched before the similarity cutoff and token budget are applied
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "8"))
+
+# Answer of query_documents() when no chunk is relevant enough to use
+NO_RELEVANT_INFORMATION = "No relevant information found in the uploaded documents."
+
+# File types process_document_file() can load
+SUPPORTED_EXTENSIONS = ["pdf", "docx", "txt", "pptx", "ppt", "csv"]
+
+# Ingestion throughput and retrieval outcomes
+documents_ingested = metrics.counter("zerthia_documents_ingested_total", "Document uploads by file type and outcome", ["file_type", "outcome"])
+ingest_duration = metrics.histogram("zerthia_ingest_duration_seconds", "Time to load, chunk and index a document", ["file_type"])
+ingested_chunks = metrics.counter("zerthia_ingested_chunks_total", "Chunks added to vector stores")
+ingested_bytes = metrics.counter("zerthia_ingested_bytes_total", "Bytes of uploaded documents processed")
+document_queries = metrics.counter("zerthia_document_queries_total", "Document queries by outcome", ["outcome"])
+document_query_duration = metrics.histogram("zerthia_document_query_duration_seconds", "Document query latency")
+
+class UploadedDocument:
+    """In-memory document with the interface of Streamlit's uploaded files"""
+    
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
     
-    # Create a temporary file-like object
-    file_bytes = BytesIO(uploaded_file.getvalue())
+    @classmethod
+    def from_path(cls, path):
+        """Read a document from disk"""
+        with open(path, "rb") as f:
+            return cls(os.path.basename(path), f.read())
+    
+    def getvalue(self):
+        return self._data
+
+class UnsupportedFileType(ValueError):
+    """Raised for uploads whose extension has no loader"""
+
+def _loader_for(file_extension, path):
+    """Document loader for a file type, or None if the type is not supported"""
+    if file_extension == 'pdf':
+        return PDFPlumberLoader(path)
+    elif file_extension == 'docx':
+        return UnstructuredWordDocumentLoader(path)
+    elif file_extension in ['pptx', 'ppt']:
+        return UnstructuredPowerPointLoader(path)
+    elif file_extension == 'txt':
+        return TextLoader(path)
+    elif file_extension == 'csv':
+        return CSVLoader(path)
+    return None
+
+def load_document(uploaded_file):
+    """Load and chunk an uploaded file; returns its full text and its chunks"""
+    file_extension = uploaded_file.name.split('.')[-1].lower()
     
-    # Save to a temporary file that loaders can use
-    temp_path = f"temp_{uploaded_file.name}"
-    with open(temp_path, "wb") as f:
-        f.write(file_bytes.getvalue())
+    # Save to a uniquely named temporary file that loaders can use, so concurrent
+    # uploads of the same file name never share one
+    fd, temp_path = tempfile.mkstemp(prefix="upload_", suffix=f".{file_extension}")
+    with os.fdopen(fd, "wb") as f:
+        f.write(uploaded_file.getvalue())
     
     try:
         # Select appropriate loader based on file extension
-        if file_extension == 'pdf':
-            loader = PDFPlumberLoader(temp_path)
-        elif file_extension == 'docx':
-            loader = UnstructuredWordDocumentLoader(temp_path)
-        elif file_extension in ['pptx', 'ppt']:
-            loader = UnstructuredPowerPointLoader(temp_path)
-        elif file_extension == 'txt':
-            loader = TextLoader(temp_path)
-        elif file_extension == 'csv':
-            loader = CSVLoader(temp_path)
-        else:
-            os.remove(temp_path)
-            return 0, f"Unsupported file type: {file_extension}"
-        
-        raw_docs = loader.load()
-        
-        # Handle special case for CSV to include headers in metadata
-        if file_extension == 'csv':
-            # Read CSV headers for metadata
-            df = pd.read_csv(temp_path)
-            headers = list(df.columns)
-            for doc in raw_docs:
-                doc.metadata["headers"] = headers
+        loader = _loader_for(file_extension, temp_path)
+        if loader is None:
+            raise UnsupportedFileType(f"Unsupported file type: {file_extension}")
         
-        # Store the raw document content for direct access
-        full_text = "\n\n".join([doc.page_content for doc in raw_docs])
-        st.session_state.document_contents[uploaded_file.name] = full_text
+        with tracer.span("load") as load_span:
+            raw_docs = loader.load()
+            
+            # Handle special case for CSV to include headers in metadata
+            if file_extension == 'csv':
+                # Read CSV headers for metadata
+                df = pd.read_csv(temp_path)
+                headers = list(df.columns)
+                for doc in raw_docs:
+                    doc.metadata["headers"] = headers
+            load_span.set(pages=len(raw_docs))
         
         # Chunk documents
-        text_processor = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            add_start_index=True
+        with tracer.span("split") as split_span:
+            text_processor = RecursiveCharacterTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=200,
+                add_start_index=True
+            )
+            document_chunks = text_processor.split_documents(raw_docs)
+            split_span.set(chunks=len(document_chunks))
+    finally:
+        # Clean up the temporary file
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    # Loaders record the temporary file as the source; keep the uploaded name instead
+    for chunk in document_chunks:
+        chunk.metadata["source"] = uploaded_file.name
+    
+    full_text = "\n\n".join([doc.page_content for doc in raw_docs])
+    return full_text, document_chunks
+
+@traced("process_document_file")
+@profiled("process_document_file")
+def process_document_file(ctx, uploaded_file):
+    """Process various document types and add them to a session's vector store"""
+    file_extension = uploaded_file.name.split('.')[-1].lower()
+    file_size = len(uploaded_file.getvalue())
+    span = current_span()
+    span.set(session_id=ctx.session_id, file_type=file_extension, file_bytes=file_size)
+    start = time.perf_counter()
+    
+    try:
+        full_text, document_chunks = load_document(uploaded_file)
+        
+        # Refuse documents that would push this session over its memory cap
+        memory_governor.check_capacity(
+            ctx.session_id,
+            estimate_chunks_bytes(document_chunks) + len(full_text)
         )
-        document_chunks = text_processor.split_documents(raw_docs)
         
-        # Add metadata to track source document
-        for chunk in document_chunks:
-            if "source" not in chunk.metadata:
-                chunk.metadata["source"] = uploaded_file.name
+        # Store the raw document content for direct access
+        ctx.document_contents[uploaded_file.name] = full_text
         
-        # Add to vector store
-        st.session_state.vector_store.add_documents(document_chunks)
+        # Add to vector store, queuing embedding calls on behalf of this session
+        with session_scope(ctx.session_id), tracer.span("index", chunks=len(document_chunks)):
+            ctx.vector_store.add_documents(document_chunks)
         
-        # Clean up the temporary file
-        os.remove(temp_path)
+        # Re-account the session and evict idle sessions if the process is over its cap
+        memory_governor.update(ctx.session_id)
         
+        span.set(chunks=len(document_chunks), text_chars=len(full_text))
+        documents_ingested.labels(file_type=file_extension, outcome="ok").inc()
+        ingest_duration.labels(file_type=file_extension).observe(time.perf_counter() - start)
+        ingested_chunks.inc(len(document_chunks))
+        ingested_bytes.inc(file_size)
         return len(document_chunks), None
+    except UnsupportedFileType as e:
+        documents_ingested.labels(file_type=file_extension, outcome="unsupported").inc()
+        return 0, str(e)
+    except MemoryLimitExceeded as e:
+        span.fail(e)
+        documents_ingested.labels(file_type=file_extension, outcome="rejected").inc()
+        return 0, str(e)
     except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         error_msg = f"Error processing {file_extension.upper()} file: {str(e)}"
+        span.fail(error_msg)
+        documents_ingested.labels(file_type=file_extension, outcome="error").inc()
         return 0, error_msg
 
-def query_documents(query: str) -> str:
-    """Query the vector store for document information"""
+@traced("query_documents")
+@document_query_duration.time()
+def query_documents(ctx, query: str, mmr: bool = MMR_ENABLED) -> str:
+    """Query a session's vector store for document information, optionally diversified with MMR"""
     
+    span = current_span()
+    span.set(session_id=ctx.session_id, mmr=mmr)
     try:
+        # Bring the index back from disk if this session was evicted
+        memory_governor.touch(ctx.session_id)
+        
         # Debug information
         doc_count = 0
         try:
             # This is a safer way to check document count that won't crash if structure changes
-            if hasattr(st.session_state.vector_store, "_collection"):
-                doc_count = st.session_state.vector_store._collection.count()
+            if hasattr(ctx.vector_store, "_collection"):
+                doc_count = ctx.vector_store._collection.count()
             else:
                 # Alternative method if _collection doesn't exist
-                doc_count = len(st.session_state.document_contents)
+                doc_count = len(ctx.document_contents)
         except:
-            doc_count = len(st.session_state.document_contents)
+            doc_count = len(ctx.document_contents)
+        
+        # The shared knowledge base is searched alongside the session's uploads
+        corpus = knowledge_base.for_embeddings(getattr(ctx.vector_store, "embeddings", None))
+        if corpus is not None:
+            doc_count += len(corpus.documents)
         
         # Check if there are documents in the vector store
+        span.set(documents=doc_count)
         if doc_count == 0:
+            document_queries.labels(outcome="no_documents").inc()
             return "No documents have been uploaded yet. Please upload a document first to enable document queries."
         
         # Find related documents
         try:
-            relevant_docs = st.session_state.vector_store.similarity_search(query, k=4)
+            with session_scope(ctx.session_id):
+                try:
+                    validate_index(ctx.vector_store)
+                except IndexMismatch:
+                    # The session's own index is from another model: re-embed it onto the
+                    # app's model while the fallback serves
+                    from state_management import get_embedding_model
+                    migrator.schedule(ctx.session_id, ctx.vector_store, get_embedding_model())
+                    raise
+                scored_docs = search_with_scores(ctx.vector_store, query, k=RETRIEVAL_CANDIDATES, mmr=mmr, corpus=corpus)
         except Exception as e:
             # Fallback to direct document search if vector search fails
-            if len(st.session_state.document_contents) > 0:
+            if len(ctx.document_contents) > 0:
                 fallback_results = []
-                for doc_name, content in st.session_state.document_contents.items():
+                for doc_name, content in ctx.document_contents.items():
                     fallback_results.append(f"Document: {doc_name}\nContent: {content[:1000]}...")
                 
                 context_text = "\n\n".join(fallback_results)
                 
-                # Log the issue but continue with fallback
-                print(f"Vector search failed, using fallback: {str(e)}")
+                # Record the issue on the trace but continue with fallback
+                span.fail(e)
+                span.set(fallback="document_contents")
+                document_queries.labels(outcome="search_failed_fallback").inc()
                 
                 return f"Vector search failed, using direct document content.\n\n{context_text}"
             else:
+                span.fail(e)
+                document_queries.labels(outcome="error").inc()
                 return f"Error searching documents: {str(e)}"
         
-        if not relevant_docs:
-            # Fallback to direct document content search
-            if len(st.session_state.document_contents) > 0:
-                matching_docs = []
-                for doc_name, content in st.session_state.document_contents.items():
-                    # Simple keyword matching fallback
-                    query_keywords = query.lower().split()
-                    if any(keyword in content.lower() for keyword in query_keywords):
-                        matching_docs.append(f"Document: {doc_name}\nContent: {content[:1000]}...")
-                
-                if matching_docs:
-                    context_text = "\n\n".join(matching_docs)
-                    return context_text
-                else:
-                    return "No relevant information found in the uploaded documents based on direct search."
-            else:
-                return "No relevant information found in the uploaded documents."
-        
-        # Create context from documents with source tracking
-        doc_contexts = []
-        for i, doc in enumerate(relevant_docs):
-            source = doc.metadata.get("source", f"Document {i+1}")
-            
-            # Check if this is a CSV document with headers
-            if "headers" in doc.metadata:
-                headers_info = f"CSV Headers: {', '.join(doc.metadata['headers'])}\n"
-                doc_contexts.append(f"Document: {source}\n{headers_info}Content: {doc.page_content}")
-            else:
-                doc_contexts.append(f"Document: {source}\nContent: {doc.page_content}")
+        # Merge overlapping hits, drop weak ones and fill the token budget
+        with tracer.span("pack_context", candidates=len(scored_docs)) as pack_span:
+            context_text, context_tokens = pack_context(scored_docs)
+            pack_span.set(context_tokens=context_tokens)
         
-        context_text = "\n\n".join(doc_contexts)
+        if not context_text:
+            # Every hit fell below the similarity cutoff, so nothing in the documents is relevant
+            span.set(below_cutoff=len(scored_docs))
+            document_queries.labels(outcome="no_match").inc()
+            return NO_RELEVANT_INFORMATION
         
+        document_queries.labels(outcome="results").inc()
         return context_text
     except Exception as e:
         # Be more specific about the error and include debugging information
         error_message = f"Error querying documents: {str(e)}"
-        print(error_message)  # For server logs
+        span.fail(e)
+        document_queries.labels(outcome="error").inc()
         
         # Include information about the document store state
         doc_info = "No document information available"
-        if hasattr(st.session_state, "document_contents"):
-            doc_names = list(st.session_state.document_contents.keys())
+        if hasattr(ctx, "document_contents"):
+            doc_names = list(ctx.document_contents.keys())
             doc_info = f"Available documents: {', '.join(doc_names) if doc_names else 'None'}"
         
         return f"{error_message}\n{doc_info}"
 
-
+def remove_document(ctx, file_name):
+    """Remove a document and its chunks from a session, returning the chunks removed"""
+    memory_governor.touch(ctx.session_id)
+    
+    chunk_ids = [
+        chunk_id for chunk_id, entry in ctx.vector_store.store.items()
+        if entry["metadata"].get("source") == file_name
+    ]
+    for chunk_id in chunk_ids:
+        del ctx.vector_store.store[chunk_id]
+    drop_cached_matrix(ctx.vector_store)
+    
+    ctx.document_contents.pop(file_name, None)
+    if file_name in ctx.uploaded_files:
+        ctx.uploaded_files.remove(file_name)
+    ctx.has_documents = bool(ctx.uploaded_files)
+    
+    memory_governor.update(ctx.session_id)
+    return len(chunk_ids)
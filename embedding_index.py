@@ -0,0 +1,327 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: embedding_index.py
+# Description: Embedding model ids, index tags and background re-embedding of indexes
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import time
+import queue
+import weakref
+import threading
+import cohere
+from dataclasses import dataclass
+from typing import Optional
+from langchain_ollama import OllamaEmbeddings
+from langchain_cohere import CohereEmbeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from provider_gateway import gateway, session_scope, GatewayEmbeddings, COHERE_BASE_URL
+from retrieval import drop_cached_matrix, IndexMismatch
+from memory_governor import memory_governor
+from tracing import tracer
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Model new indexes are embedded with, and the one used when it cannot be created
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "CohereEmbeddings:embed-english-v3.0")
+EMBEDDING_FALLBACK_MODEL = os.getenv("EMBEDDING_FALLBACK_MODEL", "HuggingFaceEmbeddings:all-MiniLM-L6-v2")
+
+# Chunks re-embedded per request while migrating an index
+EMBEDDING_MIGRATION_BATCH = int(os.getenv("EMBEDDING_MIGRATION_BATCH", "64"))
+
+# Seconds to wait between migration batches, leaving embedding capacity to live uploads
+EMBEDDING_MIGRATION_PAUSE = float(os.getenv("EMBEDDING_MIGRATION_PAUSE", "0.2"))
+
+def embedding_model_id(embeddings):
+    """Stable name of the model behind an embeddings object, unwrapping the gateway"""
+    inner = getattr(embeddings, "embeddings", embeddings)
+    for attribute in ("model", "model_name"):
+        value = getattr(inner, attribute, None)
+        if isinstance(value, str) and value:
+            return f"{type(inner).__name__}:{value}"
+    return type(inner).__name__
+
+def load_embeddings(model_id):
+    """Create the embeddings object for a model id, or None if it cannot be created here"""
+    kind, _, name = model_id.partition(":")
+    try:
+        if kind == "CohereEmbeddings":
+            cohere_options = {"base_url": COHERE_BASE_URL} if COHERE_BASE_URL else {}
+            embeddings = CohereEmbeddings(model=name, **cohere_options)
+            # The wrapper builds its own client; use one on the gateway's pooled connections instead
+            embeddings.client = cohere.Client(
+                embeddings.cohere_api_key.get_secret_value(),
+                base_url=embeddings.base_url,
+                timeout=embeddings.request_timeout,
+                client_name=embeddings.user_agent,
+                httpx_client=gateway.http_client()
+            )
+            return GatewayEmbeddings(embeddings, "cohere", gateway)
+        if kind == "HuggingFaceEmbeddings":
+            return HuggingFaceEmbeddings(model_name=name)
+        if kind == "OllamaEmbeddings":
+            return OllamaEmbeddings(model=name)
+    except Exception as e:
+        logger.warning("Could not create embedding model %s: %s", model_id, e)
+        return None
+    logger.warning("Unknown embedding model %s", model_id)
+    return None
+
+@dataclass(frozen=True)
+class IndexTag:
+    """Embedding model and dimension of the vectors held by an index"""
+
+    model: Optional[str]
+    dimension: Optional[int]
+
+# Tags of indexes whose vectors did not come from their own embeddings object
+_tags = weakref.WeakKeyDictionary()
+
+def tag_index(vector_store, model, dimension):
+    """Record which model produced a vector store's vectors"""
+    _tags[vector_store] = IndexTag(model, dimension)
+
+def index_tag(vector_store):
+    """Tag of a vector store; untagged stores were embedded by their own embeddings object"""
+    tag = _tags.get(vector_store)
+    if tag is not None:
+        return tag
+    first = next(iter(vector_store.store.values()), None)
+    return IndexTag(embedding_model_id(vector_store.embeddings), len(first["vector"]) if first else None)
+
+index_mismatches = metrics.counter("zerthia_index_mismatches_total", "Searches refused because the index and query model differ")
+
+# Vector width of each embedding model, probed once; keyed by id because
+# pydantic models are unhashable, and dropped when the model is collected
+_dimensions = {}
+_dimensions_lock = threading.Lock()
+
+def model_dimension(embeddings):
+    """Width of the vectors an embedding model produces"""
+    key = id(embeddings)
+    with _dimensions_lock:
+        dimension = _dimensions.get(key)
+    if dimension is None:
+        dimension = len(embeddings.embed_query("dimension probe"))
+        with _dimensions_lock:
+            if key not in _dimensions:
+                _dimensions[key] = dimension
+                weakref.finalize(embeddings, _dimensions.pop, key, None)
+    return dimension
+
+def validate_index(vector_store):
+    """Raise IndexMismatch if queries would be embedded with a different model than the index"""
+    tag = _tags.get(vector_store)
+    if tag is not None and tag.model is not None:
+        query_model = embedding_model_id(vector_store.embeddings)
+        if tag.model != query_model:
+            index_mismatches.inc()
+            raise IndexMismatch(f"Index embedded with {tag.model} cannot be searched with {query_model} queries")
+        return
+
+    # Without a model name, the vectors must at least be as wide as the query model's
+    first = next(iter(vector_store.store.values()), None)
+    if first is None:
+        return
+    dimension = len(first["vector"])
+    query_dimension = model_dimension(vector_store.embeddings)
+    if dimension != query_dimension:
+        index_mismatches.inc()
+        raise IndexMismatch(f"Index vectors have {dimension} dimensions but queries have {query_dimension}")
+
+class _MigrationJob:
+    """Progress of re-embedding one session's index"""
+
+    def __init__(self, session_id, vector_store, target):
+        self.session_id = session_id
+        self.vector_store = weakref.ref(vector_store)
+        self.target = target
+        self.source_model = index_tag(vector_store).model
+        self.target_model = embedding_model_id(target)
+        self.total = len(vector_store.store)
+        self.done = 0
+        self.state = "queued"
+        self.cancelled = False
+
+    def to_dict(self):
+        return {
+            "from": self.source_model,
+            "to": self.target_model,
+            "done": self.done,
+            "total": self.total,
+            "state": self.state
+        }
+
+class EmbeddingMigrator:
+    """Re-embeds indexes onto a new model in the background, one batch at a time
+
+    The old index keeps serving searches while the new vectors are built in a
+    separate dict. Only when every chunk has a new vector are the dict and the
+    store's embeddings swapped, so a search sees either the old index or the new one.
+    """
+
+    def __init__(self, batch_size=EMBEDDING_MIGRATION_BATCH, pause=EMBEDDING_MIGRATION_PAUSE):
+        self.batch_size = batch_size
+        self.pause = pause
+        self._jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._completed = 0
+        self._failed = 0
+        self._reembedded = 0
+
+    def schedule(self, session_id, vector_store, target):
+        """Queue a session's index for re-embedding with target; returns whether a job was queued"""
+        with self._lock:
+            job = self._jobs.get(session_id)
+            if job is not None and job.state in ("queued", "running"):
+                if job.vector_store() is vector_store:
+                    return False
+                # The session was reloaded; migrate the store it uses now
+                job.cancelled = True
+
+            job = _MigrationJob(session_id, vector_store, target)
+            self._jobs[session_id] = job
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="reembed", daemon=True)
+                self._worker.start()
+        self._queue.put(job)
+        logger.info("Re-embedding %d chunks of session %s from %s to %s", job.total, session_id, job.source_model, job.target_model)
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job.cancelled:
+                job.state = "cancelled"
+            else:
+                try:
+                    self._migrate(job)
+                except Exception as e:
+                    job.state = "failed"
+                    self._failed += 1
+                    logger.error("Re-embedding session %s failed: %s", job.session_id, e)
+            self._queue.task_done()
+
+    def _embed(self, job, entries, migrated):
+        vectors = job.target.embed_documents([entry["text"] for entry in entries])
+        for entry, vector in zip(entries, vectors):
+            migrated[entry["id"]] = {"id": entry["id"], "vector": vector, "text": entry["text"], "metadata": entry["metadata"]}
+        job.done = len(migrated)
+        self._reembedded += len(entries)
+
+    def _migrate(self, job):
+        job.state = "running"
+        migrated = {}
+        with session_scope(job.session_id), tracer.span("reembed", session_id=job.session_id, model=job.target_model) as span:
+            # Passes repeat until chunks uploaded during the migration are covered too
+            while not job.cancelled:
+                # A spilled index is brought back before reading it
+                memory_governor.touch(job.session_id)
+                vector_store = job.vector_store()
+                if vector_store is None:
+                    job.cancelled = True
+                    break
+                store = vector_store.store
+                pending = [entry for doc_id, entry in list(store.items()) if doc_id not in migrated]
+                del vector_store
+                if not pending:
+                    break
+                job.total = len(migrated) + len(pending)
+                for i in range(0, len(pending), self.batch_size):
+                    if job.cancelled:
+                        break
+                    self._embed(job, pending[i:i + self.batch_size], migrated)
+                    time.sleep(self.pause)
+
+            if job.cancelled:
+                job.state = "cancelled"
+                span.set(cancelled=True)
+                return
+
+            memory_governor.touch(job.session_id)
+            vector_store = job.vector_store()
+            if vector_store is None:
+                job.state = "cancelled"
+                return
+
+            # Swap in the new index, keeping the store's order and dropping removed chunks
+            old_store = vector_store.store
+            new_store = {doc_id: migrated[doc_id] for doc_id in old_store if doc_id in migrated}
+            vector_store.embedding = job.target
+            vector_store.store = new_store
+            drop_cached_matrix(vector_store)
+
+            # Chunks that arrived between the last pass and the swap
+            stragglers = [entry for doc_id, entry in list(old_store.items()) if doc_id not in new_store]
+            if stragglers:
+                self._embed(job, stragglers, new_store)
+                drop_cached_matrix(vector_store)
+
+            first = next(iter(new_store.values()), None)
+            tag_index(vector_store, job.target_model, len(first["vector"]) if first else None)
+            memory_governor.update(job.session_id)
+            span.set(chunks=len(new_store))
+
+        job.state = "completed"
+        self._completed += 1
+        logger.info("Session %s now searches %s vectors", job.session_id, job.target_model)
+
+    def progress(self, session_id):
+        """Migration state of a session, or None if it never needed one"""
+        job = self._jobs.get(session_id)
+        return job.to_dict() if job is not None else None
+
+    def stats(self):
+        """Migration counters and jobs still in progress"""
+        with self._lock:
+            active = {sid: job.to_dict() for sid, job in self._jobs.items() if job.state in ("queued", "running")}
+        return {
+            "active": active,
+            "completed": self._completed,
+            "failed": self._failed,
+            "reembedded_chunks": self._reembedded
+        }
+
+def reconcile_index(session_id, vector_store, target):
+    """Keep a restored index searchable and migrate it to target in the background
+
+    While the migration runs, queries are embedded with the model that built the
+    index if that model can still be created; otherwise searches are refused
+    with IndexMismatch until the new index is ready.
+    """
+    tag = _tags.get(vector_store)
+    target_model = embedding_model_id(target)
+    if tag is None or tag.model is None or tag.model == target_model:
+        return False
+
+    previous = load_embeddings(tag.model)
+    if previous is not None:
+        vector_store.embedding = previous
+    else:
+        vector_store.embedding = target
+    return migrator.schedule(session_id, vector_store, target)
+
+# Migrator shared by every session in this process
+migrator = EmbeddingMigrator()
+
+metrics.callback(
+    "zerthia_embedding_migrations_active", "Index re-embedding jobs queued or running",
+    lambda: len(migrator.stats()["active"])
+)
+metrics.callback(
+    "zerthia_embedding_migrations_total", "Finished index re-embedding jobs by outcome",
+    lambda: {("completed",): migrator._completed, ("failed",): migrator._failed}, ["outcome"], kind="counter"
+)
+metrics.callback(
+    "zerthia_reembedded_chunks_total", "Chunks re-embedded onto a new model",
+    lambda: migrator._reembedded, kind="counter"
+)
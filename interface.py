@@ -4,13 +4,19 @@
 # Description: Manages the user interface components
 # Author: LALAN KUMAR
 # Created: [20-03-2025]
-# Updated: [24-03-2025]
+# Updated: [19-10-2026]
 # Version: 1.0.0
 # License: [License Type, e.g., MIT]
 # ===================================================================================
 
 import streamlit as st
-import re
+from state_management import make_message
+
+# Number of most recent messages always rendered
+RECENT_MESSAGES = 12
+
+# Older messages revealed per click on "Show earlier messages"
+HISTORY_PAGE_SIZE = 20
 
 def setup_interface():
     """Set up the Streamlit interface styling"""
@@ -100,20 +106,47 @@ def setup_interface():
     </style>
     """, unsafe_allow_html=True)
 
-def display_messages():
-    """Display message history in the UI"""
-    
-    for message in st.session_state.message_log:
-        with st.chat_message(message["role"]):
-            content = message["content"]
-            think_matches = re.findall(r'<think>(.*?)</think>', content, flags=re.DOTALL)
-            content_without_think = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
+def show_earlier_messages():
+    """Reveal one more page of older messages"""
+    
+    st.session_state.history_pages += 1
 
-            st.markdown(content_without_think)
+def render_message_content(message):
+    """Render the answer and reasoning of a pre-parsed message record"""
+    
+    st.markdown(message["content"])
+    
+    if message.get("reasoning"):
+        with st.expander("💭 Thought Process"):
+            st.markdown(message["reasoning"])
 
-            for think_text in think_matches:
-                with st.expander("💭 Thought Process"):
-                    st.markdown(think_text)
+def render_message(message):
+    """Render one pre-parsed message record in its chat bubble"""
+    
+    with st.chat_message(message["role"]):
+        render_message_content(message)
+
+def display_messages(ctx):
+    """Display the recent message history, keeping older turns collapsed"""
+    
+    message_log = ctx.message_log
+    
+    # Only the latest messages plus any pages the user asked for are rendered
+    visible = RECENT_MESSAGES + st.session_state.history_pages * HISTORY_PAGE_SIZE
+    hidden = max(0, len(message_log) - visible)
+    
+    if hidden:
+        st.button(
+            f"Show earlier messages ({hidden} hidden)",
+            key="show_earlier_messages",
+            on_click=show_earlier_messages
+        )
+    
+    for message in message_log[hidden:]:
+        # Records from before structured storage are parsed once and kept
+        if "reasoning" not in message:
+            message.update(make_message(message["role"], message["content"]))
+        render_message(message)
 
 def get_file_icon(filename):
     """Return appropriate icon and style based on file extension"""
@@ -131,10 +164,10 @@ def get_file_icon(filename):
     else:
         return "📁", ""
 
-def display_document_list():
+def display_document_list(ctx):
     """Display the list of uploaded documents with appropriate icons"""
     
     with st.expander("📚 Uploaded Documents"):
-        for file_name in st.session_state.uploaded_files:
+        for file_name in ctx.uploaded_files:
             icon, icon_class = get_file_icon(file_name)
             st.markdown(f"<span class='file-icon {icon_class}'>{icon}</span> {file_name}", unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,243 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: loadtest/run_load.py
+# Description: Drives concurrent simulated sessions against local provider stubs
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from loadtest.stub_providers import StubBehaviour, start_stub_server
+
+# Synthetic documents are built from these topics and words
+_TOPICS = ["zebra", "glacier", "satellite", "orchard", "turbine", "harbor", "quartz", "lantern"]
+_WORDS = (
+    "the project team reported steady progress across regions while budgets remained "
+    "within limits and several risks were noted for review by the steering committee "
+    "during quarterly planning sessions that covered delivery timelines staffing and costs"
+).split()
+
+# Query templates per simulated flow; {topic} is filled from the topics above
+QUERY_MIX = {
+    "chat": ["Can you explain how {topic} projects are usually planned?", "Give me a few ideas about {topic}."],
+    "web": ["What is the latest news about {topic} today?", "Search the web for current {topic} prices."],
+    "document": ["What does the uploaded document say about {topic}?", "Summarize the document's section on {topic}."]
+}
+
+def configure_environment(base_url):
+    """Point every provider at base_url and give the clients placeholder keys
+
+    Must run before the pipeline modules are imported: they read these at import time.
+    """
+    for key in ("GROQ_API_KEY", "TAVILY_API_KEY", "COHERE_API_KEY"):
+        os.environ.setdefault(key, "loadtest")
+    for provider in ("GROQ", "TAVILY", "COHERE"):
+        os.environ[f"{provider}_BASE_URL"] = base_url
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+def resident_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak RSS is the closest portable figure (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def synthetic_document(rng, paragraphs):
+    """Plain text document whose paragraphs each mention one topic"""
+    result = []
+    for _ in range(paragraphs):
+        topic = rng.choice(_TOPICS)
+        sentences = []
+        for _ in range(rng.randint(4, 7)):
+            words = rng.choices(_WORDS, k=rng.randint(8, 16))
+            words.insert(rng.randint(0, len(words)), topic)
+            sentences.append(" ".join(words).capitalize() + ".")
+        result.append(" ".join(sentences))
+    return "\n\n".join(result).encode("utf-8")
+
+class SessionSimulator:
+    """Runs one simulated user's upload and chat flow through the pipeline"""
+
+    def __init__(self, args):
+        # Imported here so configure_environment() has already run
+        from agent import process_query, UNAVAILABLE_RESPONSE
+        from document_manager import process_document_file, UploadedDocument
+        from state_management import new_session_context, append_message, record_upload
+        from memory_governor import memory_governor
+
+        self.args = args
+        self.process_query = process_query
+        self.unavailable = UNAVAILABLE_RESPONSE
+        self.process_document_file = process_document_file
+        self.uploaded_document = UploadedDocument
+        self.new_session_context = new_session_context
+        self.append_message = append_message
+        self.record_upload = record_upload
+        self.memory_governor = memory_governor
+        self.contexts = []
+        self._lock = threading.Lock()
+
+    def timed(self, operation, func):
+        """Run func and record its latency; func returns whether it succeeded"""
+        start = time.perf_counter()
+        try:
+            ok, error = func(), None
+        except Exception as e:
+            ok, error = False, str(e)
+        return {
+            "operation": operation,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "ok": bool(ok),
+            "error": error
+        }
+
+    def upload(self, ctx, rng):
+        name = f"load_{ctx.session_id}.txt"
+        document = self.uploaded_document(name, synthetic_document(rng, self.args.document_paragraphs))
+        num_chunks, _ = self.process_document_file(ctx, document)
+        if num_chunks > 0:
+            self.record_upload(ctx, name, "TXT", num_chunks)
+        return num_chunks > 0
+
+    def chat(self, ctx, query):
+        self.append_message(ctx, "user", query)
+        self.process_query(ctx)
+        return ctx.message_log[-1]["role"] == "ai" and ctx.message_log[-1]["content"] != self.unavailable
+
+    def run(self, index):
+        """Simulate session number index; returns its operation records"""
+        rng = random.Random(self.args.seed + index)
+        time.sleep(self.args.ramp_up * index / self.args.sessions)
+
+        ctx = self.new_session_context(f"load{index:05d}")
+        self.memory_governor.register(ctx.session_id, ctx.vector_store, ctx.document_contents)
+        with self._lock:
+            self.contexts.append(ctx)
+
+        records = []
+        if rng.random() < self.args.upload_ratio:
+            records.append(self.timed("upload", lambda: self.upload(ctx, rng)))
+
+        for _ in range(self.args.turns):
+            if self.args.think_time > 0:
+                time.sleep(rng.expovariate(1 / self.args.think_time))
+            flows = ["chat", "web"] + (["document"] if ctx.has_documents else [])
+            flow = rng.choice(flows)
+            query = rng.choice(QUERY_MIX[flow]).format(topic=rng.choice(_TOPICS))
+            records.append(self.timed(flow, lambda: self.chat(ctx, query)))
+
+        self.memory_governor.touch(ctx.session_id, ctx.message_log)
+        return records
+
+def summarize(records, wall_time):
+    """Throughput, latency percentiles and error counts overall and per operation"""
+    from metrics import percentile
+
+    def stats(group):
+        latencies = [record["latency_ms"] for record in group]
+        return {
+            "count": len(group),
+            "errors": sum(1 for record in group if not record["ok"]),
+            "per_s": round(len(group) / wall_time, 2) if wall_time else 0.0,
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": max(latencies, default=0.0)
+        }
+
+    operations = sorted({record["operation"] for record in records})
+    return {
+        "overall": stats(records),
+        "operations": {name: stats([r for r in records if r["operation"] == name]) for name in operations},
+        "sample_errors": sorted({record["error"] for record in records if record["error"]})[:5]
+    }
+
+def run_load(args):
+    """Start the stubs if needed, run every session concurrently and build the report"""
+    if args.base_url:
+        base_url, server = args.base_url, None
+    else:
+        behaviour = StubBehaviour(seed=args.seed)
+        server = start_stub_server(args.stub_port, behaviour)
+        base_url = f"http://127.0.0.1:{args.stub_port}"
+    configure_environment(base_url)
+
+    simulator = SessionSimulator(args)
+    from memory_governor import memory_governor
+    from provider_gateway import gateway
+
+    rss_before = resident_bytes()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions, thread_name_prefix="loadtest") as executor:
+        records = [record for session in executor.map(simulator.run, range(args.sessions)) for record in session]
+    wall_time = time.perf_counter() - start
+    rss_after = resident_bytes()
+
+    # Memory is measured while every simulated session is still alive
+    accounted = [memory_governor.session_bytes(ctx.session_id) for ctx in simulator.contexts]
+    report = {
+        "config": {
+            "sessions": args.sessions,
+            "turns": args.turns,
+            "upload_ratio": args.upload_ratio,
+            "think_time_s": args.think_time,
+            "base_url": base_url
+        },
+        "wall_time_s": round(wall_time, 2),
+        **summarize(records, wall_time),
+        "memory": {
+            "rss_growth_per_session_mb": round((rss_after - rss_before) / args.sessions / 2**20, 2),
+            "accounted_mean_mb": round(sum(accounted) / len(accounted) / 2**20, 2) if accounted else 0.0,
+            "accounted_max_mb": round(max(accounted, default=0) / 2**20, 2),
+            "rss_after_mb": round(rss_after / 2**20, 1)
+        },
+        "gateway": {
+            name: {key: limiter[key] for key in ("granted", "timeouts", "avg_wait", "p95_wait", "max_wait")}
+            for name, limiter in gateway.stats().items()
+        }
+    }
+
+    if server is not None:
+        report["stubs"] = requests.get(f"{base_url}/stats", timeout=5).json()
+        server.should_exit = True
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent users against stubbed providers")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Chat turns per session")
+    parser.add_argument("--upload-ratio", type=float, default=0.5, help="Fraction of sessions that upload a document first")
+    parser.add_argument("--document-paragraphs", type=int, default=40, help="Size of each uploaded document")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between a session's turns")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which sessions start")
+    parser.add_argument("--stub-port", type=int, default=8900, help="Port for the in-process provider stubs")
+    parser.add_argument("--base-url", help="Use stubs already running here instead of starting them")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args(argv)
+    args.sessions = max(1, args.sessions)
+
+    report = run_load(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: loadtest/stub_providers.py
+# Description: Local stand-ins for the Groq chat, Tavily search and Cohere embed APIs
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import re
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Latency per provider as "fixed:SECONDS", "uniform:LOW:HIGH" or "lognormal:MEDIAN:SIGMA"
+STUB_LATENCY = {
+    "groq": os.getenv("STUB_GROQ_LATENCY", "lognormal:0.8:0.5"),
+    "tavily": os.getenv("STUB_TAVILY_LATENCY", "lognormal:0.9:0.4"),
+    "cohere": os.getenv("STUB_COHERE_LATENCY", "lognormal:0.15:0.3")
+}
+
+# Fraction of requests per provider answered with STUB_ERROR_STATUS
+STUB_ERROR_RATE = {
+    "groq": float(os.getenv("STUB_GROQ_ERROR_RATE", "0")),
+    "tavily": float(os.getenv("STUB_TAVILY_ERROR_RATE", "0")),
+    "cohere": float(os.getenv("STUB_COHERE_ERROR_RATE", "0"))
+}
+STUB_ERROR_STATUS = int(os.getenv("STUB_ERROR_STATUS", "503"))
+
+# Shape of generated responses
+STUB_EMBEDDING_DIM = int(os.getenv("STUB_EMBEDDING_DIM", "1024"))
+STUB_ANSWER_WORDS = int(os.getenv("STUB_ANSWER_WORDS", "120"))
+STUB_REASONING_WORDS = int(os.getenv("STUB_REASONING_WORDS", "80"))
+STUB_TOKEN_INTERVAL = float(os.getenv("STUB_TOKEN_INTERVAL", "0.002"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_FILLER = (
+    "the answer draws on the available sources and summarises the main points clearly "
+    "with relevant context and a short explanation of the key facts involved"
+).split()
+
+class LatencyModel:
+    """Samples response latencies from a configured distribution"""
+
+    def __init__(self, spec, rng):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(param) for param in params]
+        self.rng = rng
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self):
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return self.rng.lognormvariate(np.log(median), sigma)
+
+class StubBehaviour:
+    """Latency and error injection for every stubbed provider"""
+
+    def __init__(self, latency=None, error_rate=None, error_status=STUB_ERROR_STATUS, seed=0):
+        self.rng = random.Random(seed)
+        self.latency = {name: LatencyModel(spec, self.rng) for name, spec in {**STUB_LATENCY, **(latency or {})}.items()}
+        self.error_rate = {**STUB_ERROR_RATE, **(error_rate or {})}
+        self.error_status = error_status
+        self.requests = Counter()
+        self.errors = Counter()
+
+    async def respond(self, provider):
+        """Wait out a sampled latency; return an error response if this request should fail"""
+        self.requests[provider] += 1
+        await asyncio.sleep(self.latency[provider].sample())
+        if self.rng.random() < self.error_rate[provider]:
+            self.errors[provider] += 1
+            return JSONResponse({"error": {"message": f"Injected {provider} failure"}}, status_code=self.error_status)
+        return None
+
+def embed_text(text, dim=STUB_EMBEDDING_DIM):
+    """Unit-length hashed bag-of-words vector"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in _TOKEN.findall(text.lower()):
+        vector[zlib.crc32(token.encode()) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+def _completion_text(model, messages):
+    """Answer built from the last user message, with a reasoning block for R1 models"""
+    question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    words = (_TOKEN.findall(question.lower()) + _FILLER) * (STUB_ANSWER_WORDS // len(_FILLER) + 1)
+    answer = " ".join(words[:STUB_ANSWER_WORDS]).capitalize() + "."
+    if "r1" in model.lower() or "deepseek" in model.lower():
+        reasoning = " ".join((_FILLER * (STUB_REASONING_WORDS // len(_FILLER) + 1))[:STUB_REASONING_WORDS])
+        return f"<think>{reasoning}</think>\n\n{answer}"
+    return answer
+
+def create_stub_app(behaviour=None):
+    """FastAPI app serving the three provider APIs"""
+    behaviour = behaviour or StubBehaviour()
+    app = FastAPI(title="Provider stubs")
+    app.state.behaviour = behaviour
+
+    @app.post("/openai/v1/chat/completions")
+    async def groq_chat(request: Request):
+        body = await request.json()
+        error = await behaviour.respond("groq")
+        if error is not None:
+            return error
+
+        model = body.get("model", "stub")
+        text = _completion_text(model, body.get("messages", []))
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", [])),
+            "completion_tokens": len(text) // 4
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            return {
+                "id": f"chatcmpl-{created}",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            }
+
+        async def chunks():
+            pieces = re.findall(r"\S+\s*", text)
+            for i, piece in enumerate(pieces):
+                delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+                chunk = {
+                    "id": f"chatcmpl-{created}",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(STUB_TOKEN_INTERVAL)
+            final = {
+                "id": f"chatcmpl-{created}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": usage}
+            }
+            yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.post("/search")
+    async def tavily_search(request: Request):
+        body = await request.json()
+        error = await behaviour.respond("tavily")
+        if error is not None:
+            return error
+
+        query = body.get("query", "")
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"{query.capitalize()} - result {i}",
+                    "url": f"https://stub.example/{i}",
+                    "content": (
+                        f"This page discusses {query}. It includes background, figures and quotes. "
+                        f"Analysts commented on {query} this week. Unrelated navigation text follows. "
+                    ) * 4,
+                    "score": round(1.0 - i * 0.1, 2)
+                }
+                for i in range(int(body.get("max_results", 5)))
+            ]
+        }
+
+    @app.post("/v1/embed")
+    async def cohere_embed(request: Request):
+        body = await request.json()
+        error = await behaviour.respond("cohere")
+        if error is not None:
+            return error
+
+        texts = body.get("texts", [])
+        return {
+            "response_type": "embeddings_by_type",
+            "id": f"embed-{int(time.time())}",
+            "texts": texts,
+            "embeddings": {"float": [embed_text(text) for text in texts]},
+            "meta": {"api_version": {"version": "1"}, "billed_units": {"input_tokens": sum(len(t) // 4 for t in texts)}}
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": dict(behaviour.requests), "injected_errors": dict(behaviour.errors)}
+
+    return app
+
+def start_stub_server(port, behaviour=None, host="127.0.0.1"):
+    """Serve the stubs on a background thread and return the server once it is listening"""
+    server = uvicorn.Server(uvicorn.Config(create_stub_app(behaviour), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="provider-stubs", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the Groq, Tavily and Cohere APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"Point GROQ_BASE_URL, TAVILY_BASE_URL and COHERE_BASE_URL at http://{args.host}:{args.port}")
+    uvicorn.run(create_stub_app(StubBehaviour(seed=args.seed)), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
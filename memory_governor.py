@@ -0,0 +1,255 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: memory_governor.py
+# Description: Per-session memory accounting with cross-session eviction to disk
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import time
+import pickle
+import threading
+import weakref
+import tempfile
+from retrieval import drop_cached_matrix
+from metrics import metrics
+
+# Memory caps, in megabytes
+SESSION_MEMORY_CAP_MB = float(os.getenv("SESSION_MEMORY_CAP_MB", "256"))
+PROCESS_MEMORY_CAP_MB = float(os.getenv("PROCESS_MEMORY_CAP_MB", "2048"))
+
+# Sessions idle for less than this many seconds are never evicted
+MIN_IDLE_BEFORE_EVICTION = float(os.getenv("MIN_IDLE_BEFORE_EVICTION", "60"))
+
+# Where evicted indexes are written
+MEMORY_SPILL_DIR = os.getenv("MEMORY_SPILL_DIR", os.path.join(tempfile.gettempdir(), "zerthia_spill"))
+
+# Estimated Python object sizes, in bytes
+FLOAT_IN_LIST_BYTES = 32
+RECORD_OVERHEAD_BYTES = 240
+DEFAULT_EMBEDDING_DIM = 1024
+
+class MemoryLimitExceeded(Exception):
+    """Raised when an operation would push a session over its memory cap"""
+
+def estimate_store_bytes(store):
+    """Approximate resident size of an InMemoryVectorStore's entries"""
+    total = 0
+    for entry in store.values():
+        total += len(entry["vector"]) * FLOAT_IN_LIST_BYTES + len(entry["text"]) + RECORD_OVERHEAD_BYTES
+    return total
+
+def estimate_text_bytes(texts):
+    """Approximate size of a collection of strings"""
+    return sum(len(text) + 50 for text in texts)
+
+def estimate_messages_bytes(message_log):
+    """Approximate size of the message log"""
+    return sum(
+        len(message.get("content", "")) + len(message.get("reasoning", "")) + RECORD_OVERHEAD_BYTES
+        for message in message_log
+    )
+
+def estimate_chunks_bytes(chunks, dim=DEFAULT_EMBEDDING_DIM):
+    """Approximate size the chunks will take once embedded"""
+    return sum(len(chunk.page_content) + dim * FLOAT_IN_LIST_BYTES + RECORD_OVERHEAD_BYTES for chunk in chunks)
+
+class _SessionEntry:
+    """Accounting and spill state for one session"""
+
+    def __init__(self, session_id, vector_store, document_contents, on_collect):
+        self.session_id = session_id
+        self.vector_store = weakref.ref(vector_store, on_collect)
+        self.document_contents = document_contents
+        self.last_active = time.monotonic()
+        self.index_bytes = 0
+        self.document_bytes = 0
+        self.message_bytes = 0
+        self.spill_path = None
+        self.lock = threading.RLock()
+
+    @property
+    def total_bytes(self):
+        return self.index_bytes + self.document_bytes + self.message_bytes
+
+class MemoryGovernor:
+    """Tracks bytes per session and evicts idle sessions' indexes under pressure"""
+
+    def __init__(self, session_cap_mb=SESSION_MEMORY_CAP_MB, process_cap_mb=PROCESS_MEMORY_CAP_MB, spill_dir=MEMORY_SPILL_DIR):
+        self.session_cap = int(session_cap_mb * 1024 * 1024)
+        self.process_cap = int(process_cap_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._restores = 0
+
+    def register(self, session_id, vector_store, document_contents):
+        """Start tracking a session, replacing any stale entry for the same id"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry.vector_store() is vector_store:
+                return entry
+
+            # The entry goes away together with the session's vector store
+            def on_collect(_, session_id=session_id):
+                self._forget(session_id)
+
+            entry = _SessionEntry(session_id, vector_store, document_contents, on_collect)
+            self._entries[session_id] = entry
+            return entry
+
+    def _forget(self, session_id):
+        """Drop a session whose state has been garbage collected"""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        if entry is not None and entry.spill_path and os.path.exists(entry.spill_path):
+            os.remove(entry.spill_path)
+
+    def touch(self, session_id, message_log=None):
+        """Mark a session active, restoring its index if it was evicted"""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        with entry.lock:
+            entry.last_active = time.monotonic()
+            restored = bool(entry.spill_path)
+            if restored:
+                self._restore(entry)
+            if message_log is not None:
+                entry.message_bytes = estimate_messages_bytes(message_log)
+        # The restored index counts again, so other sessions may have to make room
+        if restored:
+            self.enforce(active_session_id=session_id)
+
+    def update(self, session_id):
+        """Re-measure a session after its documents changed and enforce the process cap"""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        with entry.lock:
+            vector_store = entry.vector_store()
+            if vector_store is not None and not entry.spill_path:
+                entry.index_bytes = estimate_store_bytes(vector_store.store)
+                entry.document_bytes = estimate_text_bytes(entry.document_contents.values())
+        self.enforce(active_session_id=session_id)
+
+    def add_message(self, session_id, message):
+        """Count a message appended to a session's log"""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+        with entry.lock:
+            entry.message_bytes += estimate_messages_bytes([message])
+
+    def check_capacity(self, session_id, additional_bytes):
+        """Raise if adding this many bytes would exceed the session cap"""
+        entry = self._entries.get(session_id)
+        current = entry.total_bytes if entry is not None else 0
+        if current + additional_bytes > self.session_cap:
+            raise MemoryLimitExceeded(
+                f"This session would use {(current + additional_bytes) / 1048576:.0f} MB, "
+                f"above the {self.session_cap / 1048576:.0f} MB limit"
+            )
+
+    def enforce(self, active_session_id=None):
+        """Evict least-recently-active idle sessions until under the process cap"""
+        with self._lock:
+            entries = list(self._entries.values())
+
+        total = sum(entry.total_bytes for entry in entries)
+        if total <= self.process_cap:
+            return 0
+
+        evicted = 0
+        now = time.monotonic()
+        for entry in sorted(entries, key=lambda entry: entry.last_active):
+            if total <= self.process_cap:
+                break
+            if entry.session_id == active_session_id or entry.spill_path:
+                continue
+            if now - entry.last_active < MIN_IDLE_BEFORE_EVICTION:
+                continue
+            freed = self._spill(entry)
+            total -= freed
+            evicted += 1 if freed else 0
+        return evicted
+
+    def _spill(self, entry):
+        """Write a session's index and documents to disk and free them"""
+        with entry.lock:
+            vector_store = entry.vector_store()
+            if vector_store is None or entry.spill_path:
+                return 0
+
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{entry.session_id}.pkl")
+            with open(path, "wb") as f:
+                pickle.dump({"store": vector_store.store, "documents": entry.document_contents}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            # Clear in place so the session's own references see the change
+            freed = entry.index_bytes + entry.document_bytes
+            vector_store.store.clear()
+            entry.document_contents.clear()
+            entry.spill_path = path
+            entry.index_bytes = 0
+            entry.document_bytes = 0
+            self._evictions += 1
+
+            # Derived search matrices must not keep the evicted vectors alive
+            drop_cached_matrix(vector_store)
+            return freed
+
+    def _restore(self, entry):
+        """Load a spilled session back into memory"""
+        vector_store = entry.vector_store()
+        with open(entry.spill_path, "rb") as f:
+            spilled = pickle.load(f)
+        if vector_store is not None:
+            vector_store.store.update(spilled["store"])
+        entry.document_contents.update(spilled["documents"])
+        os.remove(entry.spill_path)
+        entry.spill_path = None
+        if vector_store is not None:
+            entry.index_bytes = estimate_store_bytes(vector_store.store)
+        entry.document_bytes = estimate_text_bytes(entry.document_contents.values())
+        self._restores += 1
+
+    def session_bytes(self, session_id):
+        """Bytes currently accounted to a session"""
+        entry = self._entries.get(session_id)
+        return entry.total_bytes if entry is not None else 0
+
+    def stats(self):
+        """Per-process totals and per-session usage"""
+        with self._lock:
+            entries = list(self._entries.values())
+        stores = [entry.vector_store() for entry in entries if not entry.spill_path]
+        return {
+            "sessions": len(entries),
+            "indexed_chunks": sum(len(store.store) for store in stores if store is not None),
+            "resident_bytes": sum(entry.total_bytes for entry in entries),
+            "spilled_sessions": sum(1 for entry in entries if entry.spill_path),
+            "evictions": self._evictions,
+            "restores": self._restores,
+            "session_bytes": {entry.session_id: entry.total_bytes for entry in entries}
+        }
+
+# Governor shared by every session in this process
+memory_governor = MemoryGovernor()
+
+# Session and vector store sizes read from stats() at scrape time
+GOVERNOR_METRICS = {
+    "sessions": ("zerthia_sessions_tracked", "Sessions with accounted memory", "gauge"),
+    "indexed_chunks": ("zerthia_vector_store_chunks", "Chunks held in resident vector stores", "gauge"),
+    "resident_bytes": ("zerthia_session_resident_bytes", "Estimated bytes held by all sessions", "gauge"),
+    "spilled_sessions": ("zerthia_sessions_spilled", "Sessions whose index is spilled to disk", "gauge"),
+    "evictions": ("zerthia_session_evictions_total", "Session indexes spilled to disk", "counter"),
+    "restores": ("zerthia_session_restores_total", "Spilled session indexes loaded back", "counter")
+}
+for key, (name, documentation, kind) in GOVERNOR_METRICS.items():
+    metrics.callback(name, documentation, lambda key=key: memory_governor.stats()[key], kind=kind)
@@ -0,0 +1,310 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: metrics.py
+# Description: In-process counters and histograms exposed in Prometheus text format
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Local scrape endpoint of the Streamlit process; port 0 disables it
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Latency buckets in seconds, from cache lookups up to slow reasoning turns
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Per-thread shards are folded into the totals once this many exist
+MAX_LIVE_SHARDS = 64
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, 0.0 when it is empty"""
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else 0.0
+
+class _Shards:
+    """Per-thread value arrays, summed when read, so writers never take a lock
+
+    Each thread only ever writes its own array. Arrays of finished threads are
+    folded into a retired total so short-lived threads do not pile up.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._live = []
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+
+    def cell(self):
+        """The calling thread's array"""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0.0] * self.size
+            with self._lock:
+                if len(self._live) >= MAX_LIVE_SHARDS:
+                    self._retire_finished()
+                self._live.append((threading.current_thread(), values))
+            self._local.values = values
+            return values
+
+    def _retire_finished(self):
+        live = []
+        for thread, values in self._live:
+            if thread.is_alive():
+                live.append((thread, values))
+            else:
+                for i, value in enumerate(values):
+                    self._retired[i] += value
+        self._live = live
+
+    def totals(self):
+        """Sum of every thread's array"""
+        with self._lock:
+            self._retire_finished()
+            totals = list(self._retired)
+            for _, values in self._live:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return totals
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.cell()[0] += amount
+
+    def value(self):
+        return self._shards.totals()[0]
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf, then the sum
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value):
+        cell = self._shards.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        """Cumulative bucket counts, the count and the sum"""
+        totals = self._shards.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+class _Metric:
+    """A named metric family with optional labels"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels):
+        """Child for one combination of label values"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+class Counter(_Metric):
+    """Monotonic count; increments never lock"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._unlabelled().inc(amount)
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value())}" for key, child in self.children()]
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets; observations never lock"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+    def render(self):
+        lines = []
+        for key, child in self.children():
+            cumulative, count, total = child.snapshot()
+            for bound, running in zip(self.buckets + (math.inf,), cumulative):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {_format_value(running)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(count)}")
+        return lines
+
+class Callback(_Metric):
+    """Gauge or counter read from another component's state at scrape time
+
+    func returns a number, or a dict from label value tuples to numbers.
+    """
+
+    def __init__(self, name, documentation, func, labelnames=(), kind="gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+        self.kind = kind
+
+    def render(self):
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+class MetricsRegistry:
+    """All metrics of the process, rendered together for a scrape"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-imported modules (Streamlit reruns) get the existing metric back
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if isinstance(existing, Callback):
+                    existing.func = metric.func
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, func, labelnames=(), kind="gauge"):
+        return self._register(Callback(name, documentation, func, labelnames, kind))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                # One broken callback must not fail the whole scrape
+                logger.warning("Could not collect metric %s: %s", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+class _ScrapeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics on a background thread, once per process; returns the server or None"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _ScrapeHandler)
+            except OSError as e:
+                logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
+
+# Registry shared by every session in this process
+metrics = MetricsRegistry()
@@ -0,0 +1,222 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: profiling.py
+# Description: On-demand sampling and cProfile profiles of single pipeline calls
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import sys
+import time
+import cProfile
+import datetime
+import functools
+import threading
+from collections import Counter, deque
+from tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# "sample" writes folded stacks for flamegraph.pl / speedscope; "cprofile" writes pstats files
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+
+# Sessions whose every call is profiled, comma separated
+PROFILE_SESSIONS = {sid for sid in os.getenv("PROFILE_SESSIONS", "").split(",") if sid}
+
+# Keep the profile of any call slower than this many seconds; 0 turns threshold profiling off
+PROFILE_LATENCY_THRESHOLD = float(os.getenv("PROFILE_LATENCY_THRESHOLD", "0"))
+
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+# Let ?profile=1 in the Streamlit URL profile every call of that session
+PROFILE_FROM_URL = os.getenv("PROFILE_FROM_URL", "false").lower() == "true"
+
+# Where profiles are written
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".profiles")
+
+# Number of recent profile paths kept for stats()
+RECENT_PROFILES = 20
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+def fold_stack(frame, root_code=None):
+    """Folded stack of a frame, outermost first, starting at root_code when it is on the stack"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        if frame.f_code is root_code:
+            break
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+class _Target:
+    """Stacks sampled so far for one profiled call"""
+
+    def __init__(self, root_code):
+        self.root_code = root_code
+        self.stacks = Counter()
+
+class StackSampler:
+    """Samples the stacks of registered threads from one background thread
+
+    The thread only runs while at least one call is being profiled.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id, root_code):
+        """Begin sampling a thread; returns the target collecting its stacks"""
+        target = _Target(root_code)
+        with self._lock:
+            self._targets[thread_id] = target
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        return target
+
+    def stop(self, thread_id):
+        """Stop sampling a thread"""
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, target in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        target.stacks[fold_stack(frame, target.root_code)] += 1
+            del frames
+            time.sleep(self.interval)
+
+class Profiler:
+    """Decides which pipeline calls to profile and writes their profiles to disk"""
+
+    def __init__(self, mode=PROFILE_MODE, sessions=None, latency_threshold=PROFILE_LATENCY_THRESHOLD, output_dir=PROFILE_DIR):
+        self.mode = mode
+        self.sessions = set(PROFILE_SESSIONS if sessions is None else sessions)
+        self.latency_threshold = latency_threshold
+        self.output_dir = output_dir
+        self.sampler = StackSampler()
+        self._armed = set()
+        self._lock = threading.Lock()
+        self._captured = 0
+        self._discarded = 0
+        self._recent = deque(maxlen=RECENT_PROFILES)
+
+    def profile_next(self, session_id):
+        """Profile the next call made for a session"""
+        with self._lock:
+            self._armed.add(session_id)
+
+    def enable_session(self, session_id):
+        """Profile every call made for a session"""
+        self.sessions.add(session_id)
+
+    def disable_session(self, session_id):
+        self.sessions.discard(session_id)
+        with self._lock:
+            self._armed.discard(session_id)
+
+    def wants(self, session_id):
+        """Whether a call for this session must be profiled; cheap when profiling is off"""
+        if not (self._armed or self.sessions or self.latency_threshold > 0):
+            return False
+        return session_id in self.sessions or session_id in self._armed or self.latency_threshold > 0
+
+    def run(self, name, session_id, func, *args, **kwargs):
+        """Call func under the profiler and keep the profile when it was asked for or slow"""
+        with self._lock:
+            requested = session_id in self.sessions or session_id in self._armed
+            self._armed.discard(session_id)
+
+        start = time.perf_counter()
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Another profiler already owns this interpreter (Python 3.12+)
+                logger.warning("Profiling %s skipped: %s", name, e)
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._finish(name, session_id, requested, time.perf_counter() - start, profile)
+        else:
+            thread_id = threading.get_ident()
+            target = self.sampler.start(thread_id, getattr(func, "__code__", None))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.sampler.stop(thread_id)
+                self._finish(name, session_id, requested, time.perf_counter() - start, target.stacks)
+
+    def _finish(self, name, session_id, requested, elapsed, result):
+        """Write the profile of a finished call, or drop it if it was fast and not requested"""
+        if not requested and elapsed < self.latency_threshold:
+            self._discarded += 1
+            return None
+
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        base = os.path.join(self.output_dir, f"{name}_{session_id}_{stamp}_{int(elapsed * 1000)}ms")
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            if isinstance(result, cProfile.Profile):
+                path = f"{base}.prof"
+                result.dump_stats(path)
+            else:
+                path = f"{base}.folded"
+                with open(path, "w", encoding="utf-8") as f:
+                    for stack, count in result.most_common():
+                        f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.warning("Could not write profile for %s: %s", name, e)
+            return None
+
+        self._captured += 1
+        self._recent.append(path)
+        current_span().set(profile=path)
+        return path
+
+    def stats(self):
+        """Profiling configuration and recently written profiles"""
+        return {
+            "mode": self.mode,
+            "latency_threshold": self.latency_threshold,
+            "sessions": sorted(self.sessions),
+            "armed": sorted(self._armed),
+            "captured": self._captured,
+            "discarded": self._discarded,
+            "recent": list(self._recent)
+        }
+
+def profiled(name):
+    """Decorator profiling calls whose first argument is a SessionContext, when asked to"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(ctx, *args, **kwargs):
+            if not profiler.wants(ctx.session_id):
+                return func(ctx, *args, **kwargs)
+            return profiler.run(name, ctx.session_id, func, ctx, *args, **kwargs)
+        return wrapper
+    return decorate
+
+# Profiler shared by every session in this process
+profiler = Profiler()
@@ -0,0 +1,345 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: provider_gateway.py
+# Description: Shared, pooled provider clients with rate limiting and fair queuing
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import time
+import functools
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.embeddings import Embeddings
+from single_flight import flights, request_key
+from resilience import resilience
+from metrics import metrics, percentile
+
+# Provider endpoints, overridable for local stand-in services
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com")
+COHERE_BASE_URL = os.getenv("COHERE_BASE_URL")
+
+# Connection pool sizing shared by every session in the process
+POOL_MAX_CONNECTIONS = int(os.getenv("PROVIDER_POOL_MAX_CONNECTIONS", "32"))
+POOL_MAX_KEEPALIVE = int(os.getenv("PROVIDER_POOL_MAX_KEEPALIVE", "16"))
+POOL_KEEPALIVE_EXPIRY = 60.0
+HTTP_TIMEOUT = float(os.getenv("PROVIDER_HTTP_TIMEOUT", "60"))
+
+# Per-provider limits: requests per minute, burst size and concurrent calls
+PROVIDER_LIMITS = {
+    "groq": {
+        "requests_per_minute": int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+        "burst": int(os.getenv("GROQ_BURST", "5")),
+        "max_concurrency": int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+    },
+    "tavily": {
+        "requests_per_minute": int(os.getenv("TAVILY_REQUESTS_PER_MINUTE", "100")),
+        "burst": int(os.getenv("TAVILY_BURST", "10")),
+        "max_concurrency": int(os.getenv("TAVILY_MAX_CONCURRENCY", "8"))
+    },
+    "cohere": {
+        "requests_per_minute": int(os.getenv("COHERE_REQUESTS_PER_MINUTE", "100")),
+        "burst": int(os.getenv("COHERE_BURST", "10")),
+        "max_concurrency": int(os.getenv("COHERE_MAX_CONCURRENCY", "8"))
+    }
+}
+
+# How long a request may wait in the queue before giving up
+QUEUE_TIMEOUT = float(os.getenv("PROVIDER_QUEUE_TIMEOUT", "120"))
+
+# Number of recent wait times kept for statistics
+WAIT_SAMPLE_SIZE = 500
+
+# Provider latency once a slot is granted, and time spent queuing for the slot
+provider_latency = metrics.histogram(
+    "zerthia_provider_request_duration_seconds", "Provider call latency per attempt", ["provider", "outcome"]
+)
+provider_queue_wait = metrics.histogram(
+    "zerthia_provider_queue_wait_seconds", "Time spent waiting for a rate-limited provider slot", ["provider"]
+)
+
+# Session on whose behalf provider calls are currently made
+_current_session = contextvars.ContextVar("provider_session", default="anonymous")
+
+class GatewayTimeout(Exception):
+    """Raised when a request waits in the provider queue for too long"""
+
+    # Local congestion, not a provider fault: retrying would only queue again
+    retryable = False
+
+@contextmanager
+def session_scope(session_id):
+    """Attribute provider calls made inside the block to a session"""
+    token = _current_session.set(session_id or "anonymous")
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Take a token if available, else return seconds until one is"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class FairLimiter:
+    """Rate and concurrency limiter that serves waiting sessions round-robin"""
+
+    def __init__(self, name, requests_per_minute, burst, max_concurrency):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()
+        self._in_flight = 0
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._granted = 0
+        self._timeouts = 0
+
+    def _is_next(self, session_id, ticket):
+        """Check whether a ticket is at the head of the round-robin order"""
+        head_session = next(iter(self._queues))
+        return head_session == session_id and self._queues[session_id][0] is ticket
+
+    def _remove(self, session_id, ticket):
+        """Drop a ticket from its session queue"""
+        queue = self._queues[session_id]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[session_id]
+
+    def acquire(self, session_id, timeout=QUEUE_TIMEOUT):
+        """Block until the session may call the provider, return the wait time"""
+        ticket = object()
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(session_id, ticket)
+                    self._timeouts += 1
+                    self._cond.notify_all()
+                    raise GatewayTimeout(f"Timed out waiting for {self.name} after {timeout:.1f}s")
+
+                if self._is_next(session_id, ticket) and self._in_flight < self.max_concurrency:
+                    retry_after = self._bucket.take()
+                    if retry_after == 0:
+                        break
+                    self._cond.wait(min(retry_after, remaining))
+                else:
+                    self._cond.wait(remaining)
+
+            # Grant the slot and move the session to the back of the rotation
+            self._remove(session_id, ticket)
+            if session_id in self._queues:
+                self._queues.move_to_end(session_id)
+            self._in_flight += 1
+            self._granted += 1
+            waited = time.monotonic() - start
+            self._waits.append(waited)
+            self._cond.notify_all()
+
+        return waited
+
+    def release(self):
+        """Free a concurrency slot"""
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return queue depth and wait time statistics"""
+        with self._cond:
+            waits = sorted(self._waits)
+            queue_depth = sum(len(queue) for queue in self._queues.values())
+            return {
+                "queue_depth": queue_depth,
+                "waiting_sessions": len(self._queues),
+                "in_flight": self._in_flight,
+                "granted": self._granted,
+                "timeouts": self._timeouts,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": percentile(waits, 0.95),
+                "max_wait": waits[-1] if waits else 0.0
+            }
+
+class PooledTavilyClient:
+    """Tavily search client backed by a shared keep-alive connection pool"""
+
+    def __init__(self, api_key, session, base_url=TAVILY_BASE_URL):
+        self.api_key = api_key
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+
+    def search(self, query, search_depth="basic", max_results=5, timeout=HTTP_TIMEOUT, **kwargs):
+        """Run a Tavily search and return the decoded response"""
+        payload = {
+            "api_key": self.api_key,
+            "query": query,
+            "search_depth": search_depth,
+            "max_results": max_results,
+            **kwargs
+        }
+        response = self.session.post(
+            f"{self.base_url}/search",
+            json=payload,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+class GatewayEmbeddings(Embeddings):
+    """Embedding model wrapper that routes every call through the gateway"""
+
+    def __init__(self, embeddings, provider, gateway):
+        self.embeddings = embeddings
+        self.provider = provider
+        self.gateway = gateway
+
+    def embed_documents(self, texts):
+        # Identical concurrent uploads share one embedding request
+        key = request_key("embed_documents", self.provider, *texts)
+        return flights.do(key, self.gateway.call, self.provider, self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text):
+        # Identical concurrent queries share one embedding request
+        key = request_key("embed_query", self.provider, text)
+        return flights.do(key, self.gateway.call, self.provider, self.embeddings.embed_query, text)
+
+class ProviderGateway:
+    """Process-wide entry point for all provider calls"""
+
+    def __init__(self, limits=None):
+        self.limiters = {
+            name: FairLimiter(name, **config)
+            for name, config in (limits or PROVIDER_LIMITS).items()
+        }
+        self._http_client = None
+        self._requests_session = None
+        self._lock = threading.Lock()
+
+    def http_client(self):
+        """Shared httpx client for SDKs built on httpx (Groq, Cohere)"""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=POOL_MAX_KEEPALIVE,
+                        keepalive_expiry=POOL_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=HTTP_TIMEOUT
+                )
+            return self._http_client
+
+    def requests_session(self):
+        """Shared requests session for plain HTTP providers (Tavily)"""
+        with self._lock:
+            if self._requests_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAX_CONNECTIONS)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._requests_session = session
+            return self._requests_session
+
+    @contextmanager
+    def slot(self, provider, timeout=QUEUE_TIMEOUT):
+        """Hold a rate-limited slot for the current session"""
+        limiter = self.limiters.get(provider)
+        if limiter is None:
+            yield 0.0
+            return
+
+        waited = limiter.acquire(_current_session.get(), timeout)
+        provider_queue_wait.labels(provider=provider).observe(waited)
+        try:
+            yield waited
+        finally:
+            limiter.release()
+
+    def _call_in_slot(self, provider, func, deadline, *args, **kwargs):
+        """Call a provider function once a slot is granted"""
+        queue_timeout = QUEUE_TIMEOUT if deadline is None else min(QUEUE_TIMEOUT, deadline.remaining())
+        with self.slot(provider, queue_timeout):
+            if deadline is not None:
+                if deadline.expired():
+                    raise GatewayTimeout(f"Deadline passed before calling {provider}")
+                # The attempt only gets the time the deadline has left
+                kwargs["timeout"] = deadline.remaining()
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                provider_latency.labels(provider=provider, outcome=outcome).observe(time.perf_counter() - start)
+
+    def call(self, provider, func, *args, deadline=None, **kwargs):
+        """Call a provider with retries and circuit breaking, one slot per attempt
+
+        With a deadline, queuing for a slot, retries and each attempt's timeout
+        all end when it does; func must then take a timeout keyword.
+        """
+        operation = getattr(func, "__name__", "call")
+        attempt = functools.partial(self._call_in_slot, provider, func, deadline)
+        return resilience.call(provider, attempt, *args, operation=operation, deadline=deadline, **kwargs)
+
+    def queue_depth(self, provider=None):
+        """Number of requests waiting for one or all providers"""
+        names = [provider] if provider else list(self.limiters)
+        return sum(self.limiters[name].stats()["queue_depth"] for name in names)
+
+    def stats(self):
+        """Per-provider queue depth and wait time statistics"""
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+    def resilience_stats(self):
+        """Per-provider breaker state and retry counters"""
+        return resilience.stats()
+
+# Gateway shared by every Streamlit session in this process
+gateway = ProviderGateway()
+
+# Queue state read from the limiters at scrape time
+metrics.callback(
+    "zerthia_provider_queue_depth", "Requests waiting for a provider slot",
+    lambda: {(name, ): stats["queue_depth"] for name, stats in gateway.stats().items()}, ["provider"]
+)
+metrics.callback(
+    "zerthia_provider_in_flight", "Provider calls currently holding a slot",
+    lambda: {(name, ): stats["in_flight"] for name, stats in gateway.stats().items()}, ["provider"]
+)
+metrics.callback(
+    "zerthia_provider_queue_timeouts_total", "Requests that gave up waiting for a provider slot",
+    lambda: {(name, ): stats["timeouts"] for name, stats in gateway.stats().items()}, ["provider"], kind="counter"
+)
@@ -0,0 +1,242 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: query_router.py
+# Description: Routes user queries to document search, web search or plain chat
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import logging
+import re
+import math
+import weakref
+import threading
+from dataclasses import dataclass
+from retrieval import query_vectors
+
+logger = logging.getLogger(__name__)
+
+# Explicit requests for a web search
+EXPLICIT_SEARCH_PATTERNS = [
+    "search for", "look up", "find information", "search the web",
+    "what's the latest", "current news", "recent updates"
+]
+
+# Queries about current events, dates, or time-sensitive information
+TIME_SENSITIVE_PATTERNS = [
+    "today", "current", "latest", "recent", "now", "update",
+    "news", "weather", "price", "stock", "bitcoin", "crypto",
+    "happened", "trending", "score", "result", "happening",
+    "currently", "recently", "updated", "cryptocurrency"
+]
+
+# Questions about specific factual information that might need verification
+FACTUAL_PATTERNS = [
+    "how many", "how much", "what is the population", "what is the distance",
+    "how far", "how old", "when was", "where is", "who is the current"
+]
+
+# Conversational, opinion, or emotional queries that never need a search
+CONVERSATIONAL_PATTERNS = [
+    "how are you", "what do you think", "can you help", "i feel",
+    "i'm feeling", "i am feeling", "i need advice", "what should i do",
+    "how do you feel", "tell me about yourself", "who are you"
+]
+
+# Explicit references to the uploaded documents
+DOCUMENT_PATTERNS = [
+    "in the document", "from the pdf", "in the pdf", "document says",
+    "check the document", "in the uploaded", "from the uploaded",
+    "the document mentions", "in my document", "in my pdf",
+    "what does the document say about", "find in document",
+    "tell me about the document", "summarize the document",
+    "what's in the pdf", "what is in the document",
+    "analyze the pdf", "analyze the document"
+]
+
+# Information-seeking openers, only meaningful when documents are loaded
+INFO_PREFIX_PATTERNS = [
+    "what is", "how does", "tell me about", "explain", "summarize",
+    "what are", "where is", "who is", "when did", "why did",
+    "what was", "how many", "how much"
+]
+
+# Seed utterances for the embedding fallback, one centroid per intent
+INTENT_EXAMPLES = {
+    "chat": [
+        "hello, how is your day going",
+        "thank you so much for the help",
+        "i'm feeling a bit anxious today",
+        "can you give me some advice about motivation",
+        "tell me a joke",
+        "what do you think about friendship"
+    ],
+    "web": [
+        "what are the latest developments in the news",
+        "who won the match last night",
+        "what is the exchange rate of the dollar",
+        "when is the next product launch event",
+        "what is the weather forecast for tomorrow",
+        "which company announced layoffs this week"
+    ],
+    "documents": [
+        "what does the report conclude",
+        "list the key points from the file i uploaded",
+        "which section covers the pricing terms",
+        "what are the totals in the spreadsheet",
+        "give me the main findings of the paper",
+        "what does the contract say about termination"
+    ]
+}
+
+# Minimum cosine margin between the best and second best intent
+CLASSIFIER_MIN_MARGIN = 0.02
+
+# Collections above this size are not searched on an ambiguous query alone
+FEW_DOCUMENTS_LIMIT = 3
+
+@dataclass
+class Route:
+    """Routing decision for a single user query"""
+    intent: str
+    web: bool
+    docs: bool
+    source: str
+
+def _alternation(patterns):
+    """Build a regex alternation, longest pattern first"""
+    ordered = sorted(set(patterns), key=len, reverse=True)
+    return "|".join(re.escape(pattern) for pattern in ordered)
+
+# Single compiled matcher covering the phrase families in one scan
+_ROUTE_MATCHER = re.compile(
+    r"\A(?=(?P<info>" + _alternation(INFO_PREFIX_PATTERNS) + r")\b)"
+    r"|\b(?P<document>" + _alternation(DOCUMENT_PATTERNS) + r")\b"
+    r"|\b(?P<explicit>" + _alternation(EXPLICIT_SEARCH_PATTERNS) + r")\b"
+    r"|\b(?P<conversational>" + _alternation(CONVERSATIONAL_PATTERNS) + r")\b"
+    r"|\b(?P<factual>" + _alternation(FACTUAL_PATTERNS) + r")\b"
+)
+
+# Time words are searched on their own: phrases such as "who is the current"
+# would otherwise consume them, since finditer never returns overlapping matches
+_TIME_MATCHER = re.compile(r"\b(?:" + _alternation(TIME_SENSITIVE_PATTERNS) + r")s?\b")
+
+def match_patterns(query):
+    """Return the set of pattern families found in the query"""
+    text = query.lower().strip()
+    families = {match.lastgroup for match in _ROUTE_MATCHER.finditer(text)}
+    if _TIME_MATCHER.search(text):
+        families.add("time")
+    return families
+
+def _cosine(a, b):
+    """Cosine similarity between two vectors"""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class IntentClassifier:
+    """Nearest-centroid intent classifier over cached embeddings"""
+
+    def __init__(self, embeddings, examples=None):
+        # Weak, so the cached classifier does not keep its embedding model alive
+        self._embeddings = weakref.ref(embeddings)
+        self.examples = examples or INTENT_EXAMPLES
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self._embeddings()
+
+    def _build_centroids(self):
+        """Embed the seed utterances once and average them per intent"""
+        centroids = {}
+        for intent, utterances in self.examples.items():
+            vectors = self.embeddings.embed_documents(utterances)
+            dim = len(vectors[0])
+            centroids[intent] = [sum(vector[i] for vector in vectors) / len(vectors) for i in range(dim)]
+        return centroids
+
+    def centroids(self):
+        """Intent centroids, built by the first caller while concurrent ones wait"""
+        with self._lock:
+            if self._centroids is None:
+                self._centroids = self._build_centroids()
+            return self._centroids
+
+    def classify(self, query):
+        """Return (intent, margin) for the nearest centroid"""
+        centroids = self.centroids()
+
+        # Retrieval reuses this vector if the turn goes on to search the documents
+        vector = query_vectors.embed(self.embeddings, query)
+        scores = sorted(
+            ((_cosine(vector, centroid), intent) for intent, centroid in centroids.items()),
+            reverse=True
+        )
+        margin = scores[0][0] - scores[1][0] if len(scores) > 1 else scores[0][0]
+        return scores[0][1], margin
+
+# Classifiers are cached per embedding model so centroids are only built once;
+# keyed by id because pydantic embedding models are unhashable, and dropped
+# when the model is collected so a reused id never returns a stale classifier
+_classifiers = {}
+_classifiers_lock = threading.Lock()
+
+def get_classifier(embeddings):
+    """Return the shared classifier for an embedding model"""
+    key = id(embeddings)
+    with _classifiers_lock:
+        classifier = _classifiers.get(key)
+        if classifier is None:
+            classifier = IntentClassifier(embeddings)
+            _classifiers[key] = classifier
+            weakref.finalize(embeddings, _classifiers.pop, key, None)
+    return classifier
+
+def route_query(query, has_documents=False, document_count=0, embeddings=None):
+    """Decide whether a query needs document search, web search, or neither"""
+    families = match_patterns(query)
+
+    # Explicit document references win whenever documents are loaded
+    if "document" in families:
+        return Route("documents", web=False, docs=has_documents, source="pattern")
+
+    # Explicit search requests go to the web
+    if "explicit" in families:
+        return Route("web", web=True, docs=False, source="pattern")
+
+    # Information openers are answered from the documents when there are any,
+    # falling back to the web for time-sensitive ones the documents cannot answer
+    if has_documents and "info" in families:
+        return Route("documents", web="time" in families, docs=True, source="pattern")
+
+    # Time-sensitive requests go to the web, after the documents if there are any
+    if "time" in families:
+        return Route("web", web=True, docs=has_documents, source="pattern")
+
+    if "factual" in families:
+        return Route("web", web=True, docs=False, source="pattern")
+
+    if "conversational" in families:
+        return Route("chat", web=False, docs=False, source="pattern")
+
+    # Ambiguous query: ask the embedding classifier
+    if embeddings is not None:
+        try:
+            intent, margin = get_classifier(embeddings).classify(query)
+            if margin >= CLASSIFIER_MIN_MARGIN:
+                if intent == "documents" and not has_documents:
+                    intent = "chat"
+                return Route(intent, web=intent == "web", docs=intent == "documents", source="classifier")
+        except Exception as e:
+            logger.warning("Intent classification failed, using default route: %s", e)
+
+    # Default: small collections are cheap enough to always consult
+    if has_documents and document_count <= FEW_DOCUMENTS_LIMIT:
+        return Route("documents", web=False, docs=True, source="default")
+    return Route("chat", web=False, docs=False, source="default")
@@ -0,0 +1,111 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: reasoning.py
+# Description: Reasoning-token policy and parsing for DeepSeek-R1 style responses
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import re
+from dataclasses import dataclass
+from context_packer import estimate_tokens
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+_THINK_BLOCK = re.compile(r"<think>(.*?)(?:</think>|\Z)", flags=re.DOTALL)
+
+@dataclass(frozen=True)
+class ReasoningPolicy:
+    """Token limits for one kind of turn"""
+    max_tokens: int
+    max_reasoning_tokens: int
+    stop_at_boundary: bool = False
+
+# Limits per route; conversational turns get the tightest reasoning budget
+REASONING_POLICIES = {
+    "chat": ReasoningPolicy(max_tokens=768, max_reasoning_tokens=256, stop_at_boundary=True),
+    "web": ReasoningPolicy(max_tokens=2048, max_reasoning_tokens=1024, stop_at_boundary=True),
+    "documents": ReasoningPolicy(max_tokens=2048, max_reasoning_tokens=1024, stop_at_boundary=False)
+}
+
+class ReasoningCapExceeded(Exception):
+    """Raised when the model is still reasoning after its reasoning budget"""
+
+    # Repeating the same prompt would overrun again
+    retryable = False
+
+class PartialStreamError(Exception):
+    """Raised when a completion fails after part of its answer was already streamed"""
+
+    # A retry or another tier would stream the answer again from the start
+    retryable = False
+
+    def __init__(self, text, error):
+        super().__init__(f"Completion failed after part of the answer was streamed: {str(error)}")
+        self.text = text
+
+def split_reasoning(text):
+    """Separate <think> blocks from the answer, returning (answer, reasoning)"""
+    reasoning = "\n\n".join(block.strip() for block in _THINK_BLOCK.findall(text) if block.strip())
+    answer = _THINK_BLOCK.sub("", text).strip()
+    return answer, reasoning
+
+def policy_for(intent):
+    """Reasoning policy for a routed intent"""
+    return REASONING_POLICIES.get(intent, REASONING_POLICIES["chat"])
+
+def _answer_offset(text):
+    """Where the answer starts in a partial response, or None while it may still be reasoning"""
+    stripped = text.lstrip()
+    if not stripped.startswith(THINK_OPEN):
+        # Too short to tell whether a reasoning block is opening
+        return None if THINK_OPEN.startswith(stripped) else 0
+    close = text.find(THINK_CLOSE)
+    return close + len(THINK_CLOSE) if close >= 0 else None
+
+def complete(llm, messages, policy, on_token=None):
+    """Run a completion under a reasoning policy and return the raw text
+
+    With stop_at_boundary the response is streamed and abandoned as soon as
+    the reasoning outgrows its budget without reaching the answer. on_token,
+    when given, receives answer text as it arrives; reasoning is never forwarded.
+    A failure after answer text was forwarded raises PartialStreamError, so the
+    text is never streamed twice.
+    """
+    if not policy.stop_at_boundary and on_token is None:
+        return llm.invoke(messages, max_tokens=policy.max_tokens).content
+
+    text = ""
+    answer_from = None
+    emitted = 0
+    streamed = False
+    try:
+        for chunk in llm.stream(messages, max_tokens=policy.max_tokens):
+            text += chunk.content
+            if answer_from is None:
+                answer_from = _answer_offset(text)
+                if answer_from is None:
+                    reasoning = text.lstrip()[len(THINK_OPEN):]
+                    if policy.stop_at_boundary and estimate_tokens(reasoning) > policy.max_reasoning_tokens:
+                        raise ReasoningCapExceeded(f"Reasoning exceeded {policy.max_reasoning_tokens} tokens")
+                    continue
+                # Boundary reached: the rest is answer and no cap applies
+                emitted = answer_from
+
+            if on_token is not None and len(text) > emitted:
+                on_token(text[emitted:])
+                emitted = len(text)
+                streamed = True
+    except Exception as e:
+        if streamed:
+            raise PartialStreamError(text, e) from e
+        raise
+
+    # A reply shorter than the opening tag never crossed a boundary
+    if on_token is not None and answer_from is None and text.strip() and not text.lstrip().startswith(THINK_OPEN):
+        on_token(text)
+    return text
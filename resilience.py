@@ -0,0 +1,256 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: resilience.py
+# Description: Retries, circuit breakers and hedged requests for provider calls
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import time
+import random
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from metrics import metrics, percentile
+
+# Retry policy: attempts per call and exponential backoff bounds, in seconds
+MAX_ATTEMPTS = int(os.getenv("PROVIDER_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.getenv("PROVIDER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("PROVIDER_BACKOFF_MAX", "8"))
+
+# Circuit breaker: consecutive failures that open it and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+# Providers whose slow calls get a second, hedged request
+HEDGED_PROVIDERS = set(filter(None, os.getenv("HEDGED_PROVIDERS", "tavily,cohere").split(",")))
+
+# Operations never hedged: a duplicate embedding batch costs as much as the original
+UNHEDGED_OPERATIONS = {"embed_documents"}
+
+# Latency samples kept per provider operation, and samples needed before hedging starts
+LATENCY_WINDOW = 200
+MIN_HEDGE_SAMPLES = 20
+
+# HTTP status codes that will not succeed on a retry
+NON_RETRYABLE_STATUS = {400, 401, 403, 404, 422}
+
+class CircuitOpen(Exception):
+    """Raised when a provider's circuit breaker rejects a call"""
+
+def _status_code(error):
+    """Best-effort HTTP status code of a provider error"""
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+def is_retryable(error):
+    """Decide whether an error is worth another attempt"""
+    if isinstance(error, CircuitOpen) or not getattr(error, "retryable", True):
+        return False
+    return _status_code(error) not in NON_RETRYABLE_STATUS
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given retry number"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by consecutive failures"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Check whether a call may go through, admitting one trial when half-open"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a half-open trial without judging the provider"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class ProviderResilience:
+    """Breaker, latency windows per operation and counters for one provider"""
+
+    def __init__(self, name, hedge=False):
+        self.name = name
+        self.hedge = hedge
+        self.breaker = CircuitBreaker()
+        self.latencies = {}
+        self.counters = {
+            "calls": 0, "failures": 0, "retries": 0,
+            "short_circuits": 0, "hedges": 0, "hedge_wins": 0
+        }
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, operation, latency):
+        with self._lock:
+            self.latencies.setdefault(operation, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def p95(self, operation):
+        """95th percentile latency of an operation, or None until there are enough samples"""
+        with self._lock:
+            window = self.latencies.get(operation, ())
+            if len(window) < MIN_HEDGE_SAMPLES:
+                return None
+            window = list(window)
+        return percentile(window, 0.95)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            operations = list(self.latencies)
+        p95 = {operation: self.p95(operation) for operation in operations}
+        return {"breaker_state": self.breaker.state, "p95_latency": p95, **counters}
+
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+class Resilience:
+    """Applies retries, circuit breaking and hedging to provider calls"""
+
+    def __init__(self):
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def provider(self, name):
+        """State for a provider, created on first use"""
+        with self._lock:
+            if name not in self._providers:
+                self._providers[name] = ProviderResilience(name, hedge=name in HEDGED_PROVIDERS)
+            return self._providers[name]
+
+    def _hedged(self, state, operation, func, *args, **kwargs):
+        """Start a second request if the first is slower than the operation's p95, keep the winner"""
+        threshold = state.p95(operation)
+        if threshold is None:
+            return func(*args, **kwargs)
+
+        context = contextvars.copy_context()
+        primary = _hedge_executor.submit(context.run, func, *args, **kwargs)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        state.count("hedges")
+        context = contextvars.copy_context()
+        backup = _hedge_executor.submit(context.run, func, *args, **kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        state.count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(self, provider, func, *args, operation="call", deadline=None, **kwargs):
+        """Call a provider with breaker checks and jittered exponential backoff
+
+        operation names the kind of call, so that cheap and expensive calls to
+        one provider keep separate latency windows for hedging. No retry is
+        started that could not begin before the deadline, if one is given.
+        """
+        state = self.provider(provider)
+        hedge = state.hedge and operation not in UNHEDGED_OPERATIONS
+
+        for attempt in range(MAX_ATTEMPTS):
+            if not state.breaker.allow():
+                state.count("short_circuits")
+                raise CircuitOpen(f"Circuit breaker for {provider} is open")
+
+            state.count("calls")
+            start = time.monotonic()
+            try:
+                if hedge:
+                    result = self._hedged(state, operation, func, *args, **kwargs)
+                else:
+                    result = func(*args, **kwargs)
+            except Exception as e:
+                state.count("failures")
+                if not is_retryable(e):
+                    # Not a provider outage: leave the breaker as it was
+                    state.breaker.release()
+                    raise
+                state.breaker.record_failure()
+                delay = backoff_delay(attempt)
+                if attempt == MAX_ATTEMPTS - 1 or (deadline is not None and deadline.remaining() <= delay):
+                    raise
+                state.count("retries")
+                time.sleep(delay)
+                continue
+
+            state.observe(operation, time.monotonic() - start)
+            state.breaker.record_success()
+            return result
+
+    def stats(self):
+        """Breaker state, latency and retry counters per provider"""
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: state.stats() for name, state in providers.items()}
+
+# Resilience state shared by every session in this process
+resilience = Resilience()
+
+# Retry, breaker and hedging counters read at scrape time
+metrics.callback(
+    "zerthia_provider_resilience_events_total", "Provider calls, failures, retries, short circuits and hedges",
+    lambda: {
+        (name, event): count
+        for name, stats in resilience.stats().items()
+        for event, count in stats.items() if event not in ("breaker_state", "p95_latency")
+    },
+    ["provider", "event"], kind="counter"
+)
+metrics.callback(
+    "zerthia_provider_breaker_open", "1 while a provider's circuit breaker is open or half open",
+    lambda: {(name, ): int(stats["breaker_state"] != CircuitBreaker.CLOSED) for name, stats in resilience.stats().items()},
+    ["provider"]
+)
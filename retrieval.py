@@ -0,0 +1,225 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: retrieval.py
+# Description: Vectorised similarity search and MMR selection over the vector store
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+from langchain_core.documents import Document
+from tracing import tracer, current_span
+from metrics import metrics
+from sharded_search import shard_pool, share_matrix
+
+# Whether query_documents() diversifies hits with MMR by default
+MMR_ENABLED = os.getenv("RETRIEVAL_MMR", "1") == "1"
+
+# Weight of diversity against relevance (0 = pure relevance, 1 = pure diversity)
+MMR_DIVERSITY = float(os.getenv("RETRIEVAL_MMR_DIVERSITY", "0.3"))
+
+# Candidate pool size MMR chooses from
+MMR_FETCH_K = int(os.getenv("RETRIEVAL_MMR_FETCH_K", "200"))
+
+# Number of query embeddings kept per embedding model for repeated queries
+QUERY_EMBEDDING_CACHE_SIZE = 256
+
+class IndexMismatch(ValueError):
+    """Raised when an index's vectors and its queries come from different embedding models"""
+
+def _normalize(matrix):
+    """Scale rows to unit length so dot products are cosine similarities"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def mmr_select(query_vector, candidates, k, diversity=MMR_DIVERSITY):
+    """Pick k rows of a unit-normalised candidate matrix by maximal marginal relevance
+
+    Returns the selected row indices and their relevance to the query.
+    """
+    n = candidates.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    query = _normalize(np.asarray(query_vector, dtype=np.float32))
+    relevance = candidates @ query
+    k = min(k, n)
+
+    # Highest similarity of each candidate to anything already selected
+    max_similarity = np.full(n, -np.inf, dtype=np.float32)
+    weighted_relevance = (1 - diversity) * relevance
+    scores = np.empty(n, dtype=np.float32)
+    selected = np.empty(k, dtype=np.int64)
+
+    best = int(np.argmax(relevance))
+    for step in range(k):
+        selected[step] = best
+        if step == k - 1:
+            break
+
+        # Only the newest pick changes the redundancy term
+        np.maximum(max_similarity, candidates @ candidates[best], out=max_similarity)
+        np.multiply(max_similarity, -diversity, out=scores)
+        scores += weighted_relevance
+        scores[selected[:step + 1]] = -np.inf
+        best = int(np.argmax(scores))
+
+    return selected, relevance[selected]
+
+class _StoreMatrix:
+    """Unit-normalised embedding matrix mirroring an InMemoryVectorStore"""
+
+    def __init__(self, store):
+        self.store = store
+        self.ids = list(store.keys())
+        self.version = (len(self.ids), self.ids[-1] if self.ids else None)
+        self.segment = None
+        if self.ids:
+            vectors = np.asarray([store[doc_id]["vector"] for doc_id in self.ids], dtype=np.float32)
+            self.matrix = _normalize(vectors)
+            # Large indexes live in shared memory so shard workers can map them
+            if shard_pool.wants(len(self.ids)):
+                self.matrix, self.segment = share_matrix(self.matrix)
+        else:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def document(self, row):
+        """Rebuild the Document of a row from the vector store entry"""
+        doc_id = self.ids[row]
+        entry = self.store[doc_id]
+        return Document(id=doc_id, page_content=entry["text"], metadata=entry["metadata"])
+
+# Shared with query_router's embedding cache counter
+cache_lookups = metrics.counter("zerthia_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+
+class QueryEmbeddingCache:
+    """Recent query vectors per embedding model, shared by routing and retrieval"""
+
+    def __init__(self, size=QUERY_EMBEDDING_CACHE_SIZE):
+        self.size = size
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def _cache_for(self, embeddings):
+        # Keyed by id because pydantic embedding models are unhashable; the entry
+        # is dropped when the model is collected, before its id can be reused
+        key = id(embeddings)
+        cache = self._caches.get(key)
+        if cache is None:
+            cache = self._caches[key] = OrderedDict()
+            weakref.finalize(embeddings, self._caches.pop, key, None)
+        return cache
+
+    def embed(self, embeddings, query):
+        """Embed a query, reusing the vector of a recent identical query"""
+        key = query.strip()
+        with self._lock:
+            cache = self._cache_for(embeddings)
+            vector = cache.get(key)
+            if vector is not None:
+                cache.move_to_end(key)
+        hit = vector is not None
+        current_span().set(embedding_cache_hit=hit)
+        cache_lookups.labels(cache="query_embedding", result="hit" if hit else "miss").inc()
+        if hit:
+            return vector
+
+        # Embedded outside the lock so one slow provider call does not block other sessions
+        vector = embeddings.embed_query(key)
+        with self._lock:
+            cache = self._cache_for(embeddings)
+            cache[key] = vector
+            cache.move_to_end(key)
+            if len(cache) > self.size:
+                cache.popitem(last=False)
+        return vector
+
+# Matrices are cached per vector store and rebuilt when the store changes
+_matrices = weakref.WeakKeyDictionary()
+_matrices_lock = threading.Lock()
+
+def store_matrix(vector_store):
+    """Cached embedding matrix for a vector store"""
+    store = vector_store.store
+    version = (len(store), next(reversed(store), None))
+
+    with _matrices_lock:
+        cached = _matrices.get(vector_store)
+        hit = cached is not None and cached.version == version
+        if not hit:
+            cached = _StoreMatrix(store)
+            _matrices[vector_store] = cached
+    current_span().set(matrix_cache_hit=hit)
+    cache_lookups.labels(cache="store_matrix", result="hit" if hit else "miss").inc()
+    return cached
+
+def drop_cached_matrix(vector_store):
+    """Forget the cached matrix of a vector store"""
+    with _matrices_lock:
+        _matrices.pop(vector_store, None)
+
+def _candidate_pool(index, query, pool_size):
+    """The pool_size most relevant rows of an index, unordered, with their relevance"""
+    if index.segment is not None:
+        try:
+            current_span().set(shards=shard_pool.workers)
+            return shard_pool.top_candidates(index.matrix, index.segment, query, pool_size)
+        except Exception as e:
+            shard_pool.record_fallback(e)
+
+    relevance = index.matrix @ query
+    if pool_size < len(index):
+        pool = np.argpartition(-relevance, pool_size - 1)[:pool_size]
+    else:
+        pool = np.arange(len(index))
+    return pool, relevance[pool]
+
+def search_with_scores(vector_store, query, k, mmr=MMR_ENABLED, diversity=MMR_DIVERSITY, fetch_k=MMR_FETCH_K, corpus=None):
+    """Return (document, cosine score) hits, diversified with MMR when enabled
+
+    A corpus snapshot, when given, is searched with the same query vector and
+    its hits compete with the session's own chunks.
+    """
+    indexes = [index for index in (store_matrix(vector_store), corpus) if index is not None and len(index)]
+    if not indexes:
+        return []
+
+    with tracer.span("embed_query"):
+        query_vector = np.asarray(query_vectors.embed(vector_store.embeddings, query), dtype=np.float32)
+
+    for index in indexes:
+        if index.matrix.shape[1] != query_vector.shape[0]:
+            raise IndexMismatch(f"Index vectors have {index.matrix.shape[1]} dimensions but queries have {query_vector.shape[0]}")
+
+    with tracer.span("vector_search", index_size=sum(len(index) for index in indexes), k=k, mmr=mmr) as span:
+        if corpus is not None:
+            span.set(corpus_version=corpus.version)
+
+        # Candidate pool: the most relevant rows of each index, unordered
+        query_unit = _normalize(query_vector)
+        pools = [(index, *_candidate_pool(index, query_unit, min(fetch_k if mmr else k, len(index)))) for index in indexes]
+        candidates = [(index, row) for index, rows, _ in pools for row in rows]
+        relevance = np.concatenate([scores for _, _, scores in pools])
+
+        if mmr:
+            vectors = np.concatenate([np.asarray(index.matrix[rows]) for index, rows, _ in pools])
+            picked, scores = mmr_select(query_vector, vectors, k, diversity)
+        else:
+            picked = np.argsort(-relevance)[:k]
+            scores = relevance[picked]
+
+        return [(candidates[i][0].document(candidates[i][1]), float(score)) for i, score in zip(picked, scores)]
+
+# Query vector cache shared by every session in this process
+query_vectors = QueryEmbeddingCache()
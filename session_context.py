@@ -0,0 +1,33 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: session_context.py
+# Description: Explicit per-session state passed through the agent pipeline
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+class SessionContext:
+    """Everything the pipeline needs about one conversation
+
+    Holds the documents, their vector index, the message history and the
+    turn flags. Pipeline functions take it as an argument instead of reading
+    a global, so they can run on any thread and for many sessions at once.
+    """
+
+    def __init__(self, session_id, vector_store, message_log=None, document_contents=None, uploaded_files=None):
+        self.session_id = session_id
+        self.vector_store = vector_store
+        self.message_log = message_log if message_log is not None else []
+        self.document_contents = document_contents if document_contents is not None else {}
+        self.uploaded_files = uploaded_files if uploaded_files is not None else []
+        self.has_documents = bool(self.uploaded_files)
+        self.processing = False
+
+    def __repr__(self):
+        return (
+            f"SessionContext({self.session_id!r}, messages={len(self.message_log)}, "
+            f"documents={len(self.uploaded_files)}, chunks={len(self.vector_store.store)})"
+        )
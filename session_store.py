@@ -0,0 +1,347 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: session_store.py
+# Description: Incremental session checkpoints in SQLite with memory-mapped vectors
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import numpy as np
+from embedding_index import index_tag, tag_index
+
+# Directory holding the session database and vector files
+SESSION_STORE_DIR = os.getenv("SESSION_STORE_DIR", ".sessions")
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL,
+    updated_at REAL,
+    uploaded_files TEXT,
+    vector_dim INTEGER,
+    embedding_model TEXT,
+    vector_file TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT,
+    seq INTEGER,
+    role TEXT,
+    content TEXT,
+    reasoning TEXT,
+    usage TEXT,
+    PRIMARY KEY (session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    session_id TEXT,
+    name TEXT,
+    content TEXT,
+    PRIMARY KEY (session_id, name)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    session_id TEXT,
+    row INTEGER,
+    chunk_id TEXT,
+    text TEXT,
+    metadata TEXT,
+    PRIMARY KEY (session_id, row)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    session_id TEXT PRIMARY KEY,
+    owner TEXT,
+    expires_at REAL
+);
+"""
+
+class StaleSession(RuntimeError):
+    """Raised when a checkpoint is based on a session version another process has replaced"""
+
+def valid_session_id(session_id):
+    """Session ids end up in file names, so only allow a safe alphabet"""
+    return bool(session_id) and bool(_SESSION_ID.match(session_id))
+
+class SessionStore:
+    """Writes session checkpoints incrementally and restores them without re-embedding"""
+
+    def __init__(self, directory=SESSION_STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "sessions.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        # Stores created before indexes were tagged or rewritten lack the newer columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+        if "embedding_model" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN embedding_model TEXT")
+        if "vector_file" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN vector_file TEXT")
+        self._lock = threading.Lock()
+
+        # What has already been written per session: (messages, chunks, document names, embedding model, vector file)
+        self._persisted = {}
+
+    def _vector_path(self, session_id, vector_file=None):
+        # Sessions never rewritten keep their vectors in the original file
+        return os.path.join(self.directory, vector_file or f"{session_id}.f32")
+
+    def _new_vector_file(self, session_id):
+        """Fresh file name for vectors written while the old ones must survive until commit"""
+        return f"{session_id}.{uuid.uuid4().hex[:12]}.f32"
+
+    def exists(self, session_id):
+        """Check whether a session has a checkpoint"""
+        if not valid_session_id(session_id):
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row is not None
+
+    def updated_at(self, session_id):
+        """Time of a session's last checkpoint, or None if it has none"""
+        if not valid_session_id(session_id):
+            return None
+        with self._lock:
+            return self._updated_at(session_id)
+
+    def acquire_lease(self, session_id, owner, seconds):
+        """Claim a session for one process until released or seconds pass; returns whether it was claimed"""
+        if not valid_session_id(session_id):
+            return False
+        now = time.time()
+        with self._lock, self._conn:
+            # One statement, so two processes cannot both see the lease as free
+            cursor = self._conn.execute(
+                "INSERT INTO leases (session_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+                (session_id, owner, now + seconds, now)
+            )
+        return cursor.rowcount > 0
+
+    def release_lease(self, session_id, owner):
+        """Give up a session claimed with acquire_lease"""
+        if not valid_session_id(session_id):
+            return
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM leases WHERE session_id = ? AND owner = ?", (session_id, owner))
+
+    def _load_progress(self, session_id):
+        """Read how much of a session is already on disk"""
+        messages = self._conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+        chunks = self._conn.execute("SELECT COUNT(*) FROM chunks WHERE session_id = ?", (session_id,)).fetchone()[0]
+        names = {row[0] for row in self._conn.execute("SELECT name FROM documents WHERE session_id = ?", (session_id,))}
+        row = self._conn.execute("SELECT embedding_model, vector_dim, vector_file FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return {
+            "messages": messages, "chunks": chunks, "documents": names,
+            "model": row[0] if row else None, "dim": row[1] if row else None, "file": row[2] if row else None
+        }
+
+    def checkpoint(self, session_id, message_log, document_contents, uploaded_files, vector_store, expected_version=None, rewrite=False):
+        """Append whatever changed since the last checkpoint and return the new version
+
+        With expected_version, the write is refused with StaleSession if the
+        session's last checkpoint is no longer that version. With rewrite, the
+        session is written afresh in the same transaction, so a failure leaves
+        the previous checkpoint intact.
+        """
+        if not valid_session_id(session_id):
+            return None
+
+        # Vector files replaced by this checkpoint, and those it started
+        replaced, created = [], []
+        with self._lock:
+            # Hold the write lock from the version check to the last write
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._updated_at(session_id)
+                if expected_version is not None and version != expected_version:
+                    # Another process wrote the session; what this one knows of it is stale
+                    raise StaleSession(f"Session {session_id} changed since version {expected_version}")
+                if rewrite:
+                    self._clear(session_id, replaced, created)
+                now = self._write(session_id, message_log, document_contents, uploaded_files, vector_store, replaced, created)
+                self._conn.commit()
+            except BaseException:
+                # Progress is re-read from the database on the next checkpoint
+                self._conn.rollback()
+                self._persisted.pop(session_id, None)
+                self._remove_files(session_id, created)
+                raise
+        self._remove_files(session_id, replaced)
+        return now
+
+    def _remove_files(self, session_id, vector_files):
+        for vector_file in vector_files:
+            path = self._vector_path(session_id, vector_file)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _clear(self, session_id, replaced, created):
+        """Drop a session's rows inside the caller's transaction, moving its vectors to a new file"""
+        progress = self._load_progress(session_id)
+        for table in ("messages", "documents", "chunks"):
+            self._conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+        self._conn.execute("UPDATE sessions SET vector_dim = NULL, embedding_model = NULL WHERE session_id = ?", (session_id,))
+        replaced.append(progress["file"])
+        vector_file = self._new_vector_file(session_id)
+        created.append(vector_file)
+        self._persisted[session_id] = {"messages": 0, "chunks": 0, "documents": set(), "model": None, "dim": None, "file": vector_file}
+
+    def _updated_at(self, session_id):
+        """Version of a session's last checkpoint; the caller holds the lock"""
+        row = self._conn.execute("SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def _write(self, session_id, message_log, document_contents, uploaded_files, vector_store, replaced, created):
+        """Write a checkpoint's rows inside the caller's transaction"""
+        progress = self._persisted.get(session_id)
+        if progress is None:
+            progress = self._load_progress(session_id)
+            self._persisted[session_id] = progress
+
+        # Never reuse a version, even within the clock's resolution
+        now = max(time.time(), (self._updated_at(session_id) or 0) + 1e-6)
+        store = vector_store.store
+        model = index_tag(vector_store).model if store else None
+
+        # A re-embedded index replaces every vector, so its chunks are written afresh to a new file
+        if progress["chunks"] and model != progress["model"]:
+            self._conn.execute("DELETE FROM chunks WHERE session_id = ?", (session_id,))
+            replaced.append(progress["file"])
+            progress["file"] = self._new_vector_file(session_id)
+            created.append(progress["file"])
+            progress["chunks"] = 0
+
+        new_entries = list(store.values())[progress["chunks"]:] if len(store) > progress["chunks"] else []
+        dim = len(new_entries[0]["vector"]) if new_entries else None
+
+        # Chunks uploaded mid-migration may have another width; they wait for the re-embedded index
+        dims = {len(entry["vector"]) for entry in new_entries}
+        if len(dims) > 1 or (progress["chunks"] and dims and dims != {progress["dim"]}):
+            new_entries, dim = [], None
+
+        self._conn.execute(
+            "INSERT INTO sessions (session_id, created_at, updated_at, uploaded_files, vector_dim, embedding_model, vector_file) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at, "
+            "uploaded_files = excluded.uploaded_files, vector_dim = COALESCE(excluded.vector_dim, vector_dim), "
+            "embedding_model = CASE WHEN excluded.vector_dim IS NULL THEN embedding_model ELSE excluded.embedding_model END, "
+            "vector_file = excluded.vector_file",
+            (session_id, now, now, json.dumps(list(uploaded_files)), dim, model, progress["file"])
+        )
+
+        # Only messages appended since the last checkpoint
+        new_messages = message_log[progress["messages"]:]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO messages (session_id, seq, role, content, reasoning, usage) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (session_id, progress["messages"] + offset, message["role"], message["content"],
+                 message.get("reasoning", ""), json.dumps(message.get("usage")))
+                for offset, message in enumerate(new_messages)
+            ]
+        )
+
+        # Only documents not written before
+        new_documents = [(name, content) for name, content in document_contents.items() if name not in progress["documents"]]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO documents (session_id, name, content) VALUES (?, ?, ?)",
+            [(session_id, name, content) for name, content in new_documents]
+        )
+
+        # Only chunks added since the last checkpoint; vectors are written after the committed rows,
+        # overwriting any left behind by a checkpoint that was rolled back
+        if new_entries:
+            path = self._vector_path(session_id, progress["file"])
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(progress["chunks"] * dim * 4)
+                np.asarray([entry["vector"] for entry in new_entries], dtype=np.float32).tofile(f)
+                f.truncate()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (session_id, row, chunk_id, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (session_id, progress["chunks"] + offset, entry["id"], entry["text"], json.dumps(entry["metadata"], default=str))
+                    for offset, entry in enumerate(new_entries)
+                ]
+            )
+
+        progress["messages"] += len(new_messages)
+        progress["chunks"] += len(new_entries)
+        progress["documents"].update(name for name, _ in new_documents)
+        if new_entries:
+            progress["model"] = model
+            progress["dim"] = dim
+        return now
+
+    def restore(self, session_id, vector_store):
+        """Load a checkpointed session, mapping its vectors instead of re-embedding"""
+        if not valid_session_id(session_id):
+            return None
+
+        with self._lock:
+            session = self._conn.execute(
+                "SELECT uploaded_files, vector_dim, embedding_model, vector_file FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if session is None:
+                return None
+
+            messages = [
+                {"role": role, "content": content, "reasoning": reasoning or "", **({"usage": json.loads(usage)} if usage and usage != "null" else {})}
+                for role, content, reasoning, usage in self._conn.execute(
+                    "SELECT role, content, reasoning, usage FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+                )
+            ]
+            documents = dict(self._conn.execute("SELECT name, content FROM documents WHERE session_id = ?", (session_id,)))
+            chunks = self._conn.execute(
+                "SELECT chunk_id, text, metadata FROM chunks WHERE session_id = ? ORDER BY row", (session_id,)
+            ).fetchall()
+
+            # Rows of a read-only memory map stand in for the embedding lists
+            uploaded_files, dim, model, vector_file = session
+            if chunks and dim:
+                mapped = np.memmap(self._vector_path(session_id, vector_file), dtype=np.float32, mode="r", shape=(len(chunks), dim))
+                vectors = mapped.view(np.ndarray)
+                metadatas = json.loads("[" + ",".join(metadata for _, _, metadata in chunks) + "]")
+                for row, (chunk_id, text, _) in enumerate(chunks):
+                    vector_store.store[chunk_id] = {
+                        "id": chunk_id,
+                        "vector": vectors[row],
+                        "text": text,
+                        "metadata": metadatas[row]
+                    }
+
+                # Checkpoints from before tagging have no model; their dimension is still checked at query time
+                tag_index(vector_store, model, dim)
+
+            self._persisted[session_id] = {
+                "messages": len(messages), "chunks": len(chunks), "documents": set(documents),
+                "model": model, "dim": dim, "file": vector_file
+            }
+
+        return {
+            "message_log": messages,
+            "document_contents": documents,
+            "uploaded_files": json.loads(uploaded_files or "[]")
+        }
+
+    def delete(self, session_id):
+        """Remove a session checkpoint"""
+        if not valid_session_id(session_id):
+            return
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT vector_file FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            for table in ("sessions", "messages", "documents", "chunks"):
+                self._conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+            self._persisted.pop(session_id, None)
+        self._remove_files(session_id, {None, row[0] if row else None})
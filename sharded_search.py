@@ -0,0 +1,169 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: sharded_search.py
+# Description: Similarity search scattered across worker processes over shared memory
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import sys
+import atexit
+import weakref
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Worker processes searching shards of large indexes; 0 keeps every search in-process
+SHARDED_SEARCH_WORKERS = int(os.getenv("SHARDED_SEARCH_WORKERS", "0"))
+
+# Indexes with fewer chunks are searched in-process, where there is no IPC to pay for
+SHARDED_SEARCH_MIN_ROWS = int(os.getenv("SHARDED_SEARCH_MIN_ROWS", "50000"))
+
+# Seconds to wait for every shard before falling back to an in-process search
+SHARDED_SEARCH_TIMEOUT = float(os.getenv("SHARDED_SEARCH_TIMEOUT", "10"))
+
+# Segments each worker keeps mapped; older ones are unmapped first
+WORKER_ATTACHMENTS = 16
+
+def _release_segment(segment):
+    segment.close()
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+def share_matrix(matrix):
+    """Copy a float32 matrix into a new shared memory segment
+
+    Returns the array backed by the segment and the segment's name. The segment
+    is unlinked once the returned array is garbage collected.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    segment = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    shared = np.ndarray(matrix.shape, dtype=np.float32, buffer=segment.buf)
+    shared[...] = matrix
+    weakref.finalize(shared, _release_segment, segment)
+    return shared, segment.name
+
+# Segments mapped by this worker process, least recently used first
+_attached = OrderedDict()
+
+def _attach(name, shape):
+    """Map a segment read-only in a worker, reusing the mapping of earlier searches"""
+    entry = _attached.get(name)
+    if entry is not None:
+        _attached.move_to_end(name)
+        return entry[1]
+
+    # Only the process that created a segment may unlink it (Python 3.13+ can say so)
+    options = {"track": False} if sys.version_info >= (3, 13) else {}
+    segment = shared_memory.SharedMemory(name=name, **options)
+    matrix = np.ndarray(shape, dtype=np.float32, buffer=segment.buf)
+    matrix.flags.writeable = False
+    _attached[name] = (segment, matrix)
+
+    while len(_attached) > WORKER_ATTACHMENTS:
+        old_segment, old_matrix = _attached.popitem(last=False)[1]
+        del old_matrix
+        old_segment.close()
+    return matrix
+
+def _search_shard(name, shape, start, stop, query, pool_size):
+    """Top pool_size rows of one shard by dot product with a unit query; runs in a worker"""
+    relevance = _attach(name, shape)[start:stop] @ query
+    size = min(pool_size, stop - start)
+    if size < stop - start:
+        top = np.argpartition(-relevance, size - 1)[:size]
+    else:
+        top = np.arange(stop - start)
+    return top + start, relevance[top]
+
+class ShardPool:
+    """Worker processes that search row ranges of shared embedding matrices"""
+
+    def __init__(self, workers=SHARDED_SEARCH_WORKERS, min_rows=SHARDED_SEARCH_MIN_ROWS, timeout=SHARDED_SEARCH_TIMEOUT):
+        self.workers = workers
+        self.min_rows = min_rows
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._searches = 0
+        self._fallbacks = 0
+
+    def wants(self, rows):
+        """Whether an index of this many rows should be searched in shards"""
+        return self.workers > 0 and rows >= self.min_rows
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # forkserver children do not inherit the app's threads and locks
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(method)
+                )
+            return self._executor
+
+    def top_candidates(self, matrix, segment, query, pool_size):
+        """Scatter a unit query over the shards of a shared matrix and merge each shard's top rows
+
+        Returns the pool_size best row indices, unordered, and their relevance.
+        """
+        rows = matrix.shape[0]
+        bounds = np.linspace(0, rows, min(self.workers, rows) + 1, dtype=np.int64)
+        futures = [
+            self._pool().submit(_search_shard, segment, matrix.shape, int(start), int(stop), query, pool_size)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        results = [future.result(timeout=self.timeout) for future in futures]
+        self._searches += 1
+
+        candidates = np.concatenate([indices for indices, _ in results])
+        relevance = np.concatenate([scores for _, scores in results])
+        if len(candidates) > pool_size:
+            best = np.argpartition(-relevance, pool_size - 1)[:pool_size]
+            candidates, relevance = candidates[best], relevance[best]
+        return candidates, relevance
+
+    def record_fallback(self, error):
+        self._fallbacks += 1
+        logger.warning("Sharded search failed, searching in-process: %s", error)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        """Sharding configuration and counters"""
+        return {
+            "workers": self.workers,
+            "min_rows": self.min_rows,
+            "running": self._executor is not None,
+            "searches": self._searches,
+            "fallbacks": self._fallbacks
+        }
+
+# Shard workers shared by every session in this process
+shard_pool = ShardPool()
+
+# Stop the workers with the process
+atexit.register(shard_pool.shutdown)
+
+metrics.callback(
+    "zerthia_sharded_searches_total", "Searches scattered over shard workers, and those that fell back in-process",
+    lambda: {("sharded",): shard_pool._searches, ("fallback",): shard_pool._fallbacks}, ["result"], kind="counter"
+)
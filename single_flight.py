@@ -0,0 +1,96 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: single_flight.py
+# Description: Coalesces identical in-flight provider calls into one upstream call
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import hashlib
+import threading
+from tracing import current_span
+from metrics import metrics
+
+class _Call:
+    """A single upstream call that several callers are waiting on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Share the result of one in-flight call among all identical callers"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._followers = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Run func once per key at a time and fan the result out to every caller"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._followers += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._leaders += 1
+                leader = True
+
+        if not leader:
+            current_span().set(shared_call=True)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh call; results are not cached
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """Number of distinct upstream calls currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Upstream calls made and calls served by sharing"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "upstream_calls": self._leaders,
+                "coalesced_calls": self._followers
+            }
+
+def request_key(*parts):
+    """Stable digest for the parts that make two requests identical"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+# Coalescing group shared by every session in this process
+flights = SingleFlight()
+
+# Calls made upstream versus served from another caller's in-flight call
+metrics.callback(
+    "zerthia_single_flight_calls_total", "Provider calls made upstream or shared with an identical in-flight call",
+    lambda: {("upstream", ): flights.stats()["upstream_calls"], ("shared", ): flights.stats()["coalesced_calls"]},
+    ["result"], kind="counter"
+)
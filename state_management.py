@@ -4,59 +4,162 @@
 # Description:  Manages the Streamlit session state
 # Author: LALAN KUMAR
 # Created: [20-03-2025]
-# Updated: [24-03-2025]
+# Updated: [19-10-2026]
 # Version: 1.0.0
 # License: [License Type, e.g., MIT]
 # ===================================================================================
 
 import os
+import logging
+import time
+import uuid
 from dotenv import load_dotenv
 import streamlit as st
 from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_ollama import OllamaEmbeddings
-from langchain_cohere import CohereEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from embedding_index import load_embeddings, reconcile_index, EMBEDDING_MODEL, EMBEDDING_FALLBACK_MODEL
+from reasoning import split_reasoning
+from memory_governor import memory_governor, estimate_messages_bytes
+from session_store import SessionStore
+from session_context import SessionContext
+from metrics import metrics, start_metrics_server
+from corpus_snapshot import knowledge_base
 
 load_dotenv()
 
-# Get the huggingface API Key
-os.environ["HUGGINGFACE_API_KEY"]=os.getenv("HUGGINGFACE_API_KEY")
-os.environ["COHERE_API_KEY"]=os.getenv("COHERE_API_KEY")
+logger = logging.getLogger(__name__)
 
-def initialize_session_state():
-    """Initialize all session state variables"""
+# Export the embedding API keys loaded from .env; unset keys stay unset
+for key_name in ("HUGGINGFACE_API_KEY", "COHERE_API_KEY"):
+    key = os.getenv(key_name)
+    if key:
+        os.environ[key_name] = key
+
+# First message of every new conversation
+GREETING_MESSAGE = "Hi, I’m Zea – your AI Companion from Zerthia, where empathy meets intelligence. I’m here to help you explore, understand, and take action. You can chat with me or upload your documents (PDF, DOCX, TXT, PPTX, CSV) for smart, meaningful insights. Let’s decode data, inspire impact, and change the world, together. For more, visit www.syntheim.com"
+
+# Session lifecycle metrics
+sessions_started = metrics.counter("zerthia_sessions_started_total", "Conversations started fresh or restored from a checkpoint", ["origin"])
+checkpoint_duration = metrics.histogram("zerthia_checkpoint_duration_seconds", "Time to persist a session checkpoint")
+checkpoint_failures = metrics.counter("zerthia_checkpoint_failures_total", "Session checkpoints that failed")
+
+@st.cache_resource
+def get_embedding_model():
+    """Create the embedding model once per process and share it across sessions"""
     
-    # Initialize embedding model
-    try:
-        EMBEDDING_MODEL = CohereEmbeddings(model="embed-english-v3.0") 
-    except Exception:
-        EMBEDDING_MODEL = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    embeddings = load_embeddings(EMBEDDING_MODEL)
+    if embeddings is None:
+        # Indexes embedded with the primary model are migrated when their sessions are restored
+        logger.warning("Embedding with %s instead of %s", EMBEDDING_FALLBACK_MODEL, EMBEDDING_MODEL)
+        embeddings = load_embeddings(EMBEDDING_FALLBACK_MODEL)
+    if embeddings is None:
+        raise RuntimeError(f"Neither {EMBEDDING_MODEL} nor {EMBEDDING_FALLBACK_MODEL} embeddings are available")
+    return embeddings
+
+@st.cache_resource
+def get_session_store():
+    """Open the session checkpoint store once per process"""
+    
+    return SessionStore()
+
+@st.cache_resource
+def get_knowledge_base():
+    """Memory-map the shared corpus snapshot once per process"""
     
-    # Initialize vector store
-    if "vector_store" not in st.session_state:
-        st.session_state.vector_store = InMemoryVectorStore(embedding=EMBEDDING_MODEL)
+    knowledge_base.load()
+    return knowledge_base
 
-    # Initialize document contents
-    if "document_contents" not in st.session_state:
-        st.session_state.document_contents = {}
+@st.cache_resource
+def get_metrics_server():
+    """Start the local /metrics scrape endpoint once per process"""
+    
+    return start_metrics_server()
 
-    # Initialize message log
-    if "message_log" not in st.session_state:
-        st.session_state.message_log = [
-            {"role": "ai", "content": "Hi, I’m Zea – your AI Companion from Zerthia, where empathy meets intelligence. I’m here to help you explore, understand, and take action. You can chat with me or upload your documents (PDF, DOCX, TXT, PPTX, CSV) for smart, meaningful insights. Let’s decode data, inspire impact, and change the world, together. For more, visit www.syntheim.com"}
-        ]
+def make_message(role, content, reasoning="", usage=None):
+    """Build a chat record with the answer and reasoning parsed once, at append time"""
+    
+    if "<think>" in content:
+        content, parsed_reasoning = split_reasoning(content)
+        reasoning = "\n\n".join(part for part in (reasoning, parsed_reasoning) if part)
+    
+    message = {"role": role, "content": content, "reasoning": reasoning}
+    if usage is not None:
+        message["usage"] = usage
+    return message
 
-    # Initialize processing state
-    if "processing" not in st.session_state:
-        st.session_state.processing = False
+def append_message(ctx, role, content, reasoning="", usage=None):
+    """Append a structured record to a session's message log, counting it against the session's memory cap
+    
+    A user message that would take the session over its cap raises MemoryLimitExceeded.
+    """
+    
+    message = make_message(role, content, reasoning, usage)
+    
+    # Refuse new turns, never the answers and notices of turns already accepted
+    if role == "user":
+        memory_governor.check_capacity(ctx.session_id, estimate_messages_bytes([message]))
+    
+    ctx.message_log.append(message)
+    memory_governor.add_message(ctx.session_id, message)
 
-    # Initialize document flag
-    if "has_documents" not in st.session_state:
-        st.session_state.has_documents = False
+def new_session_context(session_id=None, vector_store=None):
+    """Start a fresh conversation with the greeting as its first message"""
+    
+    sessions_started.labels(origin="new").inc()
+    return SessionContext(
+        session_id or uuid.uuid4().hex,
+        vector_store if vector_store is not None else InMemoryVectorStore(embedding=get_embedding_model()),
+        [make_message("ai", GREETING_MESSAGE)]
+    )
 
-    # Initialize uploaded files list
-    if "uploaded_files" not in st.session_state:
-        st.session_state.uploaded_files = []
+def get_session_context():
+    """The pipeline context of the current Streamlit session"""
+    
+    return st.session_state.context
+
+def initialize_session_state():
+    """Initialize all session state variables"""
+    
+    # Expose this process's metrics for scraping
+    get_metrics_server()
+    
+    # Map the shared knowledge base before the first query needs it
+    get_knowledge_base()
+    
+    # Initialize the pipeline context, restoring the checkpointed session named in the URL
+    if "context" not in st.session_state:
+        session_id = st.query_params.get("sid")
+        vector_store = InMemoryVectorStore(embedding=get_embedding_model())
+        restored = get_session_store().restore(session_id, vector_store) if session_id else None
+        
+        if restored is None:
+            ctx = new_session_context(vector_store=vector_store)
+        else:
+            ctx = SessionContext(session_id, vector_store, **restored)
+            sessions_started.labels(origin="restored").inc()
+            
+            # Re-embed in the background if the index was built with another model
+            reconcile_index(session_id, vector_store, get_embedding_model())
+        st.session_state.context = ctx
+        
+        # Keep the id in the URL so a browser refresh finds the same session
+        st.query_params["sid"] = ctx.session_id
+        
+        # Account a restored index right away, not only after the next upload
+        memory_governor.register(ctx.session_id, ctx.vector_store, ctx.document_contents)
+        memory_governor.update(ctx.session_id)
+
+    # Track this session's memory and bring back its index if it was evicted
+    ctx = st.session_state.context
+    memory_governor.register(ctx.session_id, ctx.vector_store, ctx.document_contents)
+    memory_governor.touch(ctx.session_id, ctx.message_log)
+
+    # Initialize number of earlier history pages the user has expanded
+    if "history_pages" not in st.session_state:
+        st.session_state.history_pages = 0
+
+    # Initialize script run counter
+    if "script_runs" not in st.session_state:
+        st.session_state.script_runs = 0
 
     # Initialize last uploaded file
     if "last_uploaded_file" not in st.session_state:
@@ -66,27 +169,53 @@ def initialize_session_state():
     if "show_uploader" not in st.session_state:
         st.session_state.show_uploader = False
 
-def update_session_state(file_name, file_type, num_chunks):
-    """Update session state after document upload"""
+def record_upload(ctx, file_name, file_type, num_chunks):
+    """Mark a processed document as uploaded and announce it in the chat"""
     
     # Update document state
-    st.session_state.has_documents = True
-    if file_name not in st.session_state.uploaded_files:
-        st.session_state.uploaded_files.append(file_name)
+    ctx.has_documents = True
+    if file_name not in ctx.uploaded_files:
+        ctx.uploaded_files.append(file_name)
     
     # Add system message about the upload
     upload_message = f"📄 {file_type} document '{file_name}' successfully uploaded and processed ({num_chunks} chunks). You can now ask questions about this document."
-    st.session_state.message_log.append({"role": "ai", "content": upload_message})
+    append_message(ctx, "ai", upload_message)
+
+def update_session_state(ctx, file_name, file_type, num_chunks):
+    """Update session state after document upload"""
+    
+    record_upload(ctx, file_name, file_type, num_chunks)
     
     # Update last uploaded file to prevent duplicate messages
     st.session_state.last_uploaded_file = file_name
     
     # Hide the uploader after successful upload
     st.session_state.show_uploader = False
+    
+    # Persist the new document and its index
+    checkpoint_session(ctx)
+
+def checkpoint_session(ctx):
+    """Persist whatever changed in a session since the last checkpoint"""
+    
+    start = time.perf_counter()
+    try:
+        get_session_store().checkpoint(
+            ctx.session_id,
+            ctx.message_log,
+            ctx.document_contents,
+            ctx.uploaded_files,
+            ctx.vector_store
+        )
+        checkpoint_duration.observe(time.perf_counter() - start)
+    except Exception as e:
+        checkpoint_failures.inc()
+        logger.error("Session checkpoint failed: %s", e)
 
-def get_active_user_query():
-    """Get the last user query from message log"""
+def get_active_user_query(ctx):
+    """Get the last user query from a session's message log"""
     
-    if st.session_state.message_log and st.session_state.message_log[-1]["role"] == "user":
-        return st.session_state.message_log[-1]["content"]
+    message_log = ctx.message_log
+    if message_log and message_log[-1]["role"] == "user":
+        return message_log[-1]["content"]
     return None
@@ -0,0 +1,49 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tests/conftest.py
+# Description: Offline provider setup and shared fixtures for the unit tests
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Unit tests never reach a provider: placeholder keys, no rate limiting, no trace files
+for key in ("GROQ_API_KEY", "TAVILY_API_KEY", "COHERE_API_KEY"):
+    os.environ.setdefault(key, "offline")
+for provider in ("GROQ", "TAVILY", "COHERE"):
+    os.environ.setdefault(f"{provider}_REQUESTS_PER_MINUTE", "1000000")
+    os.environ.setdefault(f"{provider}_BURST", "100000")
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+# The API server opens its session store on import
+os.environ.setdefault("SESSION_STORE_DIR", tempfile.mkdtemp(prefix="zerthia_test_sessions_"))
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+from fakes import HashingEmbeddings
+
+@pytest.fixture
+def embeddings():
+    return HashingEmbeddings(size=64)
+
+@pytest.fixture
+def make_store(embeddings):
+    """Build a vector store holding the given texts, one chunk each"""
+    def build(texts, source="doc.txt"):
+        store = InMemoryVectorStore(embeddings)
+        store.add_documents([Document(page_content=text, metadata={"source": source}) for text in texts])
+        return store
+    return build
@@ -0,0 +1,56 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tests/test_api_server.py
+# Description: Session leasing between API workers
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import asyncio
+import pytest
+from fastapi import HTTPException
+import api_server
+from api_server import SessionManager, SqliteSessionBackend, claim_session
+from session_store import SessionStore
+
+SESSION_ID = "session-0001"
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    """Two workers sharing one session store; this test's process acts as the first"""
+    this = SessionManager(SqliteSessionBackend(SessionStore(str(tmp_path))))
+    other = SessionManager(SqliteSessionBackend(SessionStore(str(tmp_path))))
+    monkeypatch.setattr(api_server, "sessions", this)
+    return this, other
+
+def test_claim_waits_for_the_other_worker(workers):
+    this, other = workers
+    assert other.claim(SESSION_ID)
+
+    async def release_soon():
+        await asyncio.sleep(0.1)
+        other.unclaim(SESSION_ID)
+
+    async def claim():
+        asyncio.ensure_future(release_soon())
+        await claim_session(SESSION_ID, wait=5)
+
+    asyncio.run(claim())
+    assert not other.claim(SESSION_ID)
+
+def test_claim_gives_up_on_a_held_lease(workers):
+    _, other = workers
+    assert other.claim(SESSION_ID)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(claim_session(SESSION_ID, wait=0.2))
+    assert raised.value.status_code == 409
+    assert "Retry-After" in raised.value.headers
+
+def test_invalid_session_id_is_not_found(workers):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(claim_session("../etc", wait=0.2))
+    assert raised.value.status_code == 404
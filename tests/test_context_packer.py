@@ -0,0 +1,56 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tests/test_context_packer.py
+# Description: Merging of adjacent retrieved chunks into source spans
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from context_packer import merge_chunks, pack_context
+
+def _paragraph(i):
+    return " ".join(f"Paragraph {i} sentence {j} describes the migration plan in detail." for j in range(10))
+
+def _split(text):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    return splitter.split_documents([Document(page_content=text, metadata={"source": "plan.txt"})])
+
+def test_consecutive_chunks_separated_by_gaps_merge_into_one_span():
+    text = "\n\n".join(_paragraph(i) for i in range(6))
+    chunks = _split(text)
+    assert len(chunks) == 6
+
+    # Paragraph breaks are stripped, so each chunk starts a gap after the previous one ends
+    hits = chunks[1:5]
+    gaps = [b.metadata["start_index"] - (a.metadata["start_index"] + len(a.page_content)) for a, b in zip(hits, hits[1:])]
+    assert all(gap > 0 for gap in gaps)
+
+    spans = merge_chunks([(chunk, 0.9) for chunk in hits])
+    assert len(spans) == 1
+    assert spans[0].start == hits[0].metadata["start_index"]
+    assert spans[0].end == hits[-1].metadata["start_index"] + len(hits[-1].page_content)
+    assert all(chunk.page_content in spans[0].text for chunk in hits)
+
+    context, _ = pack_context([(chunk, 0.9) for chunk in hits])
+    assert context.count("Document: plan.txt") == 1
+
+def test_overlapping_chunks_do_not_repeat_text():
+    text = " ".join(f"Sentence {i} of one long paragraph about the rollout." for i in range(60))
+    chunks = _split(text)
+    assert len(chunks) >= 3
+
+    spans = merge_chunks([(chunk, 0.8) for chunk in chunks[:3]])
+    assert len(spans) == 1
+    assert spans[0].text == text[spans[0].start:spans[0].end]
+
+def test_distant_chunks_stay_separate():
+    text = "\n\n".join(_paragraph(i) for i in range(6))
+    chunks = _split(text)
+
+    spans = merge_chunks([(chunks[0], 0.7), (chunks[3], 0.9)])
+    assert [span.start for span in spans] == [chunks[3].metadata["start_index"], chunks[0].metadata["start_index"]]
@@ -0,0 +1,102 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tests/test_document_manager.py
+# Description: Document upload, removal and index mismatch handling
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import numpy as np
+import pytest
+from langchain_core.vectorstores import InMemoryVectorStore
+from fakes import HashingEmbeddings
+import document_manager
+import state_management
+from session_context import SessionContext
+from embedding_index import tag_index
+from document_manager import process_document_file, remove_document, query_documents, UploadedDocument
+
+def _text(topic):
+    return "\n\n".join(f"Section {i} explains the {topic} in plain words. " * 20 for i in range(4)).encode()
+
+@pytest.fixture
+def ctx(embeddings):
+    return SessionContext("session-0001", InMemoryVectorStore(embeddings))
+
+def test_chunks_are_sourced_by_the_uploaded_name(ctx):
+    process_document_file(ctx, UploadedDocument("plan.txt", _text("rollout plan")))
+    sources = {entry["metadata"]["source"] for entry in ctx.vector_store.store.values()}
+    assert sources == {"plan.txt"}
+
+def test_remove_document_drops_only_its_chunks(ctx):
+    process_document_file(ctx, UploadedDocument("plan.txt", _text("rollout plan")))
+    process_document_file(ctx, UploadedDocument("notes.txt", _text("meeting notes")))
+    kept = sum(1 for entry in ctx.vector_store.store.values() if entry["metadata"]["source"] == "notes.txt")
+
+    assert remove_document(ctx, "plan.txt") > 0
+    assert len(ctx.vector_store.store) == kept
+    assert list(ctx.document_contents) == ["notes.txt"]
+
+class _Corpus:
+    """Knowledge-base snapshot whose vectors are narrower than the session's"""
+
+    version = "test"
+
+    def __init__(self, rows=3, dimension=8):
+        self.matrix = np.ones((rows, dimension), dtype=np.float32)
+        self.documents = [f"handbook-{i}.pdf" for i in range(rows)]
+
+    def __len__(self):
+        return len(self.matrix)
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    """Record migrations instead of running them, with a known app embedding model"""
+    calls = []
+    app_model = HashingEmbeddings(size=64)
+    monkeypatch.setattr(document_manager.migrator, "schedule", lambda session_id, store, target: calls.append((session_id, store, target)))
+    monkeypatch.setattr(state_management, "get_embedding_model", lambda: app_model)
+    return calls, app_model
+
+def _uploaded(ctx):
+    process_document_file(ctx, UploadedDocument("plan.txt", _text("rollout plan")))
+    ctx.uploaded_files.append("plan.txt")
+    ctx.has_documents = True
+
+def test_index_from_another_model_is_migrated_to_the_app_model(ctx, scheduled):
+    calls, app_model = scheduled
+    _uploaded(ctx)
+    tag_index(ctx.vector_store, "CohereEmbeddings:embed-english-v3.0", 64)
+
+    result = query_documents(ctx, "what is the rollout plan")
+    assert result.startswith("Vector search failed")
+    assert calls == [(ctx.session_id, ctx.vector_store, app_model)]
+
+def test_untagged_index_of_another_width_is_migrated(ctx, scheduled):
+    calls, app_model = scheduled
+    _uploaded(ctx)
+    # Restored before tagging: vectors 64 wide, queries now 32 wide
+    ctx.vector_store.embedding = HashingEmbeddings(size=32)
+
+    query_documents(ctx, "what is the rollout plan")
+    assert calls == [(ctx.session_id, ctx.vector_store, app_model)]
+
+def test_matching_untagged_index_is_searched(ctx, scheduled):
+    calls, _ = scheduled
+    _uploaded(ctx)
+
+    result = query_documents(ctx, "what is the rollout plan")
+    assert "Document: plan.txt" in result
+    assert calls == []
+
+def test_corpus_dimension_mismatch_does_not_migrate_the_session(ctx, scheduled, monkeypatch):
+    calls, _ = scheduled
+    _uploaded(ctx)
+    monkeypatch.setattr(document_manager.knowledge_base, "for_embeddings", lambda embeddings: _Corpus())
+
+    result = query_documents(ctx, "what is the rollout plan")
+    assert result.startswith("Vector search failed")
+    assert calls == []
@@ -0,0 +1,54 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tests/test_memory_governor.py
+# Description: Spill and restore accounting of the memory governor
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import memory_governor as governor_module
+from memory_governor import MemoryGovernor, estimate_store_bytes, estimate_text_bytes
+
+def _governor(tmp_path, process_cap_mb=2048):
+    return MemoryGovernor(session_cap_mb=256, process_cap_mb=process_cap_mb, spill_dir=str(tmp_path))
+
+def _session(governor, session_id, make_store, chunks=20):
+    store = make_store([f"Paragraph {i} of session {session_id} about quarterly revenue." for i in range(chunks)])
+    documents = {"doc.txt": "Quarterly revenue report. " * 40}
+    governor.register(session_id, store, documents)
+    governor.update(session_id)
+    return store, documents
+
+def test_restore_accounts_index_and_documents(tmp_path, make_store):
+    governor = _governor(tmp_path)
+    store, documents = _session(governor, "a", make_store)
+    resident = governor.session_bytes("a")
+    assert resident > 0
+
+    assert governor._spill(governor._entries["a"]) == resident
+    assert governor.session_bytes("a") == 0
+    assert len(store.store) == 0
+
+    governor.touch("a")
+    assert len(store.store) == 20
+    assert governor.session_bytes("a") == estimate_store_bytes(store.store) + estimate_text_bytes(documents.values())
+    assert governor.session_bytes("a") == resident
+
+def test_restore_makes_room_by_evicting_idle_sessions(tmp_path, make_store, monkeypatch):
+    monkeypatch.setattr(governor_module, "MIN_IDLE_BEFORE_EVICTION", 0)
+    governor = _governor(tmp_path)
+    # The governor only holds weak references to the stores
+    sessions = [_session(governor, session_id, make_store) for session_id in ("a", "b")]
+    governor._spill(governor._entries["a"])
+
+    # Room for one resident session only
+    governor.process_cap = governor.session_bytes("b") + 1
+    governor.touch("a")
+
+    assert governor.session_bytes("a") > 0
+    assert governor._entries["b"].spill_path is not None
+    assert governor.session_bytes("b") == 0
+    assert len(sessions[1][0].store) == 0
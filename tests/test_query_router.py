@@ -0,0 +1,109 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tests/test_query_router.py
+# Description: Pattern family matching and route precedence of the query router
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import gc
+import time
+import threading
+import pytest
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+from fakes import HashingEmbeddings
+import query_router
+from query_router import match_patterns, route_query, get_classifier
+from retrieval import search_with_scores
+
+@pytest.mark.parametrize("query, families", [
+    ("who is the current president", {"info", "factual", "time"}),
+    ("what's the latest on the merger", {"explicit", "time"}),
+    ("how much does bitcoin cost today", {"info", "factual", "time"}),
+    ("what does the document say about recent prices", {"document", "time"}),
+    ("how are you feeling now", {"conversational", "time"}),
+    ("tell me about the stocks", {"info", "time"}),
+    ("tell me about yourself", {"info", "conversational"}),
+    ("hello there", set())
+])
+def test_families_are_found_even_when_phrases_overlap(query, families):
+    assert match_patterns(query) == families
+
+# (query, has_documents) -> (intent, web, docs)
+ROUTES = [
+    # Time-sensitive info questions try the documents, then fall back to the web
+    ("who is the current president", True, ("documents", True, True)),
+    ("who is the current president", False, ("web", True, False)),
+    ("what is the latest bitcoin price", True, ("documents", True, True)),
+    # Time words without an info opener go to the web after the documents
+    ("give me today's headlines", True, ("web", True, True)),
+    ("give me today's headlines", False, ("web", True, False)),
+    # Document references win over every other family
+    ("what does the document say about recent prices", True, ("documents", False, True)),
+    ("what does the document say about recent prices", False, ("documents", False, False)),
+    # Explicit search requests skip the documents
+    ("search for the latest results", True, ("web", True, False)),
+    # Info openers without time words stay in the documents
+    ("how many employees are listed", True, ("documents", False, True)),
+    ("how many moons does mars have", False, ("web", True, False)),
+    ("how are you", True, ("chat", False, False)),
+]
+
+@pytest.mark.parametrize("query, has_documents, expected", ROUTES)
+def test_route_precedence(query, has_documents, expected):
+    route = route_query(query, has_documents=has_documents, document_count=5 if has_documents else 0)
+    assert (route.intent, route.web, route.docs) == expected
+    assert route.source == "pattern"
+
+class CountingEmbeddings(HashingEmbeddings):
+    """Hashing embeddings that count provider calls"""
+
+    def __init__(self):
+        super().__init__(size=64)
+        self.query_calls = 0
+        self.document_calls = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.document_calls += 1
+        time.sleep(0.01)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        with self._lock:
+            self.query_calls += 1
+        return super().embed_query(text)
+
+def test_concurrent_first_classifications_build_centroids_once():
+    embeddings = CountingEmbeddings()
+    classifier = get_classifier(embeddings)
+    threads = [threading.Thread(target=classifier.classify, args=(f"question {i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert embeddings.document_calls == len(classifier.examples)
+
+def test_classifier_is_dropped_with_its_embeddings():
+    embeddings = CountingEmbeddings()
+    key = id(embeddings)
+    assert get_classifier(embeddings) is get_classifier(embeddings)
+    del embeddings
+    gc.collect()
+    assert key not in query_router._classifiers
+
+def test_retrieval_reuses_the_routing_query_vector():
+    embeddings = CountingEmbeddings()
+    store = InMemoryVectorStore(embeddings)
+    store.add_documents([Document(page_content=f"Section {i} covers the walkthrough of the methodology.") for i in range(5)])
+
+    query = "could you walk me through the methodology section"
+    route = route_query(query, has_documents=True, document_count=5, embeddings=embeddings)
+    assert route.source in ("classifier", "default")
+    search_with_scores(store, query, k=3)
+    assert embeddings.query_calls == 1
@@ -0,0 +1,128 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tests/test_session_store.py
+# Description: Checkpoint rewrites and rollbacks of the SQLite session store
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import numpy as np
+import pytest
+from langchain_core.vectorstores import InMemoryVectorStore
+from session_context import SessionContext
+from session_store import SessionStore
+
+SESSION_ID = "session-0001"
+
+class _FailingConnection:
+    """Connection proxy that fails the chunk insert, after the vectors were written"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def executemany(self, sql, rows):
+        if "INTO chunks" in sql:
+            raise RuntimeError("disk full")
+        return self._conn.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def _context(make_store, texts, documents):
+    store = make_store(texts)
+    return SessionContext(
+        SESSION_ID, store,
+        message_log=[{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}],
+        document_contents=documents,
+        uploaded_files=list(documents)
+    )
+
+def _restore(store, embeddings):
+    vector_store = InMemoryVectorStore(embeddings)
+    restored = store.restore(SESSION_ID, vector_store)
+    return restored, vector_store
+
+def _checkpoint(store, ctx, **kwargs):
+    return store.checkpoint(ctx.session_id, ctx.message_log, ctx.document_contents, ctx.uploaded_files, ctx.vector_store, **kwargs)
+
+def _vectors(vector_store):
+    return {entry["text"]: np.asarray(entry["vector"], dtype=np.float32) for entry in vector_store.store.values()}
+
+def test_rewrite_replaces_the_session(tmp_path, make_store, embeddings):
+    store = SessionStore(str(tmp_path))
+    ctx = _context(make_store, ["alpha chunk", "beta chunk"], {"a.txt": "alpha", "b.txt": "beta"})
+    _checkpoint(store, ctx)
+
+    # The second document is removed
+    kept = _context(make_store, ["alpha chunk"], {"a.txt": "alpha"})
+    _checkpoint(store, kept, rewrite=True)
+
+    restored, vector_store = _restore(store, embeddings)
+    assert restored["document_contents"] == {"a.txt": "alpha"}
+    assert [entry["text"] for entry in vector_store.store.values()] == ["alpha chunk"]
+    assert len([path for path in tmp_path.iterdir() if path.suffix == ".f32"]) == 1
+
+def test_failed_rewrite_keeps_the_previous_checkpoint(tmp_path, make_store, embeddings):
+    store = SessionStore(str(tmp_path))
+    ctx = _context(make_store, ["alpha chunk", "beta chunk"], {"a.txt": "alpha", "b.txt": "beta"})
+    version = _checkpoint(store, ctx)
+    before = _vectors(_restore(store, embeddings)[1])
+    files = sorted(path.name for path in tmp_path.iterdir() if path.suffix == ".f32")
+
+    store._conn = _FailingConnection(store._conn)
+    kept = _context(make_store, ["gamma chunk"], {"c.txt": "gamma"})
+    with pytest.raises(RuntimeError):
+        _checkpoint(store, kept, rewrite=True)
+    store._conn = store._conn._conn
+
+    assert store.updated_at(SESSION_ID) == version
+    restored, vector_store = _restore(store, embeddings)
+    assert restored["document_contents"] == {"a.txt": "alpha", "b.txt": "beta"}
+    after = _vectors(vector_store)
+    assert after.keys() == before.keys()
+    assert all(np.array_equal(after[text], before[text]) for text in before)
+    assert sorted(path.name for path in tmp_path.iterdir() if path.suffix == ".f32") == files
+
+def test_rolled_back_append_does_not_shift_later_vectors(tmp_path, make_store, embeddings):
+    store = SessionStore(str(tmp_path))
+    ctx = _context(make_store, ["alpha chunk"], {"a.txt": "alpha"})
+    _checkpoint(store, ctx)
+
+    ctx.vector_store.add_texts(["beta chunk"])
+    store._conn = _FailingConnection(store._conn)
+    with pytest.raises(RuntimeError):
+        _checkpoint(store, ctx)
+    store._conn = store._conn._conn
+
+    ctx.vector_store.add_texts(["gamma chunk"])
+    _checkpoint(store, ctx)
+
+    _, vector_store = _restore(store, embeddings)
+    restored = _vectors(vector_store)
+    assert set(restored) == {"alpha chunk", "beta chunk", "gamma chunk"}
+    for text, vector in restored.items():
+        assert np.allclose(vector, embeddings.embed_query(text))
+
+def test_api_backend_rewrite_is_atomic(tmp_path, make_store, embeddings, monkeypatch):
+    from api_server import SqliteSessionBackend
+
+    backend = SqliteSessionBackend(SessionStore(str(tmp_path)))
+    ctx = _context(make_store, ["alpha chunk", "beta chunk"], {"a.txt": "alpha", "b.txt": "beta"})
+    version = backend.save(ctx)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("embedding provider went away")
+
+    # Fails half-way through writing the fresh copy
+    monkeypatch.setattr(backend.store, "_write", fail)
+    ctx.document_contents.pop("b.txt")
+    with pytest.raises(RuntimeError):
+        backend.save(ctx, rewrite=True, expected_version=version)
+    monkeypatch.undo()
+
+    assert backend.version(SESSION_ID) == version
+    restored, _ = _restore(backend.store, embeddings)
+    assert restored["document_contents"] == {"a.txt": "alpha", "b.txt": "beta"}
@@ -0,0 +1,124 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tool_executor.py
+# Description: Deadline-aware tool execution with latency-driven planning
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Total latency budget for answering one user turn, in seconds
+TURN_LATENCY_BUDGET = float(os.getenv("TURN_LATENCY_BUDGET", "25"))
+
+# Time reserved at the end of a turn for the LLM to write the answer
+LLM_RESERVE = float(os.getenv("LLM_LATENCY_RESERVE", "12"))
+
+# Upper bound for a single web search regardless of the turn budget
+WEB_SEARCH_BUDGET = float(os.getenv("WEB_SEARCH_BUDGET", "8"))
+
+# Initial latency guesses per search depth, replaced by observations
+DEFAULT_SEARCH_LATENCY = {"advanced": 4.0, "basic": 1.5}
+
+# Head-room factor applied to expected latency when picking a plan
+SAFETY_FACTOR = 1.3
+
+# Smoothing factor for the moving latency average
+LATENCY_EWMA_ALPHA = 0.3
+
+# Worker threads shared by all sessions for tool calls
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "16"))
+
+class ToolTimeout(Exception):
+    """Raised when a tool call does not finish before its deadline"""
+
+class Deadline:
+    """Absolute point in time by which work must be finished"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        """Seconds left before the deadline, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """Check whether the deadline has passed"""
+        return self.remaining() <= 0
+
+    def child(self, budget):
+        """Deadline for a sub-task that cannot outlive this one"""
+        return Deadline(min(budget, self.remaining()))
+
+class LatencyTracker:
+    """Exponentially weighted latency averages per operation"""
+
+    def __init__(self, defaults=None, alpha=LATENCY_EWMA_ALPHA):
+        self.alpha = alpha
+        self._averages = dict(defaults or {})
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds):
+        """Fold a new latency observation into the average"""
+        with self._lock:
+            previous = self._averages.get(key)
+            if previous is None:
+                self._averages[key] = seconds
+            else:
+                self._averages[key] = self.alpha * seconds + (1 - self.alpha) * previous
+
+    def expected(self, key, default=0.0):
+        """Expected latency for an operation"""
+        with self._lock:
+            return self._averages.get(key, default)
+
+    def snapshot(self):
+        """Copy of all current averages"""
+        with self._lock:
+            return dict(self._averages)
+
+# Observed Tavily latency shared across sessions
+search_latency = LatencyTracker(DEFAULT_SEARCH_LATENCY)
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+def run_with_deadline(deadline, func, *args, **kwargs):
+    """Run a tool call on the shared pool and give up waiting when the deadline passes
+
+    Only the caller is released at the deadline. func should take the deadline
+    too (see ProviderGateway.call) so the work and its rate-limit slot end with it.
+    """
+    if deadline.expired():
+        raise ToolTimeout("Deadline already passed")
+
+    # Carry context variables (such as the provider session) into the worker
+    context = contextvars.copy_context()
+    future = _executor.submit(context.run, func, *args, **kwargs)
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeout:
+        # A running call cannot be cancelled; pass the deadline into it so it stops on its own
+        future.cancel()
+        raise ToolTimeout(f"Tool call exceeded its {deadline.budget:.1f}s budget")
+
+def plan_web_search(deadline):
+    """Choose search depth and result count for the time that is left"""
+    remaining = deadline.remaining()
+    advanced = search_latency.expected("advanced") * SAFETY_FACTOR
+    basic = search_latency.expected("basic") * SAFETY_FACTOR
+
+    if remaining >= advanced:
+        return {"search_depth": "advanced", "max_results": 5}
+    if remaining >= basic:
+        # Fewer results keep the response and the prompt small when time is short
+        max_results = 3 if remaining >= 2 * basic else 2
+        return {"search_depth": "basic", "max_results": max_results}
+    return None
@@ -0,0 +1,308 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: tracing.py
+# Description: Sampled per-turn tracing spans with JSONL and LangSmith export
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import logging
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import datetime
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Fraction of turns and uploads traced; 0 turns tracing off
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+
+# Local sink, one JSON trace per line; empty disables it
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", os.path.join(".traces", "traces.jsonl"))
+
+# Size at which the local sink is rotated, and how many rotated files are kept
+TRACE_JSONL_MAX_BYTES = int(os.getenv("TRACE_JSONL_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACE_JSONL_BACKUPS = int(os.getenv("TRACE_JSONL_BACKUPS", "3"))
+
+# Also send traces to LangSmith (needs LANGSMITH_API_KEY)
+TRACE_LANGSMITH = os.getenv("TRACE_LANGSMITH", "false").lower() == "true"
+TRACE_LANGSMITH_PROJECT = os.getenv("TRACE_LANGSMITH_PROJECT", "zerthia")
+
+# Finished traces waiting for export; more are dropped rather than slowing turns down
+TRACE_EXPORT_QUEUE = int(os.getenv("TRACE_EXPORT_QUEUE", "1000"))
+
+# Span of the stage currently running in this context
+_current_span = contextvars.ContextVar("trace_span", default=None)
+
+class Span:
+    """One timed stage of a trace with its attributes"""
+
+    def __init__(self, name, trace, parent_id, attributes):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        """Add or overwrite attributes"""
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        """Mark the stage as failed without raising"""
+        self.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        self.trace.add(self)
+
+    def to_dict(self):
+        return {
+            "span_id": str(self.span_id),
+            "parent_id": str(self.parent_id) if self.parent_id else None,
+            "name": self.name,
+            "start_offset_ms": round((self.start - self.trace.start) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+class _NoopSpan:
+    """Stands in for spans of unsampled traces so callers never branch"""
+
+    def set(self, **attributes):
+        pass
+
+    def fail(self, error):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class _Trace:
+    """Spans finished so far for one sampled root"""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4()
+        self.start = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+def current_span():
+    """Span of the running stage, or a no-op span outside sampled traces"""
+    return _current_span.get() or NOOP_SPAN
+
+def traced(name):
+    """Decorator running each call of a function in its own span"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+class JsonlExporter:
+    """Appends each finished trace as one JSON line, rotating the file by size"""
+
+    name = "jsonl"
+
+    def __init__(self, path, max_bytes=TRACE_JSONL_MAX_BYTES, backups=TRACE_JSONL_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        """Shift path to path.1, path.1 to path.2 and so on, dropping the oldest"""
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def export(self, trace, spans):
+        root = spans[0]
+        record = {
+            "trace_id": str(trace.trace_id),
+            "span_id": str(root.span_id),
+            "name": root.name,
+            "start": datetime.datetime.fromtimestamp(root.start_time, datetime.timezone.utc).isoformat(),
+            "duration_ms": round(root.duration * 1000, 2),
+            "error": root.error,
+            "attributes": root.attributes,
+            "spans": [span.to_dict() for span in spans[1:]]
+        }
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self.max_bytes > 0 and os.path.exists(self.path) and os.path.getsize(self.path) + len(line.encode("utf-8")) + 1 > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+class LangSmithExporter:
+    """Posts each finished trace to LangSmith as a run tree"""
+
+    name = "langsmith"
+
+    # LangSmith run types per stage; anything else is a chain
+    RUN_TYPES = {"llm": "llm", "vector_search": "retriever", "embed_query": "embedding", "web_search": "tool"}
+
+    def __init__(self, project=TRACE_LANGSMITH_PROJECT):
+        from langsmith.run_trees import RunTree
+
+        self.run_tree = RunTree
+        self.project = project
+
+    def export(self, trace, spans):
+        def timestamp(span, offset=0.0):
+            return datetime.datetime.fromtimestamp(span.start_time + offset, datetime.timezone.utc)
+
+        root, runs = spans[0], {}
+        runs[root.span_id] = self.run_tree(
+            id=root.span_id, name=root.name, run_type="chain", inputs=root.attributes,
+            start_time=timestamp(root), project_name=self.project
+        )
+        # Children finish before their parents, so create runs in start order
+        for span in sorted(spans[1:], key=lambda span: span.start):
+            parent = runs.get(span.parent_id, runs[root.span_id])
+            runs[span.span_id] = parent.create_child(
+                span.name, self.RUN_TYPES.get(span.name, "chain"), run_id=span.span_id,
+                inputs=span.attributes, start_time=timestamp(span)
+            )
+        for span in spans:
+            runs[span.span_id].end(outputs=span.attributes, error=span.error, end_time=timestamp(span, span.duration))
+        runs[root.span_id].post(exclude_child_runs=False)
+
+class Tracer:
+    """Samples root spans and hands finished traces to exporters off the request path"""
+
+    def __init__(self, sample_rate=TRACE_SAMPLE_RATE, exporters=None):
+        self.sample_rate = sample_rate
+        self.exporters = exporters if exporters is not None else self._default_exporters()
+        self._queue = queue.Queue(maxsize=TRACE_EXPORT_QUEUE)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._sampled = 0
+        self._skipped = 0
+        self._exported = 0
+        self._dropped = 0
+        self._export_errors = 0
+
+    @staticmethod
+    def _default_exporters():
+        exporters = [JsonlExporter(TRACE_JSONL_PATH)] if TRACE_JSONL_PATH else []
+        if TRACE_LANGSMITH:
+            try:
+                exporters.append(LangSmithExporter())
+            except Exception as e:
+                logger.warning("LangSmith trace export disabled: %s", e)
+        return exporters
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a stage as a child of the current span, or start a sampled trace"""
+        parent = _current_span.get()
+
+        # Children of unsampled traces cost one context lookup
+        if parent is NOOP_SPAN:
+            yield NOOP_SPAN
+            return
+
+        if parent is None:
+            if not self.exporters or random.random() >= self.sample_rate:
+                self._skipped += 1
+                token = _current_span.set(NOOP_SPAN)
+                try:
+                    yield NOOP_SPAN
+                finally:
+                    _current_span.reset(token)
+                return
+            self._sampled += 1
+            span = Span(name, _Trace(), None, attributes)
+        else:
+            span = Span(name, parent.trace, parent.span_id, attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+            if parent is None:
+                self._submit(span)
+
+    def _submit(self, root):
+        """Queue a finished trace for export, root span first"""
+        trace = root.trace
+        with trace._lock:
+            spans = [root] + [span for span in trace.spans if span is not root]
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._export_loop, name="trace-export", daemon=True)
+                self._worker.start()
+        try:
+            self._queue.put_nowait((trace, spans))
+        except queue.Full:
+            self._dropped += 1
+
+    def _export_loop(self):
+        while True:
+            trace, spans = self._queue.get()
+            for exporter in self.exporters:
+                try:
+                    exporter.export(trace, spans)
+                except Exception as e:
+                    self._export_errors += 1
+                    logger.warning("Trace export to %s failed: %s", exporter.name, e)
+            self._exported += 1
+            self._queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """Wait up to timeout seconds for queued traces to be exported"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self):
+        """Sampling and export counters"""
+        return {
+            "sample_rate": self.sample_rate,
+            "sampled": self._sampled,
+            "skipped": self._skipped,
+            "exported": self._exported,
+            "dropped": self._dropped,
+            "export_errors": self._export_errors,
+            "queued": self._queue.qsize()
+        }
+
+# Tracer shared by every session in this process
+tracer = Tracer()
+
+# Write out traces still queued when the process exits
+atexit.register(tracer.flush)
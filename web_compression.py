@@ -0,0 +1,147 @@
+# ===================================================================================
+# Project: Syntheim AI Companion
+# File: web_compression.py
+# Description: Compresses web search results to the sentences relevant to a query
+# Author: LALAN KUMAR
+# Created: [19-10-2026]
+# Updated: [19-10-2026]
+# Version: 1.0.0
+# License: [License Type, e.g., MIT]
+# ===================================================================================
+
+import os
+import re
+import math
+import threading
+from collections import Counter
+from metrics import metrics
+
+# Sentences kept per source, and a hard cap on characters per source
+SENTENCES_PER_SOURCE = int(os.getenv("WEB_SENTENCES_PER_SOURCE", "3"))
+MAX_CHARS_PER_SOURCE = int(os.getenv("WEB_MAX_CHARS_PER_SOURCE", "600"))
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\n+")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "how", "i", "in", "is", "it", "its", "of", "on", "or", "that", "the", "this",
+    "to", "was", "were", "what", "when", "where", "which", "who", "why", "will", "with"
+}
+
+def split_sentences(text):
+    """Split text into sentences"""
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+def tokenize(text):
+    """Lowercase content words of a text"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+def bm25_scores(query_terms, tokenized_sentences):
+    """BM25 score of every sentence for the query, treating sentences as documents"""
+    count = len(tokenized_sentences)
+    if count == 0:
+        return []
+
+    average_length = sum(len(tokens) for tokens in tokenized_sentences) / count or 1.0
+    document_frequency = Counter()
+    for tokens in tokenized_sentences:
+        document_frequency.update(set(tokens))
+
+    idf = {
+        term: math.log(1 + (count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+        for term in set(query_terms)
+    }
+
+    scores = []
+    for tokens in tokenized_sentences:
+        frequencies = Counter(tokens)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / average_length)
+        score = 0.0
+        for term, weight in idf.items():
+            frequency = frequencies.get(term, 0)
+            if frequency:
+                score += weight * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+        scores.append(score)
+    return scores
+
+def compress_results(query, results, sentences_per_source=SENTENCES_PER_SOURCE, max_chars=MAX_CHARS_PER_SOURCE):
+    """Keep only the top-scoring sentences of each result, in their original order"""
+    query_terms = tokenize(query)
+
+    # Score every sentence of every result in one BM25 collection
+    split_results = [split_sentences(result.get("content") or "") for result in results]
+    tokenized = [tokenize(sentence) for sentences in split_results for sentence in sentences]
+    scores = bm25_scores(query_terms, tokenized)
+
+    compressed = []
+    offset = 0
+    for result, sentences in zip(results, split_results):
+        sentence_scores = scores[offset:offset + len(sentences)]
+        offset += len(sentences)
+
+        # Best sentences first, then restored to reading order
+        ranked = sorted(range(len(sentences)), key=lambda i: sentence_scores[i], reverse=True)
+        keep = sorted(i for i in ranked[:sentences_per_source] if sentence_scores[i] > 0) or ranked[:1]
+
+        spans = []
+        length = 0
+        previous = None
+        for i in keep:
+            sentence = sentences[i]
+            if length + len(sentence) > max_chars and spans:
+                break
+            # Non-adjacent sentences are separated by an ellipsis
+            if previous is not None and i != previous + 1:
+                spans.append("…")
+            spans.append(sentence[:max_chars])
+            length += len(sentence)
+            previous = i
+
+        compressed.append({**result, "content": " ".join(spans)})
+
+    return compressed
+
+class CompressionStats:
+    """Running totals of web result size before and after compression"""
+
+    def __init__(self):
+        self.original_chars = 0
+        self.compressed_chars = 0
+        self.searches = 0
+        self._lock = threading.Lock()
+
+    def record(self, original, compressed):
+        with self._lock:
+            self.original_chars += sum(len(result.get("content") or "") for result in original)
+            self.compressed_chars += sum(len(result.get("content") or "") for result in compressed)
+            self.searches += 1
+
+    def snapshot(self):
+        with self._lock:
+            ratio = self.original_chars / self.compressed_chars if self.compressed_chars else 0.0
+            return {
+                "searches": self.searches,
+                "original_tokens": self.original_chars // 4,
+                "compressed_tokens": self.compressed_chars // 4,
+                "reduction_factor": round(ratio, 2)
+            }
+
+# Compression totals shared by every session in this process
+compression_stats = CompressionStats()
+
+metrics.callback(
+    "zerthia_web_compression_reduction_factor", "Web result characters before compression per character after",
+    lambda: compression_stats.snapshot()["reduction_factor"]
+)
+metrics.callback(
+    "zerthia_web_compression_tokens_total", "Estimated web result tokens by stage",
+    lambda: {
+        ("original",): compression_stats.original_chars // 4,
+        ("compressed",): compression_stats.compressed_chars // 4
+    }, ["stage"], kind="counter"
+)